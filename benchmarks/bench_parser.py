@@ -0,0 +1,203 @@
+"""
+Throughput benchmarks of the METAR parser, in the format of airspeed
+velocity (https://asv.readthedocs.io)::
+
+    $ asv run                    # benchmark the current commit
+    $ asv continuous master HEAD # compare two commits
+    $ asv publish && asv preview # browse the results over time
+
+Every benchmark runs against the corpora of `benchmarks.corpus`, so the
+results of different commits are directly comparable. The ``track_*``
+benchmarks report throughput in reports per second.
+
+"""
+from __future__ import division
+
+import os
+import pickle
+import shutil
+import tempfile
+import timeit
+
+import pandas
+
+from metar import datatypes
+from metar import metar
+from metar import records
+from metar import station
+
+from . import corpus
+
+CORPUS_SIZE = 2000
+
+
+class _Sink(object):
+    """ Stands in for the error file, so that the unparsed groups of the
+    garbage corpus are neither printed nor raised.
+    """
+    def write(self, text):
+        pass
+
+
+def _parse(reports):
+    sink = _Sink()
+    observations = []
+    for report in reports:
+        try:
+            observations.append(metar.Metar(report, errorfile=sink))
+        except metar.ParserError:
+            pass
+    return observations
+
+
+def _rate(function, count, repeat=3):
+    """ Best throughput (calls of `function` per second, times `count`)
+    over `repeat` runs.
+    """
+    best = min(timeit.repeat(function, number=1, repeat=repeat))
+    return count / best
+
+
+class Parse(object):
+    """ ``Metar.__init__`` on each corpus. """
+    params = corpus.KINDS
+    param_names = ['corpus']
+
+    def setup(self, kind):
+        self.reports = corpus.makeCorpus(kind, CORPUS_SIZE)
+
+    def time_parse(self, kind):
+        _parse(self.reports)
+
+    def track_reports_per_second(self, kind):
+        return _rate(lambda: _parse(self.reports), len(self.reports))
+    track_reports_per_second.unit = 'reports/s'
+
+
+class String(object):
+    """ ``Metar.string()`` of already parsed reports. """
+    params = corpus.KINDS
+    param_names = ['corpus']
+
+    def setup(self, kind):
+        self.observations = []
+        for obs in _parse(corpus.makeCorpus(kind, CORPUS_SIZE)):
+            # some garbage (e.g., a lone "/" taken for present weather)
+            # parses but cannot be described
+            try:
+                obs.string()
+            except Exception:
+                continue
+            self.observations.append(obs)
+
+    def _string(self):
+        for obs in self.observations:
+            obs.string()
+
+    def time_string(self, kind):
+        self._string()
+
+    def track_reports_per_second(self, kind):
+        return _rate(self._string, len(self.observations))
+    track_reports_per_second.unit = 'reports/s'
+
+
+class Records(object):
+    """ Binary records of `metar.records` of parsed reports, against
+    pickles of the same reports.
+    """
+    params = corpus.KINDS
+    param_names = ['corpus']
+
+    def setup(self, kind):
+        self.observations = _parse(corpus.makeCorpus(kind, CORPUS_SIZE))
+        self.records = [records.toBytes(obs) for obs in self.observations]
+        self.pickles = [pickle.dumps(obs, pickle.HIGHEST_PROTOCOL)
+                        for obs in self.observations]
+
+    def time_to_bytes(self, kind):
+        for obs in self.observations:
+            records.toBytes(obs)
+
+    def time_from_bytes(self, kind):
+        for record in self.records:
+            records.fromBytes(record)
+
+    def time_pickle_dumps(self, kind):
+        for obs in self.observations:
+            pickle.dumps(obs, pickle.HIGHEST_PROTOCOL)
+
+    def time_pickle_loads(self, kind):
+        for data in self.pickles:
+            pickle.loads(data)
+
+    def track_record_bytes(self, kind):
+        return sum(len(record) for record in self.records) / len(self.records)
+    track_record_bytes.unit = 'bytes/report'
+
+    def track_pickle_bytes(self, kind):
+        return sum(len(data) for data in self.pickles) / len(self.pickles)
+    track_pickle_bytes.unit = 'bytes/report'
+
+
+class Datatypes(object):
+    """ Constructors and unit conversions of `metar.datatypes`. """
+    number = 1000
+
+    def time_temperature(self):
+        datatypes.temperature('12.3', 'C').value('F')
+
+    def time_pressure(self):
+        datatypes.pressure('29.92', 'IN').value('MB')
+
+    def time_speed(self):
+        datatypes.speed('15', 'KT', '>').value('MPS')
+
+    def time_distance(self):
+        datatypes.distance('1 1/2', 'SM').value('M')
+
+    def time_direction(self):
+        datatypes.direction('NNW').value()
+
+    def time_precipitation(self):
+        datatypes.precipitation('0.13', 'IN').value('CM')
+
+
+class Station(object):
+    """ ``WeatherStation._process_file``: a month of raw five-minute ASOS
+    data (8928 reports) to a flat file, entirely offline.
+    """
+    timeout = 300
+    params = ['us_asos', 'garbage']
+    param_names = ['corpus']
+
+    def setup(self, kind):
+        self.cwd = os.getcwd()
+        self.tempdir = tempfile.mkdtemp()
+        os.chdir(self.tempdir)
+
+        self.timestamp = pandas.Timestamp('2012-01-01')
+        self.station = station.WeatherStation('KPDX')
+        self.reports = corpus.makeCorpus(kind, 31 * 24 * 12)
+        rawfile = self.station._make_data_file(self.timestamp, 'asos', 'raw')
+        with open(rawfile, 'w') as raw:
+            raw.writelines(corpus.asosLines(self.reports))
+
+        self.flatfile = self.station._make_data_file(self.timestamp, 'asos', 'flat')
+
+    def teardown(self, kind):
+        os.chdir(self.cwd)
+        shutil.rmtree(self.tempdir)
+
+    def _process(self):
+        # _process_file skips months that are already processed
+        if os.path.exists(self.flatfile):
+            os.remove(self.flatfile)
+        self.station._process_file(self.timestamp, 'asos')
+
+    def time_process_file(self, kind):
+        self._process()
+
+    def track_reports_per_second(self, kind):
+        return _rate(self._process, len(self.reports), repeat=1)
+    track_reports_per_second.unit = 'reports/s'
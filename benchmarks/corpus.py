@@ -0,0 +1,200 @@
+"""
+Reproducible corpora of METAR reports for the benchmarks.
+
+Synthetic corpora are generated from a seeded random number generator,
+so a given (kind, size, seed) always yields the same reports:
+
+* ``us_asos``: clean US ASOS reports with the usual remarks
+* ``international``: WMO-style reports with runway visual ranges,
+  runway states, CAVOK and trend groups
+* ``remarks``: US reports with long, varied remarks sections
+* ``garbage``: US reports with corrupted, repeated and invented groups
+
+``test_inputs`` is the set of real reports in ``test/metar_reports.txt``,
+repeated to the requested size.
+
+"""
+from __future__ import division
+
+import os
+import random
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TEST_REPORTS = os.path.join(ROOT, 'test', 'metar_reports.txt')
+
+KINDS = ['us_asos', 'international', 'remarks', 'garbage', 'test_inputs']
+
+US_STATIONS = ['KPDX', 'KSEA', 'KEWR', 'KORD', 'KDEN', 'KLAX', 'KBOS', 'KATL']
+INTL_STATIONS = ['EGLL', 'LFPG', 'EDDF', 'EHAM', 'RJTT', 'YSSY', 'UUEE', 'LEMD']
+WEATHER = ['', '', '', '-RA', 'RA', '+RA', '-SN', 'SN BR', 'BR', 'FG', 'HZ',
+           '-TSRA', 'TSRA', 'VCSH', '-SHRA', 'FZFG', '-DZ', 'FZRA']
+COVERS = ['FEW', 'SCT', 'BKN', 'OVC']
+TRENDS = ['NOSIG', 'BECMG 4000 RA', 'TEMPO 3000 SHRA', 'BECMG FM1200 25010KT',
+          'TEMPO 1500 BR BKN005']
+
+
+def _time(rng):
+    return '{:02d}{:02d}{:02d}Z'.format(rng.randint(1, 28), rng.randint(0, 23),
+                                        rng.choice([0, 20, 51, 53, 55]))
+
+
+def _wind(rng, units='KT'):
+    if rng.random() < 0.1:
+        return '00000' + units
+    direction = rng.randint(1, 36) * 10
+    speed = rng.randint(2, 25)
+    if rng.random() < 0.25:
+        return '{:03d}{:02d}G{:02d}{}'.format(direction, speed, speed + rng.randint(5, 15), units)
+    return '{:03d}{:02d}{}'.format(direction, speed, units)
+
+
+def _sky(rng, n=None):
+    if n is None:
+        n = rng.randint(0, 3)
+    if n == 0:
+        return 'CLR'
+    heights = sorted(rng.sample(range(2, 250), n))
+    return ' '.join('{}{:03d}'.format(rng.choice(COVERS), h) for h in heights)
+
+
+def _temps(rng):
+    temp = rng.randint(-15, 35)
+    dewpt = temp - rng.randint(0, 12)
+    fmt = lambda t: 'M{:02d}'.format(-t) if t < 0 else '{:02d}'.format(t)
+    return temp, dewpt, '{}/{}'.format(fmt(temp), fmt(dewpt))
+
+
+def _tgroup(temp, dewpt):
+    fmt = lambda t: '{}{:03d}'.format(1 if t < 0 else 0, abs(t) * 10)
+    return 'T{}{}'.format(fmt(temp), fmt(dewpt))
+
+
+def _us(rng, remarks):
+    temp, dewpt, temps = _temps(rng)
+    groups = [
+        'METAR', rng.choice(US_STATIONS), _time(rng),
+        'AUTO' if rng.random() < 0.3 else '',
+        _wind(rng),
+        rng.choice(['10SM', '10SM', '7SM', '3SM', '1 1/2SM', '1/2SM']),
+        rng.choice(WEATHER), _sky(rng), temps,
+        'A{:04d}'.format(rng.randint(2900, 3080)),
+        'RMK AO2', 'SLP{:03d}'.format(rng.randint(0, 999)),
+    ]
+    groups.extend(remarks)
+    groups.append(_tgroup(temp, dewpt))
+    return ' '.join(g for g in groups if g)
+
+
+def usASOS(rng):
+    remarks = []
+    if rng.random() < 0.3:
+        remarks.append('P{:04d}'.format(rng.randint(0, 50)))
+    return _us(rng, remarks)
+
+
+def remarkHeavy(rng):
+    remarks = [
+        'PK WND {:03d}{:02d}/{:02d}{:02d}'.format(rng.randint(1, 36) * 10,
+                                                 rng.randint(26, 60),
+                                                 rng.randint(0, 23),
+                                                 rng.randint(0, 59)),
+        'WSHFT {:02d}{:02d} FROPA'.format(rng.randint(0, 23), rng.randint(0, 59)),
+        'TWR VIS 1 1/2', 'VIS 1/2V2', 'CIG 005V010',
+        'RAB{:02d}E{:02d}'.format(rng.randint(0, 29), rng.randint(30, 59)),
+        'PRESFR', 'P{:04d}'.format(rng.randint(0, 99)),
+        '6{:04d}'.format(rng.randint(0, 200)),
+        '7{:04d}'.format(rng.randint(0, 400)),
+        '1{:04d}'.format(rng.randint(0, 350)),
+        '2{:04d}'.format(rng.randint(0, 350)),
+        '5{}{:03d}'.format(rng.randint(0, 8), rng.randint(0, 40)),
+        'FRQ LTGICCG OHD', 'TS OHD MOV NE', 'ACSL SW-W', 'TSNO',
+    ]
+    rng.shuffle(remarks)
+    return _us(rng, remarks[:rng.randint(6, len(remarks))]) + ' $'
+
+
+def international(rng):
+    temp, dewpt, temps = _temps(rng)
+    groups = ['METAR', rng.choice(INTL_STATIONS), _time(rng),
+              _wind(rng, units=rng.choice(['KT', 'KT', 'MPS']))]
+    if rng.random() < 0.2:
+        groups.append('{:03d}V{:03d}'.format(rng.randint(1, 17) * 10, rng.randint(19, 35) * 10))
+
+    if rng.random() < 0.2:
+        groups.extend(['CAVOK', temps])
+    else:
+        vis = rng.choice([9999, 9999, 8000, 4000, 1500, 800, 350])
+        groups.append('{:04d}'.format(vis))
+        if vis < 2000:
+            for runway in rng.sample(['09L', '27R', '24', '06C'], rng.randint(1, 2)):
+                groups.append('R{}/{:04d}{}'.format(runway, rng.randint(2, 18) * 100,
+                                                    rng.choice(['U', 'D', 'N', ''])))
+        groups.extend([rng.choice(WEATHER), _sky(rng), temps])
+
+    groups.append('Q{:04d}'.format(rng.randint(980, 1040)))
+    if rng.random() < 0.3:
+        groups.append('R{:02d}/{:06d}'.format(rng.choice([24, 88, 6]),
+                                              rng.randint(0, 999999)))
+    if rng.random() < 0.8:
+        groups.append(rng.choice(TRENDS))
+    return ' '.join(g for g in groups if g)
+
+
+def garbage(rng):
+    groups = usASOS(rng).split()
+    junk = ['XQZ', '12#4', '////', 'ZZZZZZ', '9999999', 'RMK', 'A29', 'KT',
+            '-+RA', 'SM', '/', '???']
+    for _ in range(rng.randint(1, 4)):
+        action = rng.random()
+        position = rng.randint(2, len(groups))
+        if action < 0.5:
+            groups.insert(position, rng.choice(junk))
+        elif action < 0.8 and position < len(groups):
+            groups.insert(position, groups[position])
+        else:
+            groups = groups[:max(position, 3)]
+    return ' '.join(groups)
+
+
+GENERATORS = {
+    'us_asos': usASOS,
+    'international': international,
+    'remarks': remarkHeavy,
+    'garbage': garbage,
+}
+
+
+def testInputs():
+    with open(TEST_REPORTS, 'r') as reports:
+        return [line.strip() for line in reports if line.strip()]
+
+
+def makeCorpus(kind, size=1000, seed=42):
+    """ List of `size` METAR reports of the given `kind` (see `KINDS`).
+    """
+    if kind == 'test_inputs':
+        reports = testInputs()
+        return (reports * (size // len(reports) + 1))[:size]
+
+    if kind not in GENERATORS:
+        raise ValueError('kind must be one of {}'.format(', '.join(KINDS)))
+
+    rng = random.Random('{}-{}'.format(kind, seed))
+    return [GENERATORS[kind](rng) for _ in range(size)]
+
+
+def asosLines(reports, year=2012, month=1):
+    """ Wrap reports in the fixed-width layout of NCDC's five-minute ASOS
+    files, every five minutes starting at the first of the month.
+    """
+    lines = []
+    for n, report in enumerate(reports):
+        minutes = 5 * n
+        day, hour, minute = minutes // 1440 + 1, minutes // 60 % 24, minutes % 60
+        lines.append(
+            '24229KPDX PDX{0:04d}{1:02d}{2:02d}{3:02d}{4:02d}100'
+            '{1:02d}/{2:02d}/{5:02d} {3:02d}:{4:02d}:31  5-MIN {6}\n'.format(
+                year, month, day, hour, minute, year % 100, report
+            )
+        )
+    return lines
@@ -0,0 +1,215 @@
+#!/usr/bin/env python
+"""
+Cold-start benchmarks of the package and its command-line tools.
+
+Every measurement runs in a fresh interpreter and entirely offline,
+against the files in ``test/``:
+
+* ``import``: cumulative import time (microseconds, from
+  ``python -X importtime``) of each metar submodule
+* ``rss``: peak resident set size (kB) after importing each submodule
+* ``first_report``: wall time (seconds) for ``parse_metar.py`` to start
+  up and decode one report, and for ``get_report.py`` to start up and
+  print its usage
+
+Each value is the best of several runs. Results are compared against a
+baseline stored in ``startup_baseline.json`` (next to this script) and
+the script exits with an error if any of them regressed by more than the
+threshold. Baselines are machine specific, so store one with ``--update``
+before making changes::
+
+    $ python benchmarks/startup.py --update
+    $ python benchmarks/startup.py --threshold 0.25
+
+"""
+from __future__ import print_function, division
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                        'startup_baseline.json')
+REPORTS = os.path.join(ROOT, 'test', 'metar_reports.txt')
+
+MODULES = ['metar', 'metar.datatypes', 'metar.metar', 'metar.qc',
+           'metar.circular', 'metar.station', 'metar.graphics',
+           'metar.exporters', 'metar.ncdc']
+
+RSS_CODE = (
+    "import resource, sys; import {0}; "
+    "scale = 1 if sys.platform.startswith('linux') else 1024.; "
+    "print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale)"
+)
+
+
+def _env():
+    env = os.environ.copy()
+    env['PYTHONPATH'] = os.pathsep.join(
+        [ROOT] + [p for p in [env.get('PYTHONPATH')] if p]
+    )
+    return env
+
+
+def _run(args, check=True):
+    proc = subprocess.Popen([sys.executable] + args, cwd=ROOT, env=_env(),
+                            stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    stdout, stderr = proc.communicate()
+    if check and proc.returncode != 0:
+        raise RuntimeError('{} failed:\n{}'.format(' '.join(args), stderr.decode()))
+    return stdout.decode(), stderr.decode()
+
+
+def parseImportTime(stderr):
+    """ Parse the output of ``python -X importtime``.
+
+    Returns
+    -------
+    total : int
+        Cumulative microseconds of the top-level metar imports.
+    modules : list of (module, cumulative microseconds) tuples
+        Every import, heaviest first.
+
+    """
+    total = 0
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or '|' not in line:
+            continue
+        fields = line[len('import time:'):].split('|')
+        try:
+            cumulative = int(fields[1])
+        except ValueError:
+            # the header
+            continue
+
+        name = fields[2].rstrip()
+        module = name.strip()
+        modules.append((module, cumulative))
+        toplevel = len(name) - len(name.lstrip()) <= 1
+        if toplevel and module.split('.')[0] == 'metar':
+            total += cumulative
+
+    return total, sorted(modules, key=lambda m: -m[1])
+
+
+def measureImports(repeat):
+    results = {}
+    breakdown = {}
+    for module in MODULES:
+        best = None
+        for _ in range(repeat):
+            stdout, stderr = _run(['-X', 'importtime', '-c', 'import ' + module])
+            total, modules = parseImportTime(stderr)
+            if best is None or total < best:
+                best, breakdown[module] = total, modules
+        results[module] = best
+    return results, breakdown
+
+
+def measureRSS(repeat):
+    results = {}
+    for module in MODULES:
+        results[module] = min(
+            float(_run(['-c', RSS_CODE.format(module)])[0])
+            for _ in range(repeat)
+        )
+    return results
+
+
+def _wall(args, repeat, check=True):
+    best = None
+    for _ in range(repeat):
+        start = time.time()
+        _run(args, check=check)
+        elapsed = time.time() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def measureFirstReport(repeat):
+    with open(REPORTS, 'r') as reports:
+        first = reports.readline()
+
+    fd, onereport = tempfile.mkstemp(suffix='.txt')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            f.write(first)
+        return {
+            'parse_metar.py': _wall(['parse_metar.py', '-s', onereport], repeat),
+            # with no stations, get_report only starts up and prints its
+            # usage, so it never touches the network
+            'get_report.py': _wall(['get_report.py'], repeat, check=False),
+        }
+    finally:
+        os.remove(onereport)
+
+
+def compare(results, baseline, threshold):
+    """ List the measurements that regressed by more than `threshold`
+    (a fraction) relative to `baseline`.
+    """
+    regressions = []
+    for kind in sorted(results):
+        for name, value in sorted(results[kind].items()):
+            known = baseline.get(kind, {}).get(name)
+            if known and value > known * (1 + threshold):
+                regressions.append((kind, name, known, value))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--update', action='store_true',
+                        help='store the results as the new baseline')
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help='allowed fractional regression (default: 0.25)')
+    parser.add_argument('--repeat', type=int, default=5,
+                        help='runs per measurement, the best is kept (default: 5)')
+    parser.add_argument('--baseline', default=BASELINE,
+                        help='path to the baseline JSON file')
+    parser.add_argument('--top', type=int, default=10,
+                        help='number of the heaviest imports to list')
+    args = parser.parse_args(argv)
+
+    results = {}
+    if sys.version_info >= (3, 7):
+        results['import'], breakdown = measureImports(args.repeat)
+        print('heaviest imports of "import metar.station":')
+        for module, cumulative in breakdown['metar.station'][:args.top]:
+            print('  {:>10,d} us  {}'.format(cumulative, module))
+    else:
+        print('-X importtime needs python 3.7 or later; skipping import times')
+
+    if os.name == 'posix':
+        results['rss'] = measureRSS(args.repeat)
+    results['first_report'] = measureFirstReport(args.repeat)
+
+    for kind in sorted(results):
+        print(kind)
+        for name, value in sorted(results[kind].items()):
+            print('  {:<20s} {:>12.3f}'.format(name, value))
+
+    if args.update or not os.path.exists(args.baseline):
+        with open(args.baseline, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+        print('baseline saved to {}'.format(args.baseline))
+        return 0
+
+    with open(args.baseline, 'r') as f:
+        baseline = json.load(f)
+
+    regressions = compare(results, baseline, args.threshold)
+    for kind, name, known, value in regressions:
+        print('REGRESSION {} {}: {:.3f} -> {:.3f} (+{:.0%})'.format(
+            kind, name, known, value, value / known - 1))
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,11 +1,15 @@
 #!/usr/bin/python
 #
+from __future__ import print_function
+
 import os
 import sys
 import getopt
-import string
-import urllib
-from metar import Metar
+try:
+    from urllib.request import urlopen
+except ImportError:
+    from urllib import urlopen
+from metar import metar as Metar
 
 BASE_URL = "http://weather.noaa.gov/pub/data/observations/metar/stations"
 
@@ -38,19 +42,21 @@ for name in stations:
     if debug: 
         sys.stderr.write("[ "+url+" ]")
     try:
-        urlh = urllib.urlopen(url)
+        urlh = urlopen(url)
         report = ''
         for line in urlh:
+            if not isinstance(line, str):
+                line = line.decode('ascii', 'replace')
             if line.startswith(name):
                 report = line.strip()
                 obs = Metar.Metar(line)
-                print obs.string()
+                print(obs.string())
                 break
         if not report:
             print("No data for %s\n\n" % (name,))
-    except Metar.ParserError, err:
+    except Metar.ParserError as err:
         print("METAR code: "+ line)
-        print(string.join(err.args,", ") + "\n")
+        print(", ".join(err.args) + "\n")
     except:
         print("Error retrieving %s data\n" % (name,))
  
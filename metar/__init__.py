@@ -54,94 +54,97 @@ THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
 #import Graphics
 
 import sys
-import os
-from warnings import simplefilter
-
-from numpy import errstate
-import numpy.testing as nptest
-from numpy.testing.noseclasses import NumpyTestProgram
-
-from .station import *
-from .graphics import *
-from .exporters import *
-from . import ncdc
-
-def _show_package_info(package, name):
-    print("%s version %s" % (name, package.__version__))
-    packagedir = os.path.dirname(package.__file__)
-    print("%s is installed in %s" % (name, packagedir))
-
-class NoseWrapper(nptest.Tester):
+import types
+import importlib
+
+# Submodules that need numpy, pandas, matplotlib, etc. are only imported
+# when they (or one of the names they export here) are first used, so the
+# parser itself (metar.metar and metar.datatypes) only needs the standard
+# library.
+_SUBMODULES = ('station', 'graphics', 'exporters', 'ncdc', 'qc', 'rollups',
+               'circular', 'telemetry', 'records', 'columnar',
+               'store', 'manifest')
+
+_LAZY_NAMES = {
+    'getAllStations': 'station',
+    'getStationByID': 'station',
+    'WeatherStation': 'station',
+    'getASOSData': 'station',
+    'getWundergroundData': 'station',
+    'getWunderground_NonAirportData': 'station',
+    'hyetograph': 'graphics',
+    'rainClock': 'graphics',
+    'windRose': 'graphics',
+    'windRoseTable': 'graphics',
+    'psychromograph': 'graphics',
+    'temperaturePlot': 'graphics',
+    'clearResampleCache': 'graphics',
+    'SWMM5Format': 'exporters',
+    'writeSWMM5': 'exporters',
+    'NCDCFormat': 'exporters',
+    'NCDCtoCSV': 'exporters',
+    'read_ncdc_hpd': 'exporters',
+    'hourXtab': 'exporters',
+    'states': 'exporters',
+}
+
+# the submodules stay out of __all__, so that ``from metar import *``
+# neither imports all of them nor needs their optional dependencies
+__all__ = sorted(_LAZY_NAMES)
+
+
+def _load(submodule):
+    return importlib.import_module('.' + submodule, __name__)
+
+
+def __getattr__(name):
+    if name in _SUBMODULES:
+        return _load(name)
+
+    if name in _LAZY_NAMES:
+        value = getattr(_load(_LAZY_NAMES[name]), name)
+        globals()[name] = value
+        return value
+
+    raise AttributeError('module {!r} has no attribute {!r}'.format(__name__, name))
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_SUBMODULES) | set(_LAZY_NAMES))
+
+
+class _LazyModule(types.ModuleType):
+    # the same lookups as the module-level __getattr__ and __dir__, for
+    # pythons without PEP 562
+    def __getattr__(self, name):
+        value = __getattr__(name)
+        setattr(self, name, value)
+        return value
+
+    def __dir__(self):
+        return sorted(set(vars(self)) | set(_SUBMODULES) | set(_LAZY_NAMES))
+
+
+def _install_lazy_module():
+    module = sys.modules[__name__]
+    lazy = _LazyModule(__name__, module.__doc__)
+    lazy.__dict__.update(module.__dict__)
+    # python 2 clears the globals of a module that is garbage collected,
+    # and the functions above still use them
+    lazy.__dict__['_original_module'] = module
+    sys.modules[__name__] = lazy
+
+
+def test(*args, **kwargs):
     '''
-    This is simply a monkey patch for numpy.testing.Tester.
-
-    It allows extra_argv to be changed from its default None to ['--exe'] so
-    that the tests can be run the same across platforms.  It also takes kwargs
-    that are passed to numpy.errstate to suppress floating point warnings.
+    Run tests for module using nose. See `metar._testing.NoseWrapper.test`
+    for the parameters.
     '''
+    from ._testing import NoseWrapper
+    return NoseWrapper(package=sys.modules[__name__]).test(*args, **kwargs)
 
 
-    def _show_system_info(self):
-        import nose
-
-        pyversion = sys.version.replace('\n','')
-        print("Python version %s" % pyversion)
-        print("nose version %d.%d.%d" % nose.__versioninfo__)
-
-        import numpy
-        _show_package_info(numpy, 'numpy')
-
-        import scipy
-        _show_package_info(scipy, 'scipy')
-
-        import matplotlib
-        _show_package_info(matplotlib, 'matplotlib')
-
-        import pandas
-        _show_package_info(pandas, 'pandas')
-
-        import openpyxl
-        _show_package_info(openpyxl, 'openpyxl')
-
-    def test(self, label='fast', verbose=1, extra_argv=['--exe'], doctests=False,
-             coverage=False, packageinfo=True, **kwargs):
-        '''
-        Run tests for module using nose
-
-        %(test_header)s
-        doctests : boolean
-            If True, run doctests in module, default False
-        coverage : boolean
-            If True, report coverage of NumPy code, default False
-            (Requires the coverage module:
-             http://nedbatchelder.com/code/modules/coverage.html)
-        kwargs
-            Passed to numpy.errstate.  See its documentation for details.
-        '''
-
-        # cap verbosity at 3 because nose becomes *very* verbose beyond that
-        verbose = min(verbose, 3)
-        nptest.utils.verbose = verbose
-
-        if packageinfo:
-            self._show_system_info()
-
-        if doctests:
-            print("Running unit tests and doctests for %s" % self.package_name)
-        else:
-            print("Running unit tests for %s" % self.package_name)
-
-        # reset doctest state on every run
-        import doctest
-        doctest.master = None
-
-        argv, plugins = self.prepare_test_args(label, verbose, extra_argv,
-                                               doctests, coverage)
-
-        with errstate(**kwargs):
-##            with catch_warnings():
-            simplefilter('ignore', category=DeprecationWarning)
-            t = NumpyTestProgram(argv=argv, exit=False, plugins=plugins)
-        return t.result
-
-test = NoseWrapper().test
+if sys.version_info < (3, 7):
+    # module-level __getattr__ (PEP 562) isn't supported, so swap this
+    # module for one whose class does the lazy lookups
+    _install_lazy_module()
@@ -0,0 +1,86 @@
+import sys
+import os
+from warnings import simplefilter
+
+from numpy import errstate
+import numpy.testing as nptest
+from numpy.testing.noseclasses import NumpyTestProgram
+
+
+def _show_package_info(package, name):
+    print("%s version %s" % (name, package.__version__))
+    packagedir = os.path.dirname(package.__file__)
+    print("%s is installed in %s" % (name, packagedir))
+
+class NoseWrapper(nptest.Tester):
+    '''
+    This is simply a monkey patch for numpy.testing.Tester.
+
+    It allows extra_argv to be changed from its default None to ['--exe'] so
+    that the tests can be run the same across platforms.  It also takes kwargs
+    that are passed to numpy.errstate to suppress floating point warnings.
+    '''
+
+
+    def _show_system_info(self):
+        import nose
+
+        pyversion = sys.version.replace('\n','')
+        print("Python version %s" % pyversion)
+        print("nose version %d.%d.%d" % nose.__versioninfo__)
+
+        import numpy
+        _show_package_info(numpy, 'numpy')
+
+        import scipy
+        _show_package_info(scipy, 'scipy')
+
+        import matplotlib
+        _show_package_info(matplotlib, 'matplotlib')
+
+        import pandas
+        _show_package_info(pandas, 'pandas')
+
+        import openpyxl
+        _show_package_info(openpyxl, 'openpyxl')
+
+    def test(self, label='fast', verbose=1, extra_argv=['--exe'], doctests=False,
+             coverage=False, packageinfo=True, **kwargs):
+        '''
+        Run tests for module using nose
+
+        %(test_header)s
+        doctests : boolean
+            If True, run doctests in module, default False
+        coverage : boolean
+            If True, report coverage of NumPy code, default False
+            (Requires the coverage module:
+             http://nedbatchelder.com/code/modules/coverage.html)
+        kwargs
+            Passed to numpy.errstate.  See its documentation for details.
+        '''
+
+        # cap verbosity at 3 because nose becomes *very* verbose beyond that
+        verbose = min(verbose, 3)
+        nptest.utils.verbose = verbose
+
+        if packageinfo:
+            self._show_system_info()
+
+        if doctests:
+            print("Running unit tests and doctests for %s" % self.package_name)
+        else:
+            print("Running unit tests for %s" % self.package_name)
+
+        # reset doctest state on every run
+        import doctest
+        doctest.master = None
+
+        argv, plugins = self.prepare_test_args(label, verbose, extra_argv,
+                                               doctests, coverage)
+
+        with errstate(**kwargs):
+##            with catch_warnings():
+            simplefilter('ignore', category=DeprecationWarning)
+            t = NumpyTestProgram(argv=argv, exit=False, plugins=plugins)
+        return t.result
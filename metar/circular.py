@@ -0,0 +1,194 @@
+"""
+Vectorized circular statistics for wind directions and times of day.
+
+Directions are in degrees clockwise from north. Missing values (NaN) are
+ignored throughout, and every function works on whole arrays at once
+(e.g., hourly vector-mean wind directions of a decade of five-minute
+reports are computed in a single call to `resampleDirection`).
+
+"""
+from __future__ import division
+
+import numpy as np
+import pandas
+
+__all__ = ['degrees2radians', 'radians2degrees', 'directionComponents',
+           'vectorDirection', 'meanDirection', 'resultantLength',
+           'resampleDirection', 'rollingDirection', 'directionHistogram',
+           'hourOfDay']
+
+
+def degrees2radians(degrees):
+    return degrees * np.pi / 180.0
+
+
+def radians2degrees(radians):
+    return radians * 180 / np.pi
+
+
+def directionComponents(directions):
+    """ Sines, cosines and validity of directions in degrees, with the
+    missing values zeroed out so that they drop out of sums.
+    """
+    radians = degrees2radians(np.asarray(directions, dtype=float))
+    valid = np.isfinite(radians)
+    radians = np.where(valid, radians, 0)
+    return np.where(valid, np.sin(radians), 0), np.where(valid, np.cos(radians), 0), valid
+
+
+def vectorDirection(sin, cos, count):
+    """ Direction in degrees of summed sines and cosines (e.g., from
+    `directionComponents`), or NaN where `count` is zero.
+    """
+    with np.errstate(invalid='ignore'):
+        degrees = radians2degrees(np.arctan2(sin, cos)) % 360
+        # tiny negative angles wrap all the way around to 360
+        degrees = np.where(degrees >= 360, 0., degrees)
+    return np.where(count > 0, degrees, np.nan)
+
+
+def meanDirection(directions, axis=None):
+    """ Vector mean of directions in degrees.
+
+    Parameters
+    ----------
+    directions : array-like
+    axis : int, optional
+        Axis along which to compute the means. By default, the mean of
+        the whole (flattened) array is returned.
+
+    Returns
+    -------
+    mean : float or numpy array
+        Between 0 and 360, or NaN where there are no valid directions.
+
+    """
+    sin, cos, valid = directionComponents(directions)
+    mean = vectorDirection(sin.sum(axis=axis), cos.sum(axis=axis),
+                      valid.sum(axis=axis))
+    return mean if axis is not None else float(mean)
+
+
+def resultantLength(directions, axis=None):
+    """ Mean resultant length of directions in degrees (1 when they all
+    agree, approaching 0 when they are spread evenly around the circle).
+    """
+    sin, cos, valid = directionComponents(directions)
+    count = valid.sum(axis=axis)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        length = np.hypot(sin.sum(axis=axis), cos.sum(axis=axis)) / count
+    return length if axis is not None else float(length)
+
+
+def resampleDirection(directions, rule):
+    """ Vector mean of each interval of a time series of directions.
+
+    Parameters
+    ----------
+    directions : pandas.Series with a DatetimeIndex
+    rule : string or pandas offset
+        Resampling rule (e.g., 'H' or 'D').
+
+    Returns
+    -------
+    mean : pandas.Series
+
+    """
+    sin, cos, valid = directionComponents(directions)
+    sums = pandas.DataFrame({
+        'sin': sin,
+        'cos': cos,
+        'count': valid.astype(float),
+    }, index=directions.index).resample(how='sum', rule=rule)
+
+    mean = pandas.Series(
+        vectorDirection(sums['sin'].values, sums['cos'].values, sums['count'].fillna(0).values),
+        index=sums.index, name=directions.name
+    )
+    return mean
+
+
+def rollingDirection(directions, window, min_periods=1):
+    """ Vector mean over a moving window of `window` observations.
+
+    Parameters
+    ----------
+    directions : array-like or pandas.Series
+    window : int
+        Number of observations in each window, ending with (and
+        including) the current one.
+    min_periods : int, optional (default = 1)
+        Minimum number of valid directions required in a window.
+
+    Returns
+    -------
+    mean : numpy array, or pandas.Series if `directions` is a Series
+
+    """
+    sin, cos, valid = directionComponents(directions)
+
+    def _moving_sum(values):
+        total = np.cumsum(np.concatenate([[0], values]))
+        return total[1:] - total[np.maximum(np.arange(values.shape[0]) + 1 - window, 0)]
+
+    count = _moving_sum(valid.astype(float))
+    mean = vectorDirection(_moving_sum(sin), _moving_sum(cos), count)
+    mean[count < min_periods] = np.nan
+
+    if isinstance(directions, pandas.Series):
+        mean = pandas.Series(mean, index=directions.index, name=directions.name)
+    return mean
+
+
+def directionHistogram(directions, nbins=36, weights=None):
+    """ Counts (or weighted totals) of directions in `nbins` sectors.
+
+    The first sector is centered on north, so with the default of 36
+    bins, sector `k` holds the directions within 5 degrees of ``10*k``.
+
+    Returns
+    -------
+    histogram : numpy array of length `nbins`
+
+    """
+    directions = np.asarray(directions, dtype=float)
+    valid = np.isfinite(directions)
+    directions = directions[valid]
+    width = 360. / nbins
+    sectors = np.floor(((directions + width / 2.) % 360) / width).astype(int)
+    if weights is not None:
+        weights = np.asarray(weights, dtype=float)[valid]
+    return np.bincount(sectors, weights=weights, minlength=nbins)[:nbins]
+
+
+def hourOfDay(series, how='mean'):
+    """ Aggregate a time series by hour of the day.
+
+    Parameters
+    ----------
+    series : pandas.Series with a DatetimeIndex
+    how : string, optional (default = 'mean')
+        One of 'sum', 'count' or 'mean'. Missing values are skipped.
+
+    Returns
+    -------
+    aggregate : numpy array of length 24
+        Hour 0 first. Means of hours without data are NaN.
+
+    """
+    values = np.asarray(series, dtype=float)
+    valid = ~np.isnan(values)
+    hours = np.asarray(series.index.hour)[valid]
+
+    count = np.bincount(hours, minlength=24)
+    if how == 'count':
+        return count
+
+    total = np.bincount(hours, weights=values[valid], minlength=24)
+    if how == 'sum':
+        return total
+    elif how == 'mean':
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return total / count
+    else:
+        raise ValueError("how must be one of 'sum', 'count', or 'mean'")
@@ -0,0 +1,273 @@
+"""
+Columnar (Apache Arrow) tables of parsed METAR reports.
+
+The flat files of `WeatherStation` only keep a handful of values of each
+report. `SCHEMA` keeps everything that `metar.metar.Metar` decodes: one
+column for each value of the main body and remarks, in fixed units (see
+the ``units`` metadata of the fields), and list-of-struct columns for the
+sky layers, present and recent weather and runway visual ranges::
+
+    from metar import columnar
+    batches = columnar.parseBatches(open('reports.txt'))
+    columnar.writeParquet('reports.parquet', batches)
+    df = columnar.readParquet('reports.parquet', columns=['time', 'temp'])
+
+Missing values of the numeric columns are NaN rather than nulls, so that
+pandas can use Arrow's buffers as they are, without copying them.
+
+Needs pyarrow, which is only imported with this module.
+
+"""
+from __future__ import division
+
+import operator
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from . import metar
+
+__all__ = ['SCHEMA', 'toRecordBatch', 'parseBatches', 'writeParquet',
+           'readParquet']
+
+
+def _field(name, type, units=None):
+    metadata = {'units': units} if units else None
+    return pa.field(name, type, metadata=metadata)
+
+
+_WEATHER_TYPE = pa.list_(pa.struct([
+    ('intensity', pa.string()),
+    ('description', pa.string()),
+    ('precipitation', pa.string()),
+    ('obscuration', pa.string()),
+    ('other', pa.string()),
+]))
+
+# (column, attribute of the Metar, units of the datatype)
+_MEASUREMENTS = [
+    ('wind_dir', 'wind_dir', None),
+    ('wind_speed', 'wind_speed', 'KT'),
+    ('wind_gust', 'wind_gust', 'KT'),
+    ('wind_dir_from', 'wind_dir_from', None),
+    ('wind_dir_to', 'wind_dir_to', None),
+    ('vis', 'vis', 'M'),
+    ('vis_dir', 'vis_dir', None),
+    ('max_vis', 'max_vis', 'M'),
+    ('max_vis_dir', 'max_vis_dir', None),
+    ('temp', 'temp', 'C'),
+    ('dewpt', 'dewpt', 'C'),
+    ('press', 'press', 'MB'),
+    ('wind_speed_peak', 'wind_speed_peak', 'KT'),
+    ('wind_dir_peak', 'wind_dir_peak', None),
+    ('max_temp_6hr', 'max_temp_6hr', 'C'),
+    ('min_temp_6hr', 'min_temp_6hr', 'C'),
+    ('max_temp_24hr', 'max_temp_24hr', 'C'),
+    ('min_temp_24hr', 'min_temp_24hr', 'C'),
+    ('press_sea_level', 'press_sea_level', 'MB'),
+    ('precip_1hr', 'precip_1hr', 'IN'),
+    ('precip_3hr', 'precip_3hr', 'IN'),
+    ('precip_6hr', 'precip_6hr', 'IN'),
+    ('precip_24hr', 'precip_24hr', 'IN'),
+]
+
+# (column, attribute of the Metar)
+_STRINGS = [
+    ('station_id', 'station_id'),
+    ('type', 'type'),
+    ('mod', 'mod'),
+    ('code', 'code'),
+]
+_TIMES = [
+    ('time', 'time'),
+    ('peak_wind_time', 'peak_wind_time'),
+    ('wind_shift_time', 'wind_shift_time'),
+]
+_STRING_LISTS = [
+    ('windshear', 'windshear'),
+    ('trend', '_trend_groups'),
+    ('remarks', '_remarks'),
+    ('unparsed_groups', '_unparsed_groups'),
+    ('unparsed_remarks', '_unparsed_remarks'),
+]
+
+SCHEMA = pa.schema(
+    [_field(column, pa.string()) for column, attr in _STRINGS] +
+    [_field(column, pa.timestamp('us'), 'UTC') for column, attr in _TIMES] +
+    [_field('cycle', pa.int8())] +
+    [_field(column, pa.float64(), units or 'degrees')
+     for column, attr, units in _MEASUREMENTS] +
+    [
+        _field('sky', pa.list_(pa.struct([
+            ('cover', pa.string()),
+            ('height', pa.float64()),
+            ('cloud', pa.string()),
+        ])), 'FT'),
+        _field('weather', _WEATHER_TYPE),
+        _field('recent', _WEATHER_TYPE),
+        _field('runway', pa.list_(pa.struct([
+            ('name', pa.string()),
+            ('low', pa.float64()),
+            ('high', pa.float64()),
+        ])), 'M'),
+    ] +
+    [_field(column, pa.list_(pa.string())) for column, attr in _STRING_LISTS]
+)
+
+
+def _value(quantity, units):
+    if quantity is None:
+        return np.nan
+    if units is None:
+        return quantity._degrees
+    if quantity._units == units:
+        return quantity._value
+    return quantity.value(units)
+
+
+def _list_array(rows, type):
+    """ List array of `type` from lists of tuples (one per struct, or a
+    single value for lists of strings), built from its offsets and
+    flattened values.
+    """
+    offsets = [0]
+    entries = []
+    for row in rows:
+        entries.extend(row)
+        offsets.append(len(entries))
+
+    item = type.value_type
+    if pa.types.is_struct(item):
+        columns = list(zip(*entries)) or [()] * item.num_fields
+        values = pa.StructArray.from_arrays(
+            [pa.array(column, type=item.field(n).type) for n, column in enumerate(columns)],
+            fields=[item.field(n) for n in range(item.num_fields)],
+        )
+    else:
+        values = pa.array(entries, type=item)
+    return pa.ListArray.from_arrays(pa.array(offsets, type=pa.int32()), values)
+
+
+def toRecordBatch(observations):
+    """ Arrow record batch of `SCHEMA` of parsed reports.
+
+    Parameters
+    ----------
+    observations : list of metar.metar.Metar
+
+    Returns
+    -------
+    batch : pyarrow.RecordBatch
+
+    """
+    observations = list(observations)
+    arrays = []
+    for column, attr in _STRINGS:
+        arrays.append(pa.array(list(map(operator.attrgetter(attr), observations)),
+                               type=pa.string()))
+
+    for column, attr in _TIMES:
+        arrays.append(pa.array(list(map(operator.attrgetter(attr), observations)),
+                               type=pa.timestamp('us')))
+
+    arrays.append(pa.array([obs.cycle for obs in observations], type=pa.int8()))
+
+    # all the measurements of a report at once, then one column at a time
+    measurements = operator.itemgetter(*[attr for column, attr, units in _MEASUREMENTS])
+    columns = list(zip(*[measurements(obs.__dict__) for obs in observations]))
+    columns = columns or [()] * len(_MEASUREMENTS)
+    for (column, attr, units), quantities in zip(_MEASUREMENTS, columns):
+        arrays.append(pa.array(np.array([_value(q, units) for q in quantities], dtype=float)))
+
+    arrays.append(_list_array(
+        ([(cover, _value(height, 'FT'), cloud) for cover, height, cloud in obs.sky]
+         for obs in observations),
+        SCHEMA.field('sky').type,
+    ))
+    arrays.append(_list_array(
+        ([weather.info for weather in obs.weather] for obs in observations),
+        _WEATHER_TYPE,
+    ))
+    arrays.append(_list_array(
+        ([tuple(recent) for recent in obs.recent] for obs in observations),
+        _WEATHER_TYPE,
+    ))
+    arrays.append(_list_array(
+        ([(name, _value(low, 'M'), _value(high, 'M')) for name, low, high in obs.runway]
+         for obs in observations),
+        SCHEMA.field('runway').type,
+    ))
+
+    for column, attr in _STRING_LISTS:
+        arrays.append(_list_array(map(operator.attrgetter(attr), observations),
+                                  SCHEMA.field(column).type))
+
+    return pa.RecordBatch.from_arrays(arrays, schema=SCHEMA)
+
+
+def parseBatches(reports, batchsize=10000, **kwargs):
+    """ Parse METAR reports into Arrow record batches.
+
+    Parameters
+    ----------
+    reports : iterable of strings
+        One report each, e.g. the lines of a file. Blank ones are
+        skipped.
+    batchsize : int, optional (default = 10000)
+        Number of reports per record batch.
+    **kwargs
+        Passed on to `metar.metar.Metar` (e.g., ``errors``, ``month``
+        and ``year``).
+
+    Yields
+    ------
+    batch : pyarrow.RecordBatch of `SCHEMA`
+
+    """
+    observations = []
+    for report in reports:
+        report = report.strip()
+        if not report:
+            continue
+        observations.append(metar.Metar(report, **kwargs))
+        if len(observations) >= batchsize:
+            yield toRecordBatch(observations)
+            observations = []
+
+    if observations:
+        yield toRecordBatch(observations)
+
+
+def writeParquet(path, batches, compression='snappy'):
+    """ Write record batches (e.g., of `parseBatches`) to a Parquet
+    file, one row group per batch.
+
+    Returns
+    -------
+    rows : int
+        Number of reports written.
+
+    """
+    rows = 0
+    with pq.ParquetWriter(path, SCHEMA, compression=compression) as writer:
+        for batch in batches:
+            writer.write_batch(batch)
+            rows += batch.num_rows
+    return rows
+
+
+def readParquet(path, columns=None):
+    """ Read a Parquet file of `writeParquet` into a pandas.DataFrame.
+
+    Parameters
+    ----------
+    path : string
+    columns : list of strings, optional
+        Only read these columns (by default, all of them).
+
+    """
+    table = pq.read_table(path, columns=columns)
+    # one chunk per column and one block per column lets pandas use the
+    # numeric buffers without copying them
+    return table.combine_chunks().to_pandas(split_blocks=True, self_destruct=True)
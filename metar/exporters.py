@@ -4,6 +4,7 @@ from matplotlib.ticker import FuncFormatter
 import matplotlib.dates as dates
 import pandas
 import datetime
+import itertools
 
 from .graphics import _resampler
 
@@ -64,41 +65,148 @@ states = [
     {'name': 'Pacific Islands', 'code': 91}
 ]
 
+# fixed-width layout of NCDC hourly precipitation (HPD) records
+_HPD_HEADER = 30
+_HPD_FIELD = 12
+_HPD_MISSING = 99999
+_HPD_CHUNKSIZE = 50000
+# days of records formatted (and written) at a time
+_HPD_WRITE_DAYS = 366
+_HPD_UNITS = {
+    'HI': 0.01,
+}
+
+_SWMM5_COLUMNS = ['station', 'year', 'month', 'day', 'hour', 'minute',
+                  'precip']
+_SWMM5_CHUNKSIZE = 100000
+
 
 def SWMM5Format(dataframe, stationid, col='Precip', freq='hourly', dropzeros=True,
                 filename=None, sep='\t'):
     # resample the `col` column of `dataframe`, returns a series
     data, rule, plotkind = _resampler(dataframe, col, freq=freq, how='sum')
-
-    # set the precip column's name and make the series a dataframe
-    data.name = col.lower()
-    data = pandas.DataFrame(data)
-
-    # add all of the data/time columns
-    data['station'] = stationid
-    data['year'] = data.index.year
-    data['month'] = data.index.month
-    data['day'] = data.index.day
-    data['hour'] = data.index.hour
-    data['minute'] = data.index.minute
-
-    # drop the zeros if we need to
-    if dropzeros:
-        data = data[data['precip'] > 0]
+    data = _swmm5_rows(data, stationid, dropzeros)
 
     # make a file name if not provided
     if filename is None:
         filename = "{0}_{1}.dat".format(stationid, freq)
 
-    # force the order of columns that we need
-    data = data[['station', 'year', 'month', 'day', 'hour', 'minute', 'precip']]
-    data.precip = np.round(data.precip, 2)
-
     # export and return the data
     data.to_csv(filename, index=False, sep=sep)
     return data
 
 
+def writeSWMM5(stations, filename, col='Precip', freq='hourly', dropzeros=True,
+               sep='\t', chunksize=_SWMM5_CHUNKSIZE):
+    """ Stream the precipitation of one or more stations into a single
+    SWMM5 rain file.
+
+    Each station's data are resampled and written `chunksize` records
+    at a time, so memory use does not grow with the length of the
+    record.
+
+    Parameters
+    ----------
+    stations : dict or list of (stationid, data) tuples
+        `data` is either a pandas.DataFrame with a sorted DatetimeIndex
+        or an iterable of such frames covering consecutive periods of
+        time (e.g., ``pandas.read_csv(..., chunksize=N)`` of a compiled
+        station file).
+    filename : string or file-like
+        Path or open file object of the output rain file.
+    col : string, optional (default = 'Precip')
+        Column with the precipitation depths.
+    freq : string, optional (default = 'hourly')
+        Interval of the rain file (see `graphics._resampler`).
+    dropzeros : bool, optional (default = True)
+        Toggles skipping records without any precipitation.
+    sep : string, optional (default = tab)
+        Field separator.
+    chunksize : int, optional
+        Number of input records resampled at a time.
+
+    Returns
+    -------
+    nrows : int
+        Number of records written.
+
+    """
+    if hasattr(stations, 'items'):
+        stations = stations.items()
+
+    def _write(fout):
+        nrows = 0
+        fout.write(sep.join(_SWMM5_COLUMNS) + '\n')
+        for stationid, source in stations:
+            for data in _stream_resampled(source, col, freq, 'sum', chunksize):
+                rows = _swmm5_rows(data, stationid, dropzeros)
+                rows.to_csv(fout, header=False, index=False, sep=sep)
+                nrows += rows.shape[0]
+        return nrows
+
+    if hasattr(filename, 'write'):
+        return _write(filename)
+
+    with open(filename, 'w') as fout:
+        return _write(fout)
+
+
+def _swmm5_rows(data, stationid, dropzeros):
+    """ Frame of SWMM5 rain file records from a resampled series.
+    """
+    if dropzeros:
+        data = data[data > 0]
+
+    index = data.index
+    rows = pandas.DataFrame({
+        'station': stationid,
+        'year': index.year,
+        'month': index.month,
+        'day': index.day,
+        'hour': index.hour,
+        'minute': index.minute,
+        'precip': np.round(np.asarray(data, dtype=float), 2),
+    }, index=index, columns=_SWMM5_COLUMNS)
+    return rows
+
+
+def _stream_resampled(source, col, freq, how, chunksize):
+    """ Resample `source` a chunk at a time. The last (possibly
+    incomplete) interval of each chunk is carried over into the next one
+    so that intervals never straddle two chunks.
+    """
+    if isinstance(source, pandas.DataFrame):
+        chunks = (source.iloc[n:n + chunksize]
+                  for n in range(0, source.shape[0], chunksize))
+    else:
+        chunks = iter(source)
+
+    carry = None
+    for chunk in chunks:
+        chunk = chunk[[col]]
+        if carry is not None:
+            chunk = pandas.concat([carry, chunk])
+        if chunk.shape[0] == 0:
+            continue
+
+        data, rule, plotkind = _resampler(chunk, col, freq=freq, how=how,
+                                           cache=False)
+        carry = chunk[chunk.index >= _interval_start(data.index[-1], rule)]
+        yield data.iloc[:-1]
+
+    if carry is not None and carry.shape[0] > 0:
+        data, rule, plotkind = _resampler(carry, col, freq=freq, how=how,
+                                           cache=False)
+        yield data
+
+
+def _interval_start(label, rule):
+    # weekly and monthly intervals are labeled by their last day
+    if rule in ('W', 'M'):
+        return pandas.Period(label, freq=rule).start_time
+    return label
+
+
 def NCDCFormat(dataframe, coopid, statename, col='Precip', filename=None):
     '''
     Always resamples to hourly
@@ -121,34 +229,117 @@ def NCDCFormat(dataframe, coopid, statename, col='Precip', filename=None):
     data = data.reset_index().set_index(['Date', 'Hour'])[[col]]
     data = data.unstack(level='Hour')[col]
 
-    def makeNCDCRow(row, flags=None):
-        newrow = row.dropna() * 100
-        newrow = newrow.astype(int)
-        newrow = newrow.append(pandas.Series(newrow.sum(), index=[25]))
+    header = '{0}{1:02d}{2}{3}{4}'.format(RECORDTYPE, STATECODE, coopid,
+                                           ELEMENT, UNITS)
+    output = open(filename, 'w') if filename is not None else None
+    try:
+        # format and write a year of days at a time
+        rows = []
+        for n in range(0, data.shape[0], _HPD_WRITE_DAYS):
+            text = _ncdc_rows(data.iloc[n:n + _HPD_WRITE_DAYS], header)
+            rows.extend(text.splitlines(True))
+            if output is not None:
+                output.write(text)
+    finally:
+        if output is not None:
+            output.close()
+
+    data['ncdcstring'] = rows
+    return data
 
-        if flags is None:
-            flags = [" "] * len(newrow)
 
-        precipstrings = ' '.join([
-            '{0:02d}00 {1:05d}{2}'.format(hour, int(val), flag) \
-            for hour, val, flag in zip(newrow.index, newrow, flags)
-        ])
+def _fixed_width_digits(values, width):
+    """ ASCII codes of the zero-padded, fixed-width decimal
+    representation of non-negative integers (one row per value).
+    """
+    values = np.asarray(values, dtype=np.int64)
+    if values.size and (values.min() < 0 or values.max() >= 10 ** width):
+        raise ValueError("values must fit in {0} digits".format(width))
+    powers = 10 ** np.arange(width - 1, -1, -1, dtype=np.int64)
+    return ((values[:, None] // powers) % 10 + ord('0')).astype(np.uint8)
 
-        ncdcstring = '{0}{1:02d}{2}{3}{4}{5}{6:02d}{7:04d}{8:03d}{9} \n'.format(
-            RECORDTYPE, STATECODE, coopid,
-            ELEMENT, UNITS, row.name.year,
-            row.name.month, row.name.day, row.count() + 1,
-            precipstrings
-        )
-        return ncdcstring
 
-    data['ncdcstring'] = data.apply(makeNCDCRow, axis=1)
+def _ncdc_rows(data, header):
+    """ Format an hourly (day x hour) precip table as NCDC HPD records.
 
-    if filename is not None:
-        with open(filename, 'w') as output:
-            output.writelines(data['ncdcstring'].values)
+    Each record is `header`, the date and number of values, and then an
+    "HH00 VVVVVF " field for every non-null hour followed by the daily
+    total (hour 25). The fields of every record are laid out in a single
+    preallocated byte buffer instead of being formatted row by row.
 
-    return data
+    Records with a value that doesn't fit in the five digits (negative,
+    or 1000 inches or more) are formatted one at a time, with a wider
+    field (e.g. "-0001"), as they always were.
+    """
+    values = data.values
+    valid = ~np.isnan(values)
+    hundredths = (np.where(valid, values, 0) * 100).astype(int)
+    hundredths[~valid] = 0
+
+    totals = hundredths.sum(axis=1)
+    wide = (((hundredths < 0) | (hundredths >= 10 ** 5)).any(axis=1) |
+            (totals < 0) | (totals >= 10 ** 5))
+    if wide.any():
+        rows = np.empty(data.shape[0], dtype=object)
+        if not wide.all():
+            rows[~wide] = _ncdc_rows(data[~wide], header).splitlines(True)
+        dates = pandas.DatetimeIndex(data.index)
+        hours = np.asarray(data.columns, dtype=np.int64)
+        for n in np.flatnonzero(wide):
+            rows[n] = _ncdc_wide_row(header, dates[n], hours[valid[n]],
+                                     hundredths[n][valid[n]])
+        return ''.join(rows)
+
+    # (day, slot) fields, with the daily total in the last slot
+    ndays, nhours = values.shape
+    slot_hours = np.append(np.asarray(data.columns, dtype=np.int64), 25)
+    slot_values = np.hstack([hundredths, hundredths.sum(axis=1)[:, None]])
+    slot_valid = np.hstack([valid, np.ones((ndays, 1), dtype=bool)])
+
+    fieldwidth = 12
+    fields = np.empty((ndays, nhours + 1, fieldwidth), dtype=np.uint8)
+    fields.fill(ord(' '))
+    fields[:, :, 0:2] = _fixed_width_digits(slot_hours, 2)[None, :, :]
+    fields[:, :, 2:4] = ord('0')
+    fields[:, :, 5:10] = _fixed_width_digits(slot_values.ravel(), 5) \
+        .reshape(ndays, nhours + 1, 5)
+    fields = fields[slot_valid]
+
+    # record headers: constant prefix, then year, month, day, count
+    dates = pandas.DatetimeIndex(data.index)
+    prefix = np.frombuffer(header.encode('ascii'), dtype=np.uint8)
+    heads = np.hstack([
+        np.tile(prefix, (ndays, 1)),
+        _fixed_width_digits(dates.year, 4),
+        _fixed_width_digits(dates.month, 2),
+        _fixed_width_digits(dates.day, 4),
+        _fixed_width_digits(slot_valid.sum(axis=1), 3),
+    ])
+    headwidth = heads.shape[1]
+
+    # drop everything into place in one buffer
+    nfields = slot_valid.sum(axis=1)
+    rowlengths = headwidth + nfields * fieldwidth + 1
+    rowstarts = np.concatenate([[0], np.cumsum(rowlengths)[:-1]])
+    fieldrows = np.repeat(np.arange(ndays), nfields)
+    fieldnums = np.arange(fieldrows.shape[0]) - np.repeat(
+        np.cumsum(nfields) - nfields, nfields)
+
+    buf = np.empty(rowlengths.sum(), dtype=np.uint8)
+    buf[rowstarts[:, None] + np.arange(headwidth)] = heads
+    fieldstarts = rowstarts[fieldrows] + headwidth + fieldnums * fieldwidth
+    buf[fieldstarts[:, None] + np.arange(fieldwidth)] = fields
+    buf[rowstarts + rowlengths - 1] = ord('\n')
+    return buf.tobytes().decode('ascii')
+
+
+def _ncdc_wide_row(header, date, hours, values):
+    """ One NCDC HPD record, formatted field by field.
+    """
+    fields = ['{0:02d}00 {1:05d} '.format(hour, int(val))
+              for hour, val in zip(list(hours) + [25], list(values) + [sum(values)])]
+    return '{0}{1}{2:02d}{3:04d}{4:03d}{5} \n'.format(
+        header, date.year, date.month, date.day, len(fields), ' '.join(fields))
 
 
 def hourXtab(dataframe, col, filename=None, flag=None):
@@ -179,18 +370,162 @@ def NCDCtoCSV(ncdc, csv):
 
     Parameters
     ----------
-    ncdc : filepath to raw NCDC format
-    csv : filepath to output CSV file
+    ncdc : filepath or buffer of raw NCDC format
+    csv : filepath or buffer of output CSV file
+
+    """
+
+    def _write(fout):
+        for chunk in read_ncdc_hpd(ncdc, chunksize=_HPD_CHUNKSIZE):
+            chunk = chunk[chunk['precip'].notnull()]
+            chunk.to_csv(fout, header=False, index=False, float_format='%.2f',
+                         date_format='%Y-%m-%d %H:%M')
+
+    if hasattr(csv, 'write'):
+        _write(csv)
+    else:
+        with open(csv, 'w') as fout:
+            _write(fout)
+
+
+def read_ncdc_hpd(path_or_buffer, chunksize=None):
+    """ Read an NCDC hourly precipitation (HPD, TD-3240) file.
+
+    Records are decoded a chunk at a time by slicing the fixed-width
+    layout of each line, so arbitrarily large files can be streamed in
+    bounded memory.
+
+    Parameters
+    ----------
+    path_or_buffer : string or file-like
+        Path to the raw HPD file or an open file object.
+    chunksize : int, optional
+        When provided, return an iterator of DataFrames, each built from
+        at most `chunksize` records (lines) of the file. Otherwise the
+        whole file is returned as a single DataFrame.
+
+    Returns
+    -------
+    data : pandas.DataFrame or iterator of DataFrames
+        With columns 'station', 'recordtype', 'element', 'units', 'date',
+        'precip' and 'flag'. Missing values are NaN and the daily totals
+        (hour 25) are dropped. Dates are the start of each hour.
+
+    """
+    chunks = _iter_hpd_chunks(path_or_buffer, chunksize or _HPD_CHUNKSIZE)
+    if chunksize is not None:
+        return chunks
+
+    chunks = list(chunks)
+    if len(chunks) == 0:
+        return _decode_hpd([])
+    return pandas.concat(chunks, ignore_index=True)
 
+
+def _iter_hpd_chunks(path_or_buffer, chunksize):
+    if hasattr(path_or_buffer, 'read'):
+        fin, close = path_or_buffer, False
+    else:
+        fin, close = open(path_or_buffer, 'rb'), True
+
+    try:
+        offset = 0
+        while True:
+            lines = list(itertools.islice(fin, chunksize))
+            if len(lines) == 0:
+                break
+            chunk = _decode_hpd(lines)
+            chunk.index += offset
+            offset += chunk.shape[0]
+            yield chunk
+    finally:
+        if close:
+            fin.close()
+
+
+def _hpd_digits(block):
+    """ Integers from the right-aligned digits along the last axis of a
+    uint8 character array (blanks count as zeros).
     """
+    digits = block.astype(np.int64) - ord('0')
+    digits[(digits < 0) | (digits > 9)] = 0
+    powers = 10 ** np.arange(block.shape[-1] - 1, -1, -1, dtype=np.int64)
+    sign = np.where((block == ord('-')).any(axis=-1), -1, 1)
+    return (digits * powers).sum(axis=-1) * sign
 
-    csvrows = []
-    with open("input/45114_LAX.NCD", 'r') as fin:
-        for row in fin:
-            csvrows.extend(_obs_from_row(row))
 
-    with open("output/045114_LAX.csv", 'w') as fout:
-        fout.writelines(csvrows)
+def _hpd_text(block):
+    """ Stripped strings from the characters along the last axis of a
+    uint8 character array.
+    """
+    width = block.shape[-1]
+    text = np.ascontiguousarray(block).view('S{}'.format(width))
+    text = text.reshape(block.shape[:-1]).astype(str)
+    return np.char.strip(text)
+
+
+def _decode_hpd(lines):
+    columns = ['station', 'recordtype', 'element', 'units', 'date',
+               'precip', 'flag']
+
+    lines = [line.rstrip(b'\r\n' if isinstance(line, bytes) else '\r\n')
+             for line in lines]
+    lines = [line if isinstance(line, bytes) else line.encode('ascii')
+             for line in lines if line.strip()]
+    if len(lines) == 0:
+        return pandas.DataFrame([], columns=columns)
+
+    # pad every line out to the same whole number of observation fields
+    # and view the chunk as a 2D array of characters
+    lengths = np.array([len(line) for line in lines])
+    nfields = max(0, -(-(lengths.max() - _HPD_HEADER) // _HPD_FIELD))
+    width = _HPD_HEADER + nfields * _HPD_FIELD
+    chars = np.array(lines, dtype='S{}'.format(width))
+    chars = chars.view(np.uint8).reshape(len(lines), width)
+
+    recordtype = _hpd_text(chars[:, 0:3])
+    station = _hpd_text(chars[:, 3:9])
+    element = _hpd_text(chars[:, 9:15])
+    units = _hpd_text(chars[:, 15:17])
+    year = _hpd_digits(chars[:, 17:21])
+    month = _hpd_digits(chars[:, 21:23])
+    day = _hpd_digits(chars[:, 23:27])
+
+    unknown = set(units) - set(_HPD_UNITS)
+    if unknown:
+        raise ValueError('unknown HPD units: {}'.format(', '.join(sorted(unknown))))
+
+    # each observation is HHMM, a six digit value and two flag characters
+    fields = chars[:, _HPD_HEADER:].reshape(len(lines), nfields, _HPD_FIELD)
+    hour = _hpd_digits(fields[:, :, 0:2])
+    minute = _hpd_digits(fields[:, :, 2:4])
+    value = _hpd_digits(fields[:, :, 4:10])
+
+    # fields must at least reach the end of their value and hour 25 is
+    # the daily total
+    ends = _HPD_HEADER + _HPD_FIELD * np.arange(nfields) + 10
+    keep = (ends[None, :] <= lengths[:, None]) & (hour >= 1) & (hour <= 24)
+    rows, cols = np.nonzero(keep)
+
+    days = (year - 1970).astype('datetime64[Y]').astype('datetime64[M]')
+    days = (days + (month - 1)).astype('datetime64[D]') + (day - 1)
+    minutes = (hour[rows, cols] - 1) * 60 + minute[rows, cols]
+    dates = days[rows].astype('datetime64[m]') + minutes
+
+    conversion = np.array([_HPD_UNITS[u] for u in units])
+    precip = value[rows, cols] * conversion[rows]
+    precip[value[rows, cols] == _HPD_MISSING] = np.nan
+
+    data = pandas.DataFrame({
+        'station': station[rows],
+        'recordtype': recordtype[rows],
+        'element': element[rows],
+        'units': units[rows],
+        'date': dates.astype('datetime64[ns]'),
+        'precip': precip,
+        'flag': _hpd_text(fields[rows, cols, 10:12]),
+    }, columns=columns)
+    return data
 
 
 def _pop_many(mylist, N, side='left'):
@@ -206,17 +541,15 @@ def _pop_many(mylist, N, side='left'):
 
 
 def _parse_obs(obs, units='HI'):
-    conversions = {
-        'HI': 0.01,
-    }
-    hour = int(_pop_many(obs, 2)) - 1
-    minute = int(_pop_many(obs, 2))
-    precip = int(_pop_many(obs, 6))
-    if precip == 99999:
+    obs = ''.join(obs)
+    hour = int(obs[0:2]) - 1
+    minute = int(obs[2:4])
+    precip = int(obs[4:10])
+    if precip == _HPD_MISSING:
         precip = None
     else:
-        precip *= conversions[units]
-    flag = ''.join(obs)
+        precip *= _HPD_UNITS[units]
+    flag = obs[10:].strip()
     return hour, minute, precip, flag
 
 
@@ -233,20 +566,19 @@ def _write_obs(rowheader, year, month, day, obs):
         return rowstring + '\n'
 
 def _obs_from_row(row):
-    values = row.strip().split()
-    header = list(values.pop(0))
-    recordtype = _pop_many(header, 3)
-    state_coopid = _pop_many(header, 6)
-    element = _pop_many(header, 6)
-    units = _pop_many(header, 2)
-    year = int(_pop_many(header, 4))
-    month = int(_pop_many(header, 2))
-    day = int(_pop_many(header, 4))
-
-    _count = int(_pop_many(header, 3))
-
-    observations = [''.join(header)]
-    observations.extend(values)
+    row = row.rstrip()
+    recordtype = row[0:3]
+    state_coopid = row[3:9]
+    element = row[9:15]
+    units = row[15:17]
+    year = int(row[17:21])
+    month = int(row[21:23])
+    day = int(row[23:27])
+
+    observations = [
+        row[n:n + _HPD_FIELD]
+        for n in range(_HPD_HEADER, len(row), _HPD_FIELD)
+    ]
     parsedObs = [_parse_obs(list(obs), units=units) for obs in observations]
 
     rowheader = ','.join([
@@ -1,14 +1,117 @@
+import weakref
+import zlib
+
 import numpy as np
+import matplotlib
 import matplotlib.pyplot as plt
 from matplotlib.ticker import FuncFormatter
 import matplotlib.dates as dates
 import pandas
 
+from . import circular
+from .circular import degrees2radians, radians2degrees
+
 __all__ = ['hyetograph', 'rainClock', 'windRose', 'psychromograph',
-           'temperaturePlot']
+           'windRoseTable', 'temperaturePlot', 'clearResampleCache',
+           'seedResampleCache']
+matplotlib.rcParams['timezone'] = 'UTC'
+
+
+# resampled series keyed by id(dataframe), then (col, rule, how). They
+# are stored before any missing values are filled
+_resample_cache = {}
+
+# finer rules whose sums can be summed again into the key's rule
+_FINER_RULES = {
+    '15Min': ['5Min'],
+    '30Min': ['15Min', '5Min'],
+    'H': ['30Min', '15Min', '5Min'],
+    'D': ['H', '30Min', '15Min', '5Min'],
+    'W': ['D', 'H'],
+    'M': ['D', 'H'],
+}
+
+
+def _column_token(dataframe, col):
+    """ Cheap fingerprint of a column used to detect in-place edits.
+    Returns None for columns that can't be fingerprinted.
+    """
+    values = np.asarray(dataframe[col])
+    if values.dtype.kind not in 'biufcmM':
+        return None
+    return zlib.crc32(np.ascontiguousarray(values).view(np.uint8))
+
+
+def _cache_entries(dataframe):
+    frameid = id(dataframe)
+    cached = _resample_cache.get(frameid)
+    if cached is None or cached[0]() is not dataframe:
+        ref = weakref.ref(dataframe, lambda r: _resample_cache.pop(frameid, None))
+        cached = (ref, {})
+        _resample_cache[frameid] = cached
+    return cached[1]
+
+
+def _cache_lookup(dataframe, entries, key, token):
+    entry = entries.get(key)
+    if entry is not None:
+        index, entrytoken, data = entry
+        if index is dataframe.index and entrytoken == token:
+            return data
+
+
+def _cached_resample(dataframe, col, rule, how, fillna):
+    token = _column_token(dataframe, col)
+    if token is None:
+        return None
+
+    entries = _cache_entries(dataframe)
+    key = (col, rule, how)
+    data = _cache_lookup(dataframe, entries, key, token)
+    if data is None:
+        # sums can be built from the closest finer level that's on hand
+        if how == 'sum':
+            for finer in _FINER_RULES.get(rule, []):
+                finerdata = _cache_lookup(dataframe, entries,
+                                          (col, finer, how), token)
+                if finerdata is not None:
+                    data = finerdata.resample(how=how, rule=rule)
+                    break
+
+        if data is None:
+            data = _resample(dataframe[col], rule, how)
+        entries[key] = (dataframe.index, token, data)
+
+    if fillna is not None:
+        data = data.fillna(value=fillna)
+    return data
+
+
+def seedResampleCache(dataframe, col, rule, how, data):
+    """ Store precomputed resampled data (e.g., persisted rollups) of
+    one of the columns of `dataframe`.
+    """
+    token = _column_token(dataframe, col)
+    if token is not None:
+        entries = _cache_entries(dataframe)
+        entries[(col, rule, how)] = (dataframe.index, token, data)
 
 
-def _resampler(dataframe, col, freq, how='sum', fillna=None):
+def _resample(series, rule, how):
+    # 'circmean' is the vector mean of directions in degrees
+    if how == 'circmean':
+        return circular.resampleDirection(series, rule)
+    return series.resample(how=how, rule=rule)
+
+
+def clearResampleCache():
+    """ Drop all of the resampled data shared between plots and
+    exporters.
+    """
+    _resample_cache.clear()
+
+
+def _resampler(dataframe, col, freq, how='sum', fillna=None, cache=True):
     rules = {
         '5min': ('5Min', 'line'),
         '5 min': ('5Min', 'line'),
@@ -42,9 +145,18 @@ def _resampler(dataframe, col, freq, how='sum', fillna=None):
 
     rule = rules[freq.lower()][0]
     plotkind = rules[freq.lower()][1]
-    data = dataframe[col].resample(how=how, rule=rule)
-    if fillna is not None:
-        data.fillna(value=fillna, inplace=True)
+    data = None
+    if cache:
+        data = _cached_resample(dataframe, col, rule, how, fillna)
+
+    if data is None:
+        data = _resample(dataframe[col], rule, how)
+        if fillna is not None:
+            data.fillna(value=fillna, inplace=True)
+    else:
+        # callers are free to modify what they get back
+        data = data.copy()
+        data.index = data.index.copy()
 
     return data, rule, plotkind
 
@@ -60,7 +172,8 @@ def _plotter(dataframe, col, ylabel, freq='hourly', how='sum',
     else:
         fig = ax.figure
 
-    data, rule, plotkind = _resampler(dataframe, col, freq=freq, how=how)
+    data, rule, plotkind = _resampler(dataframe, col, freq=freq, how=how,
+                                      fillna=fillna)
 
     data.plot(ax=ax, kind=plotkind)
     if rule == 'A':
@@ -112,16 +225,9 @@ def rainClock(dataframe, raincol='Precip', fname=None):
     if not hasattr(dataframe, raincol):
         raise ValueError('input `dataframe` must have a `%s` column' % raincol)
 
-    rainfall = dataframe[raincol]
     am_hours = np.arange(0, 12)
     am_hours[0] = 12
-    rainhours = rainfall.index.hour
-    rain_by_hour = []
-    for hr in np.arange(24):
-        selector = (rainhours == hr)
-        total_depth = rainfall[selector].sum()
-        num_obervations = rainfall[selector].count()
-        rain_by_hour.append(total_depth/num_obervations)
+    rain_by_hour = circular.hourOfDay(dataframe[raincol], how='mean')
 
     bar_width = 2*np.pi/12 * 0.8
     fig, (ax1, ax2) = plt.subplots(nrows=1, ncols=2, figsize=(7, 3),
@@ -147,6 +253,58 @@ def rainClock(dataframe, raincol='Precip', fname=None):
     return fig
 
 
+def windRoseTable(dataframe, speedcol='WindSpd', dircol='WindDir', mph=False,
+                  speedBins=None):
+    """ Frequencies of the wind directions below a series of wind speeds.
+
+    The table is computed with a single pass over the data.
+
+    Parameters
+    ----------
+    dataframe : pandas.DataFrame
+    speedcol, dircol : strings, optional
+        Names of the wind speed (knots) and direction (degrees clockwise
+        from north) columns.
+    mph : bool, optional (default = False)
+        Toggles binning the speeds in miles per hour instead of knots.
+    speedBins : list of numbers, optional
+        Upper limits of the speed bins. Defaults to 5, 10, 20, 30 and
+        40.
+
+    Returns
+    -------
+    table : pandas.DataFrame
+        Index is each (non-zero) direction reported, columns are the
+        speed bins and values are the fraction of all observations with
+        that direction and a speed less than the bin's limit.
+
+    """
+    if speedBins is None:
+        speedBins = [5, 10, 20, 30, 40]
+    speedBins = np.sort(np.asarray(speedBins))
+    factor = 1.15 if mph else 1
+
+    speed = np.asarray(dataframe[speedcol], dtype=float) * factor
+    direction = np.asarray(dataframe[dircol], dtype=float)
+    total = float(dataframe.shape[0])
+
+    # code each observation by its direction and the first speed bin
+    # that it falls under, count them all at once and then accumulate
+    # the counts across the speed bins
+    valid = ~np.isnan(direction) & (speed < speedBins[-1])
+    directions, dircode = np.unique(direction[valid], return_inverse=True)
+    spdcode = np.searchsorted(speedBins, speed[valid], side='right')
+    nbins = speedBins.shape[0]
+    counts = np.bincount(dircode * nbins + spdcode,
+                         minlength=directions.shape[0] * nbins)
+    counts = counts.reshape(directions.shape[0], nbins).cumsum(axis=1)
+
+    table = pandas.DataFrame(counts / total, index=directions, columns=speedBins)
+    table.index.name = dircol
+    table.columns.name = speedcol
+    return table[table.index != 0]
+
+
 def windRose(dataframe, speedcol='WindSpd', dircol='WindDir', mph=False,
              fname=None):
     '''
@@ -162,32 +320,23 @@ def windRose(dataframe, speedcol='WindSpd', dircol='WindDir', mph=False,
 
     # set up the figure
     fig, ax1 = plt.subplots(figsize=(6, 6), subplot_kw=dict(polar=True))
-    ax1.xaxis.grid(True, which='major', linestyle='-', alpha='0.125', zorder=0)
-    ax1.yaxis.grid(True, which='major', linestyle='-', alpha='0.125', zorder=0)
+    ax1.xaxis.grid(True, which='major', linestyle='-', alpha=0.125, zorder=0)
+    ax1.yaxis.grid(True, which='major', linestyle='-', alpha=0.125, zorder=0)
     ax1.set_theta_zero_location("N")
     ax1.set_theta_direction('clockwise')
 
     # speed bins and colors
     speedBins = [40, 30, 20, 10, 5]
     colors = ['#990000', '#FF4719', '#FFCC00', '#579443', '#0066FF']
+    units = 'mph' if mph else 'kt'
 
-    # number of total and zero-wind observations
-    total = np.float(dataframe.shape[0])
-    if mph:
-        factor =  1.15
-        units = 'mph'
-    else:
-        factor = 1
-        units = 'kt'
-
-    calm = np.float(dataframe[dataframe[speedcol] == 0].shape[0])/total * 100
+    table = windRoseTable(dataframe, speedcol=speedcol, dircol=dircol,
+                          mph=mph, speedBins=speedBins)
+    barDir, barWidth = _convert_dir_to_left_radian(np.array(table.index))
 
-    # loop through the speed bins
+    # draw the bins from the fastest (i.e., longest bars) to the slowest
     for spd, clr in zip(speedBins, colors):
-        barLen = _get_wind_counts(dataframe, spd, speedcol, dircol, factor=factor)
-        barLen = barLen/total
-        barDir, barWidth = _convert_dir_to_left_radian(np.array(barLen.index))
-        ax1.bar(barDir, barLen, width=barWidth, linewidth=0.50,
+        ax1.bar(barDir, table[spd], width=barWidth, linewidth=0.50,
                 edgecolor=(0.25, 0.25, 0.25), color=clr, alpha=0.8,
                 label=r"<%d %s" % (spd, units))
 
@@ -197,6 +346,7 @@ def windRose(dataframe, speedcol='WindSpd', dircol='WindDir', mph=False,
     ax1.xaxis.grid(True, which='major', color='k', alpha=0.5)
     ax1.yaxis.grid(True, which='major', color='k', alpha=0.5)
     ax1.yaxis.set_major_formatter(FuncFormatter(_pct_fmt))
+    calm = (dataframe[speedcol] == 0).sum() / float(dataframe.shape[0]) * 100
     fig.text(0.05, 0.95, 'Calm Winds: %0.1f%%' % calm)
     #if calm >= 0.1:
     #    ax1.set_ylim(ymin=np.floor(calm*10)/10.)
@@ -208,12 +358,6 @@ def windRose(dataframe, speedcol='WindSpd', dircol='WindDir', mph=False,
     return fig
 
 
-def _get_wind_counts(dataframe, maxSpeed, speedcol, dircol, factor=1):
-    group = dataframe[dataframe[speedcol]*factor < maxSpeed].groupby(by=dircol)
-    counts = group.size()
-    return counts[counts.index != 0]
-
-
 def _pct_fmt(x, pos=0):
     return '%0.1f%%' % (100*x)
 
@@ -225,17 +369,7 @@ def _convert_dir_to_left_radian(directions):
     return barDir, barWidth
 
 
-def degrees2radians(degrees):
-    return degrees * np.pi / 180.0
-
-
-def radians2degrees(radians):
-    return radians * 180 / np.pi
-
-
 def avgDirection(directions):
-    radians = degrees2radians(directions)
-    cos = np.cos(radians).sum()
-    sin = np.sin(radians).sum()
-    degree = radians2degrees(np.arctan2(sin, cos))
+    degree = circular.meanDirection(directions)
     return degree if degree > 0 else degree + 360
+
@@ -0,0 +1,306 @@
+"""
+Metadata sidecars of compiled station files.
+
+`writeCompiled` saves a compiled station dataframe as CSV, one month at
+a time, and writes a small JSON sidecar next to it with the number of
+rows, the first and last times, the columns, the source and a checksum
+of the file. The sidecar also keeps the byte offset and row number at
+which each month starts, so that::
+
+    info = manifest.readManifest('data/KPDX/asos/compile/pdx.csv')
+    june = manifest.readCompiled('data/KPDX/asos/compile/pdx.csv',
+                                 start='2012-06-01', end='2012-06-30')
+
+lists the file without opening it and only parses the rows of June.
+
+`appendCompiled` uses the same offsets to replace the last months of a
+compiled file with newer data without reading the earlier ones.
+
+A sidecar is only trusted while the size and modification time of its
+compiled file are the ones it recorded; otherwise `readManifest` returns
+None and `readCompiled` falls back to reading the file in chunks.
+
+"""
+from __future__ import division
+
+import io
+import json
+import os
+import zlib
+
+import numpy as np
+import pandas
+import six
+
+__all__ = ['VERSION', 'SUFFIX', 'manifestPath', 'writeCompiled',
+           'appendCompiled', 'readManifest', 'readCompiled']
+
+VERSION = 1
+SUFFIX = '.meta.json'
+
+# rows per chunk when a compiled file has no (valid) sidecar
+_CHUNKSIZE = 50000
+
+
+def manifestPath(path):
+    """ Path of the sidecar of a compiled file. """
+    return path + SUFFIX
+
+
+def _month_starts(index):
+    """ Positions of the first row of each month of a sorted
+    DatetimeIndex, and the months ('YYYY-MM').
+    """
+    if len(index) == 0:
+        return [], []
+    months = np.asarray(index.year) * 12 + np.asarray(index.month) - 1
+    starts = [0] + (np.flatnonzero(np.diff(months)) + 1).tolist()
+    return starts, ['{:04d}-{:02d}'.format(months[n] // 12, months[n] % 12 + 1)
+                    for n in starts]
+
+
+def _stat(path):
+    info = os.stat(path)
+    return info.st_size, int(info.st_mtime * 1e6)
+
+
+def _rename(src, dst):
+    """ os.replace, which python 2 doesn't have. """
+    if hasattr(os, 'replace'):
+        os.replace(src, dst)
+    else:
+        if os.path.exists(dst):
+            os.remove(dst)
+        os.rename(src, dst)
+
+
+def _csv_bytes(dataframe, header=True):
+    """ `dataframe` as UTF-8 encoded CSV. """
+    buf = six.StringIO()
+    dataframe.to_csv(buf, header=header)
+    text = buf.getvalue()
+    return text.encode('utf-8') if isinstance(text, six.text_type) else text
+
+
+def _write_months(outfile, dataframe, crc, offset, row, months):
+    """ Write `dataframe` (without its header) to `outfile` one month at
+    a time, appending [month, offset, row, crc] to `months`.
+
+    Returns the crc32, offset and row number at the end.
+    """
+    starts, names = _month_starts(dataframe.index)
+    for n, (start, name) in enumerate(zip(starts, names)):
+        stop = starts[n + 1] if n + 1 < len(starts) else dataframe.shape[0]
+        chunk = _csv_bytes(dataframe.iloc[start:stop], header=False)
+
+        months.append([name, offset, row, crc])
+        outfile.write(chunk)
+        crc = zlib.crc32(chunk, crc)
+        offset += len(chunk)
+        row += stop - start
+    return crc, offset, row
+
+
+def _finish(path, tmppath, info, crc, offset, row, start, end):
+    """ Move a written compiled file into place and write its sidecar.
+    """
+    _rename(tmppath, path)
+    size, mtime = _stat(path)
+    info.update({
+        'rows': row,
+        'start': start,
+        'end': end,
+        'crc32': crc & 0xffffffff,
+        'size': size,
+        'mtime': mtime,
+    })
+
+    sidecar = manifestPath(path)
+    with open(sidecar + '.tmp', 'w') as out:
+        json.dump(info, out, indent=1)
+    _rename(sidecar + '.tmp', sidecar)
+    return info
+
+
+def writeCompiled(dataframe, path, source=None, station=None):
+    """ Save a compiled dataframe (sorted by time) as CSV, with its
+    sidecar.
+
+    Parameters
+    ----------
+    dataframe : pandas.DataFrame with a sorted DatetimeIndex
+    path : string
+        Path of the CSV file. Both files are written to temporary files
+        first and then moved into place.
+    source, station : strings, optional
+        Recorded in the sidecar.
+
+    Returns
+    -------
+    info : dict
+        The contents of the sidecar.
+
+    """
+    header = _csv_bytes(dataframe.iloc[:0])
+
+    info = {
+        'version': VERSION,
+        'source': source,
+        'station': station,
+        'index': dataframe.index.name,
+        'columns': [str(col) for col in dataframe.columns],
+        'header': len(header),
+        'months': [],
+    }
+
+    tmppath = path + '.tmp'
+    with open(tmppath, 'wb') as out:
+        out.write(header)
+        crc, offset, row = _write_months(out, dataframe, zlib.crc32(header),
+                                         len(header), 0, info['months'])
+
+    index = dataframe.index
+    return _finish(path, tmppath, info, crc, offset, row,
+                   str(index[0]) if row else None, str(index[-1]) if row else None)
+
+
+def appendCompiled(dataframe, path, info):
+    """ Replace the months of a compiled file from the first month of
+    `dataframe` on with `dataframe`.
+
+    Only the rows of the earlier months are copied, as bytes, from the
+    old file; the checksum and month offsets of the sidecar are carried
+    on from the point where the new data start.
+
+    Parameters
+    ----------
+    dataframe : pandas.DataFrame with a sorted DatetimeIndex
+        The data of the new months, with the same columns as the
+        compiled file.
+    path : string
+        Path of the compiled file.
+    info : dict
+        Its (valid) sidecar, as returned by `readManifest`.
+
+    Returns
+    -------
+    info : dict
+        The new contents of the sidecar.
+
+    """
+    if dataframe.shape[0] == 0:
+        return info
+
+    if (dataframe.index.name != info['index'] or
+            [str(col) for col in dataframe.columns] != info['columns']):
+        raise ValueError('columns of the new data differ from the compiled file')
+
+    starts, names = _month_starts(dataframe.index)
+    months = [month for month in info['months'] if month[0] < names[0]]
+    if len(months) < len(info['months']):
+        name, offset, row, crc = info['months'][len(months)]
+    else:
+        offset, row, crc = info['size'], info['rows'], info['crc32']
+
+    info = dict(info, months=months)
+    tmppath = path + '.tmp'
+    with open(tmppath, 'wb') as out:
+        with open(path, 'rb') as old:
+            remaining = offset
+            while remaining:
+                block = old.read(min(remaining, 1 << 20))
+                if not block:
+                    raise ValueError('compiled file is shorter than its sidecar')
+                out.write(block)
+                remaining -= len(block)
+        crc, offset, row = _write_months(out, dataframe, crc, offset, row, months)
+
+    start = info['start'] if months else str(dataframe.index[0])
+    return _finish(path, tmppath, info, crc, offset, row, start,
+                   str(dataframe.index[-1]))
+
+
+def readManifest(path):
+    """ Sidecar of a compiled file, or None if it is missing, of another
+    version or out of date with the file.
+    """
+    sidecar = manifestPath(path)
+    if not os.path.exists(sidecar) or not os.path.exists(path):
+        return None
+
+    try:
+        with open(sidecar, 'r') as infile:
+            info = json.load(infile)
+    except ValueError:
+        return None
+
+    if info.get('version') != VERSION:
+        return None
+    if [info.get('size'), info.get('mtime')] != list(_stat(path)):
+        return None
+    return info
+
+
+def _month_range(info, start, end):
+    """ Byte range of the months of a compiled file that hold the rows
+    between `start` and `end`.
+    """
+    months = info['months']
+    first = 0
+    if start is not None:
+        key = pandas.Timestamp(start).strftime('%Y-%m')
+        first = sum(1 for month in months if month[0] < key)
+
+    last = len(months)
+    if end is not None:
+        key = pandas.Timestamp(end).strftime('%Y-%m')
+        last = sum(1 for month in months if month[0] <= key)
+
+    begin = months[first][1] if first < len(months) else info['size']
+    stop = months[last][1] if last < len(months) else info['size']
+    return begin, max(begin, stop)
+
+
+def readCompiled(path, start=None, end=None, info=None):
+    """ Load a compiled file, or the rows between two times.
+
+    Parameters
+    ----------
+    path : string
+    start, end : date strings or datetimes, optional
+        The first and last times to load (both included). By default,
+        the whole file.
+    info : dict, optional
+        The sidecar of the file, if it was already read.
+
+    Returns
+    -------
+    data : pandas.DataFrame
+
+    """
+    if start is None and end is None:
+        return pandas.read_csv(path, index_col=0, parse_dates=True)
+
+    if info is None:
+        info = readManifest(path)
+
+    if info is not None:
+        # only parse the header and the months that are needed
+        begin, stop = _month_range(info, start, end)
+        with open(path, 'rb') as infile:
+            header = infile.read(info['header'])
+            infile.seek(begin)
+            body = infile.read(stop - begin)
+        data = pandas.read_csv(io.BytesIO(header + body), index_col=0, parse_dates=True)
+        return data.loc[start:end]
+
+    chunks = []
+    reader = pandas.read_csv(path, index_col=0, parse_dates=True, chunksize=_CHUNKSIZE)
+    for chunk in reader:
+        chunks.append(chunk.loc[start:end])
+        if end is not None and chunk.shape[0] and chunk.index[-1] > pandas.Timestamp(end):
+            break
+
+    if not chunks:
+        return pandas.read_csv(path, index_col=0, parse_dates=True)
+    return pandas.concat(chunks)
@@ -5,6 +5,7 @@ import sys
 import datetime
 import string
 from .datatypes import *
+from .telemetry import HandlerStats, clock
 
 #!/usr/bin/env python
 #
@@ -233,13 +234,14 @@ loc_terms = [ ("OHD", "overhead"),
               ("AND", "and"),
               ("VC", "nearby") ]
 
+_LOC_TERMS = dict(loc_terms)
+_LOC_RE = re.compile("|".join(re.escape(code) for code, english in loc_terms))
+
 def xlate_loc( loc ):
   """
   Substitute English terms for the location codes in the given string.
   """
-  for code, english in loc_terms:
-      loc = loc.replace(code,english)
-  return loc
+  return _LOC_RE.sub(lambda m: _LOC_TERMS[m.group()], loc)
 
 ## translation of the sky-condition codes into english
 
@@ -366,14 +368,31 @@ REPORT_TYPE = {
 
 ## Helper functions
 
-def _report_match(handler,match):
-  """
-  Report success or failure of the given handler function. (DEBUG)
-  """
-  if match:
-      print(handler.__name__," matched '"+match+"'")
-  else:
-      print(handler.__name__," didn't match...")
+class _HandlerFailure(Exception):
+    """
+    Raised by the parsing loops with the handler that failed, the code it
+    failed on and the original exception.
+    """
+
+class _Tracer(object):
+    """
+    Prints every attempted match (the module-level `debug` flag), passing
+    the statistics on to `stats` if it isn't None.
+    """
+    def __init__(self, stats=None):
+        self.stats = stats
+
+    def record(self, section, handler, match, seconds):
+        if match is not None:
+            print(handler," matched '"+match+"'")
+        else:
+            print(handler," didn't match...")
+        if self.stats is not None:
+            self.stats.record(section, handler, match, seconds)
+
+    def report(self, seconds):
+        if self.stats is not None:
+            self.stats.report(seconds)
 
 def _unparsedGroup(self, d):
     """
@@ -381,9 +400,120 @@ def _unparsedGroup(self, d):
     """
     self._unparsed_groups.append(d['group'])
 
-## METAR report objects
+## Decoding and phrase tables
+##
+## Present-weather groups and sky conditions come from small vocabularies,
+## so each one is decoded (or described) the first time it is seen and
+## reused after that.
+
+_WEATHER_TABLE = {}
+_SKY_PHRASES = {}
+_MAX_PHRASES = 10000  # garbage can repeat weather codes without end
+
+def _lookup_weather(d):
+    """
+    Return the shared PresentWeather of a present-weather group.
+    """
+    key = (d['int'], d['desc'], d['prec'], d['obsc'], d['other'], d['int2'])
+    weather = _WEATHER_TABLE.get(key)
+    if weather is None:
+        weather = PresentWeather(d)
+        if len(_WEATHER_TABLE) < _MAX_PHRASES:
+            _WEATHER_TABLE[key] = weather
+    return weather
+
+def _weather_phrase(weather):
+    """
+    Return the description of a PresentWeather group.
+    """
+    (inteni,desci,preci,obsci,otheri) = weather.info
+    code = " ".join(part for part in weather.info if part)
+    if code in WEATHER_SPECIAL:
+        return WEATHER_SPECIAL[code]
+
+    text_parts = []
+    for part, text in ((inteni, weather.intensity),
+                       (desci, weather.description),
+                       (preci, weather.precip),
+                       (obsci, weather.obscuration),
+                       (otheri, weather.other)):
+        # unknown codes (e.g. a lone "/") have no text
+        if part and text is not None:
+            text_parts.append(text)
+    return " ".join(text_parts)
+
+def _sky_phrase(cover, height, cloud):
+    """
+    Return the description of a sky-condition tuple.
+    """
+    if height is None:
+        key = (cover, cloud, None)
+    else:
+        key = (cover, cloud, height._value, height._units, height._gtlt,
+               height._num, height._den)
+
+    phrase = _SKY_PHRASES.get(key)
+    if phrase is None:
+        if cover == "SKC" or cover == "CLR":
+            phrase = SKY_COVER[cover]
+        else:
+            if cloud:
+                what = CLOUD_TYPE[cloud]
+            elif cover != "OVC":
+                what = "clouds"
+            else:
+                what = ""
+
+            if cover == "VV":
+                phrase = "%s%s, visibility to %s" % (SKY_COVER[cover],what,str(height))
+            else:
+                phrase = "%s%s at %s" % (SKY_COVER[cover],what,str(height))
 
-debug = False
+        if len(_SKY_PHRASES) < _MAX_PHRASES:
+            _SKY_PHRASES[key] = phrase
+    return phrase
+
+## Instrumentation
+
+debug = False     # print every attempted match
+_stats = None     # HandlerStats of the instrumented parser, if enabled
+
+# the trend groups all share one handler, so their statistics are
+# recorded under the names of their patterns instead
+_PATTERN_NAMES = dict((pattern, name) for name, pattern in list(globals().items())
+                      if name.endswith('_RE'))
+
+def enableInstrumentation(stats=None):
+    """
+    Record handler statistics of every report parsed from now on.
+
+    Parameters
+    ----------
+    stats : metar.telemetry.HandlerStats, optional
+        Where to record the statistics. By default, a new one is
+        created.
+
+    Returns
+    -------
+    stats : metar.telemetry.HandlerStats
+
+    """
+    global _stats
+    if stats is None:
+        stats = HandlerStats()
+    _stats = stats
+    return stats
+
+def disableInstrumentation():
+    """
+    Go back to the uninstrumented parser, returning the statistics that
+    were being recorded (or None).
+    """
+    global _stats
+    stats, _stats = _stats, None
+    return stats
+
+## METAR report objects
 
 class Metar(object):
     """
@@ -391,9 +521,14 @@ class Metar(object):
     """
 
     def __init__(self, metarcode, month=None, year=None,
-                 utcdelta=None, errorfile=None, allexceptions=False):
+                 utcdelta=None, errorfile=None, allexceptions=False,
+                 errors=None):
         """
         Parse raw METAR code.
+
+        Groups that can't be parsed are reported to `errors` (a
+        metar.telemetry.ErrorCollector) if given, otherwise they are
+        written to `errorfile`, raised (if `allexceptions`) or printed.
         """
         self.code = metarcode              # original METAR code
         self.type = 'METAR'                # METAR (routine) or SPECI (special)
@@ -447,6 +582,49 @@ class Metar(object):
         self._year = year
 
         code = self.code+" "    # (the regexps all expect trailing spaces...)
+        try:
+            if _stats is None and not debug:
+                self._parse_groups(code)
+            else:
+                stats = _stats
+                if debug:
+                    stats = _Tracer(stats)
+                self._parse_groups_instrumented(code, stats)
+
+        except _HandlerFailure as failure:
+            handler, code, err = failure.args
+            if errors is not None:
+                errors.failed(handler.__name__, self.code)
+            else:
+                msg = "%s failed while processing '%s' in '%s'" % \
+                        (handler.__name__, code, self.code)
+                if errorfile is not None:
+                    errorfile.write(msg)
+                else:
+                    print(msg)
+                    raise ParserError("{0} failed while processing '{1}'".format(handler.__name__, "'\n'".join(err.args)))
+                    raise err
+        if self._unparsed_groups:
+            code = ' '.join(self._unparsed_groups)
+            if errors is not None:
+                errors.unparsed(code, self.code)
+            else:
+                msg = "Unparsed groups: '%s' in '%s'\n" % (code, self.code)
+                if errorfile is not None:
+                    errorfile.write(msg)
+                elif allexceptions:
+                    raise ParserError(msg)
+                else:
+                    print('[WARNING]', msg)
+
+    def _parse_groups(self, code):
+        """
+        Run the main-body, trend and remark handlers over the groups of
+        `code`. This is the hot loop of the parser:
+        `_parse_groups_instrumented` is the same loop, with every handler
+        timed, and any change here must be made there too.
+        """
+        handler = None
         try:
             ngroup = len(Metar.handlers)
             igroup = 0
@@ -454,17 +632,10 @@ class Metar(object):
 
             while igroup < ngroup and code:
                 pattern, handler, repeatable = Metar.handlers[igroup]
-
-                if debug:
-                    print(handler.__name__,":",code)
-
                 m = pattern.match(code)
 
                 while m:
                     ifailed = -1
-
-                    if debug:
-                        _report_match(handler,m.group())
                     handler(self,m.groupdict())
                     code = code[m.end():]
 
@@ -474,9 +645,6 @@ class Metar(object):
                     if not repeatable:
                         break
 
-                    if debug:
-                        print(handler.__name__,":",code)
-
                     m = pattern.match(code)
 
                 if not m and ifailed < 0:
@@ -486,12 +654,7 @@ class Metar(object):
                 if igroup == ngroup and not m:
                     # print "** it's not a main-body group **"
                     pattern, handler = (UNPARSED_RE, _unparsedGroup)
-                    if debug:
-                        print(handler.__name__,":",code)
                     m = pattern.match(code)
-                    if debug:
-                        _report_match(handler,m.group())
-
                     handler(self,m.groupdict())
                     code = code[m.end():]
                     igroup = ifailed
@@ -501,57 +664,131 @@ class Metar(object):
             if pattern == REMARK_RE or self.press:
                 while code:
                     for pattern, handler in Metar.remark_handlers:
-                        if debug:
-                            print(handler.__name__,":",code)
-
                         m = pattern.match(code)
                         if m:
-                            if debug:
-                                _report_match(handler,m.group())
+                            handler(self,m.groupdict())
+                            code = pattern.sub("",code,1)
+                            break
 
+        except Exception as err:
+            raise _HandlerFailure(handler, code, err)
+
+    def _parse_groups_instrumented(self, code, stats):
+        """
+        `_parse_groups`, recording every attempted match in `stats`
+        (see `metar.telemetry.HandlerStats`).
+        """
+        handler = None
+        start = clock()
+        try:
+            ngroup = len(Metar.handlers)
+            igroup = 0
+            ifailed = -1
+
+            while igroup < ngroup and code:
+                pattern, handler, repeatable = Metar.handlers[igroup]
+                tic = clock()
+                m = pattern.match(code)
+
+                while m:
+                    ifailed = -1
+                    handler(self,m.groupdict())
+                    stats.record('main', handler.__name__, m.group(), clock() - tic)
+                    code = code[m.end():]
+
+                    if self._trend:
+                        code = self._do_trend_handlers_instrumented(code, stats)
+
+                    if not repeatable:
+                        break
+
+                    tic = clock()
+                    m = pattern.match(code)
+
+                if not m:
+                    stats.record('main', handler.__name__, None, clock() - tic)
+                    if ifailed < 0:
+                        ifailed = igroup
+
+                igroup += 1
+                if igroup == ngroup and not m:
+                    pattern, handler = (UNPARSED_RE, _unparsedGroup)
+                    tic = clock()
+                    m = pattern.match(code)
+                    handler(self,m.groupdict())
+                    stats.record('main', handler.__name__, m.group(), clock() - tic)
+                    code = code[m.end():]
+                    igroup = ifailed
+                    ifailed = -2
+
+            if pattern == REMARK_RE or self.press:
+                while code:
+                    for pattern, handler in Metar.remark_handlers:
+                        tic = clock()
+                        m = pattern.match(code)
+                        if m:
                             handler(self,m.groupdict())
+                            stats.record('remark', handler.__name__, m.group(), clock() - tic)
                             code = pattern.sub("",code,1)
                             break
+                        stats.record('remark', handler.__name__, None, clock() - tic)
 
         except Exception as err:
-            msg = "%s failed while processing '%s' in '%s'" % \
-                    (handler.__name__, code, self.code)
-            if errorfile is not None:
-                errorfile.write(msg)
-            else:
-                print(msg)
-                raise ParserError("{0} failed while processing '{1}'".format(handler.__name__, "'\n'".join(err.args)))
-                raise err
-        if self._unparsed_groups:
-            code = ' '.join(self._unparsed_groups)
-            msg = "Unparsed groups: '%s' in '%s'\n" % (code, self.code)
-            if errorfile is not None:
-                errorfile.write(msg)
-            elif allexceptions:
-                raise ParserError(msg)
-            else:
-                print('[WARNING]', msg)
+            raise _HandlerFailure(handler, code, err)
+
+        finally:
+            stats.report(clock() - start)
 
     def _do_trend_handlers(self, code):
         for pattern, handler, repeatable in Metar.trend_handlers:
-            if debug:
-                print(handler.__name__,":",code)
+            m = pattern.match(code)
+            while m:
+                self._trend_groups.append(m.group().strip())
+                handler(self,m.groupdict())
+                code = code[m.end():]
+                if not repeatable:
+                    break
+                m = pattern.match(code)
+        return code
 
+    def _do_trend_handlers_instrumented(self, code, stats):
+        for pattern, handler, repeatable in Metar.trend_handlers:
+            name = _PATTERN_NAMES.get(pattern, handler.__name__)
+            tic = clock()
             m = pattern.match(code)
             while m:
-                if debug:
-                    _report_match(handler, m.group())
                 self._trend_groups.append(m.group().strip())
                 handler(self,m.groupdict())
+                stats.record('trend', name, m.group(), clock() - tic)
                 code = code[m.end():]
                 if not repeatable:
                     break
+                tic = clock()
                 m = pattern.match(code)
+            if not m:
+                stats.record('trend', name, None, clock() - tic)
         return code
 
     def __str__(self):
         return self.string()
 
+    def to_bytes(self):
+        """
+        Encode the decoded report as a compact binary record (see
+        metar.records), e.g. to hand it to another process.
+        """
+        from . import records
+        return records.toBytes(self)
+
+    @staticmethod
+    def from_bytes(data):
+        """
+        Rebuild a Metar from a record of to_bytes, without parsing it
+        again.
+        """
+        from . import records
+        return records.fromBytes(data)
+
     def _handleType(self, d):
         """
         Parse the code-type group.
@@ -716,7 +953,13 @@ class Metar(object):
             self.runway.append((name,low,high))
 
     def _handleWeather(self, d):
-        self.weather.append(PresentWeather(d))
+        """
+        Parse a present-weather group.
+
+        The following attributes are set:
+            weather    [list of PresentWeather, shared between reports]
+        """
+        self.weather.append(_lookup_weather(d))
 
     def _handleSky(self, d):
         """
@@ -1306,66 +1549,14 @@ class Metar(object):
         """
         Return a textual description of the present weather.
         """
-        text_list = []
-        for weatheri in self.weather:
-            (inteni,desci,preci,obsci,otheri) = weatheri.info
-            text_parts = []
-            code_parts = []
-            if inteni:
-                code_parts.append(inteni)
-                text_parts.append(weatheri.intensity)
-
-            if desci:
-                code_parts.append(desci)
-                text_parts.append(weatheri.description)
-
-            if preci:
-                code_parts.append(preci)
-                text_parts.append(weatheri.precip)
-
-            if obsci:
-                code_parts.append(obsci)
-                text_parts.append(weatheri.obscuration)
-
-            if otheri:
-                code_parts.append(otheri)
-                text_parts.append(weatheri.other)
-                
-            code = " ".join(code_parts)
-
-            if code in WEATHER_SPECIAL:
-                text_list.append(WEATHER_SPECIAL[code])
-            else:
-                text_list.append(" ".join(text_parts))
-
-        return "; ".join(text_list)
+        return "; ".join([weatheri.phrase for weatheri in self.weather if weatheri.phrase])
 
     def sky_conditions( self, sep="; " ):
         """
         Return a textual description of the sky conditions.
         """
-        text_list = []
-        for skyi in self.sky:
-            (cover,height,cloud) = skyi
-
-            if cover == "SKC" or cover == "CLR":
-                text_list.append(SKY_COVER[cover])
-            else:
-                if cloud:
-                    what = CLOUD_TYPE[cloud]
-                elif cover != "OVC":
-                    what = "clouds"
-                else:
-                    what = ""
-
-                if cover == "VV":
-                    text_list.append("%s%s, visibility to %s" % \
-                          (SKY_COVER[cover],what,str(height)))
-                else:
-                    text_list.append("%s%s at %s" %
-                          (SKY_COVER[cover],what,str(height)))
-
-        return sep.join(text_list)
+        return sep.join([_sky_phrase(cover, height, cloud)
+                         for cover, height, cloud in self.sky])
 
     def trend(self):
         """
@@ -1379,62 +1570,82 @@ class Metar(object):
         """
         return sep.join(self._remarks)
 
-class PresentWeather:
+class PresentWeather(object):
+    """
+    A decoded present-weather group.
+
+    Identical groups share one (read-only) instance, so its attributes
+    can't be changed.
+    """
+    __slots__ = ('intensity', 'description', 'precip', 'obscuration',
+                 'other', 'info', 'phrase')
 
     def __init__(self, d):
         self._parse_group(d)
 
+    def __setattr__(self, name, value):
+        raise AttributeError("PresentWeather is read-only")
+
+    def __getstate__(self):
+        return dict((name, getattr(self, name)) for name in self.__slots__)
+
+    def __setstate__(self, state):
+        for name, value in state.items():
+            object.__setattr__(self, name, value)
+
     def _parse_group(self, d):
         """
         Parse a present-weather group.
 
         The following attributes are set:
-            weather    [list of tuples]
-            .  intensity     [string]
-            .  description   [string]
-            .  precipitation [string]
-            .  obscuration   [string]
-            .  other         [string]
+            intensity      [string]
+            description    [string]
+            precip         [string]
+            obscuration    [string]
+            other          [string]
+            info           [tuple of the codes of each of the above]
+            phrase         [string, see Metar.present_weather]
         """
-        for attr in ['intensity', 'description', 'precip', 'obscuration', 'other']:
-            setattr(self, attr, None)
-            
+        values = dict.fromkeys(self.__slots__)
+
         intensity = d['int']
         if not intensity and d['int2']:
             intensity = d['int2']
         if intensity:
-            self.intensity = WEATHER_INT[intensity]
+            values['intensity'] = WEATHER_INT[intensity]
 
         description = d['desc']
         precip = d['prec']
         if description:
             if description == "SH":
-                self.description = WEATHER_DESC[description]
-            elif description != "SH" or not preci:
-                self.description = WEATHER_DESC[description[0:2]]
+                values['description'] = WEATHER_DESC[description]
+            elif description != "SH" or not precip:
+                values['description'] = WEATHER_DESC[description[0:2]]
                 if len(description) == 4:
-                    self.description += WEATHER_DESC[description[2:]]
-                
+                    values['description'] += WEATHER_DESC[description[2:]]
+
         if precip:
             if len(precip) == 2:
-                self.precip = WEATHER_PREC[precip]
+                values['precip'] = WEATHER_PREC[precip]
             elif len(precip) == 4:
-                self.precip = WEATHER_PREC[precip[:2]]+" and "
-                self.precip += WEATHER_PREC[precip[2:]]
+                values['precip'] = WEATHER_PREC[precip[:2]]+" and "+WEATHER_PREC[precip[2:]]
             elif len(precip) == 6:
-                self.precip = WEATHER_PREC[precip[:2]]+", "
-                self.precip += WEATHER_PREC[precip[2:4]]+" and "
-                self.precip += WEATHER_PREC[precip[4:]]
-  
+                values['precip'] = (WEATHER_PREC[precip[:2]]+", "+
+                                    WEATHER_PREC[precip[2:4]]+" and "+
+                                    WEATHER_PREC[precip[4:]])
+
         obsci = d['obsc']
         if obsci:
-            self.obscuration = WEATHER_OBSC[obsci]
+            values['obscuration'] = WEATHER_OBSC[obsci]
 
         otheri = d['other']
         if otheri:
-            self.other = WEATHER_OTHER[otheri]
+            values['other'] = WEATHER_OTHER[otheri]
 
-        self.info = (intensity,description,precip,obsci,otheri)
+        values['info'] = (intensity,description,precip,obsci,otheri)
+        for name in self.__slots__:
+            object.__setattr__(self, name, values[name])
+        object.__setattr__(self, 'phrase', _weather_phrase(self))
 
 
 class ProgressBar:
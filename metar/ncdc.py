@@ -26,15 +26,92 @@ import seaborn
 
 
 def getPctAvail(grid, coopid):
-    status = grid.unstack()
-    groups = status.groupby(level='Yr')
-    pct_avail = groups.apply(lambda x:
-        x.value_counts().to_dict().get(0, 0) / float(x.count()) * 100
-    )
-    pct_avail.name = coopid
+    values = grid.values
+    available = (values == 0).sum(axis=1)
+    count = (~np.isnan(values)).sum(axis=1)
+    pct_avail = pandas.Series(available / count.astype(float) * 100,
+                              index=grid.index, name=coopid)
     return pandas.DataFrame(pct_avail)
 
 
+# first day of each month (0-based) in a leap year
+_MONTH_OFFSETS = np.cumsum([0, 31, 29, 31, 30, 31, 30, 31, 31, 30, 31, 30])
+
+
+def _statusGrid(dates, status):
+    '''
+    pivots the hourly *status* at *dates* into a year by
+    month-day-hour grid in a single pass
+    '''
+    dates = np.asarray(dates, dtype='datetime64[h]')
+    years = dates.astype('datetime64[Y]')
+    months = dates.astype('datetime64[M]')
+    days = dates.astype('datetime64[D]')
+    monthnum = (months - years).astype(int)
+    daynum = (days - months).astype(int)
+    hournum = (dates - days).astype(int)
+
+    # position of each hour in a leap year, then the row of each year
+    hourofyear = (_MONTH_OFFSETS[monthnum] + daynum) * 24 + hournum
+    yearcodes, yearidx = np.unique(years.astype(int), return_inverse=True)
+
+    grid = np.empty((yearcodes.shape[0], 366 * 24))
+    grid.fill(np.nan)
+    grid[yearidx, hourofyear] = status
+    return _gridFrame(grid, 1970 + yearcodes)
+
+
+def _intervalGrid(intervals):
+    '''
+    same grid as _statusGrid, filled one year at a time straight from
+    the *intervals* of setupStationIntervals
+    '''
+    starts = _toHours(intervals['start'])
+    stops = _toHours(intervals['end'])
+    status = np.asarray(intervals['status'], dtype=float)
+
+    years = _intervalYears(intervals)
+    grid = np.empty((years.shape[0], 366 * 24))
+    grid.fill(np.nan)
+    # hour of the year at which Feb 29 would start
+    leapday = _MONTH_OFFSETS[2] * 24 - 24
+    for row, year in enumerate(years):
+        yearstart, yearstop = np.array(['{:d}-01-01'.format(year), '{:d}-01-01'.format(year + 1)],
+                                       dtype='datetime64[h]').astype(np.int64)
+        lo, hi = max(yearstart, starts[0]), min(yearstop, stops[-1])
+        if lo >= hi:
+            continue
+
+        # the runs that overlap the year, clipped to it
+        first = np.searchsorted(starts, lo, side='right') - 1
+        last = np.searchsorted(starts, hi, side='left')
+        lengths = np.minimum(stops[first:last], hi) - np.maximum(starts[first:last], lo)
+        hours = np.arange(lo, hi) - yearstart
+        if (yearstop - yearstart) < 366 * 24:
+            hours[hours >= leapday] += 24
+        grid[row, hours] = np.repeat(status[first:last], lengths)
+    return _gridFrame(grid, years)
+
+
+def _intervalYears(intervals):
+    # the end of the last interval is exclusive
+    lasthour = intervals['end'].iloc[-1] - pandas.Timedelta(hours=1)
+    return np.arange(intervals['start'].iloc[0].year, lasthour.year + 1)
+
+
+def _gridFrame(grid, years):
+    # only keep the month-day-hours that show up in the data
+    columns = (~np.isnan(grid)).any(axis=0)
+    template = pandas.date_range(start='2000-01-01', periods=366 * 24,
+                                 freq=pandas.offsets.Hour(1))
+    moDayHr = [d.strftime('%m-%d-%H:%M') for d in template[columns]]
+    return pandas.DataFrame(
+        grid[:, columns],
+        index=pandas.Index([str(yr) for yr in years], name='Yr'),
+        columns=pandas.Index(moDayHr, name='MoDayHr')
+    )
+
+
 def xdates(x, pos):
     day = x/24.
     date = mdates.num2date(1+x/24.)
@@ -111,6 +188,222 @@ def setupStationData(dataframe, coopid, dumpcsv=False, datecol='DATE',
     return station_data, stationname
 
 
+# status codes used by setDataStatus/setupStationData, in order of
+# increasing precedence
+_STATUS_FLAGS = [
+    ('a', 'A', 1),  # accumulated
+    ('{', '}', 2),  # deleted
+    ('[', ']', 3),  # missing
+]
+
+
+def _toHours(dates):
+    return np.asarray(dates, dtype='datetime64[h]').astype(np.int64)
+
+
+def _fromHours(hours):
+    return pandas.DatetimeIndex(np.asarray(hours, dtype='datetime64[h]'))
+
+
+def _mergeRuns(starts, stops, values):
+    # collapse adjacent intervals that share a value
+    if starts.shape[0] == 0:
+        return starts, stops, values
+    newrun = np.ones(starts.shape[0], dtype=bool)
+    newrun[1:] = (values[1:] != values[:-1]) | (starts[1:] != stops[:-1])
+    last = np.concatenate([np.nonzero(newrun)[0][1:] - 1, [starts.shape[0] - 1]])
+    return starts[newrun], stops[last], values[newrun]
+
+
+def _flagSpans(hours, flags, opener, closer, end):
+    '''
+    run-length equivalent of setDataStatus: returns the start and stop
+    (exclusive) hours of the spans that setDataStatus would mark, given
+    the sorted integer *hours* and *flags* of the flagged records only.
+    '''
+    isclose = flags == closer
+    inside = np.cumsum(flags == opener) == np.cumsum(isclose) + 1
+
+    # each record's own hour, followed by the gap up to the next record
+    n = hours.shape[0]
+    starts = np.empty(2 * n, dtype=np.int64)
+    stops = np.empty(2 * n, dtype=np.int64)
+    starts[0::2] = hours
+    starts[1::2] = hours + 1
+    stops[0::2] = hours + 1
+    stops[1:-1:2] = hours[1:]
+    stops[-1] = max(end, hours[-1] + 1)
+    marked = np.empty(2 * n, dtype=bool)
+    marked[0::2] = inside | isclose
+    marked[1::2] = inside
+
+    keep = marked & (stops > starts)
+    starts, stops, _ = _mergeRuns(starts[keep], stops[keep],
+                                  np.ones(keep.sum(), dtype=bool))
+    return starts, stops
+
+
+def setupStationIntervals(dataframe, coopid, datecol='DATE',
+                          stationcol='STATION', stanamecol='STATION_NAME',
+                          precipcol='HPCP', qualcol='Measurement Flag',
+                          baseyear=1947, futureyear=2015):
+    '''
+    Run-length version of setupStationData. Rather than reindexing the
+    station's data onto every hour from *baseyear* through *futureyear*,
+    the status of the data (0 = available, 1 = accumulated, 2 = deleted,
+    3 = missing) is returned as a dataframe of contiguous intervals with
+    `start`, `end` (exclusive), `hours`, and `status` columns.
+    '''
+    station_data = dataframe[dataframe[stationcol] == coopid]
+    stationname = station_data[stanamecol].iloc[0]
+
+    hours = _toHours(station_data[datecol])
+    order = np.argsort(hours, kind='mergesort')
+    hours = hours[order]
+    flags = np.asarray(station_data[qualcol], dtype=object)[order]
+    precip = np.asarray(station_data[precipcol], dtype=float)[order]
+
+    # sometime the initial 'a' flags are missing. this inserts them:
+    flags = np.where((flags == ' ') & (precip == 99999), 'a', flags)
+
+    # pad the data with missing periods before and after the record
+    origin = _toHours([datetime.datetime(baseyear, 10, 1)])[0]
+    end = _toHours([datetime.datetime(futureyear, 12, 31, 23)])[0] + 1
+    hours = np.concatenate([[origin, hours[0] - 1], hours, [hours[-1] + 1, end - 1]])
+    flags = np.concatenate([['[', ']'], flags, ['[', ']']])
+
+    # paint each status over the available data in order of precedence
+    spans = [_flagSpans(hours, flags, opener, closer, end)
+             for opener, closer, flagval in _STATUS_FLAGS]
+    bounds = np.unique(np.concatenate([[origin, end]] + [s for span in spans for s in span]))
+    bounds = bounds[(bounds >= origin) & (bounds <= end)]
+    starts, stops = bounds[:-1], bounds[1:]
+    status = np.zeros(starts.shape[0], dtype=np.int8)
+    for (spanstarts, spanstops), (_, _, flagval) in zip(spans, _STATUS_FLAGS):
+        if spanstarts.shape[0] > 0:
+            idx = np.searchsorted(spanstarts, starts, side='right') - 1
+            covered = (idx >= 0) & (starts < spanstops[np.maximum(idx, 0)])
+            status[covered] = flagval
+
+    starts, stops, status = _mergeRuns(starts, stops, status)
+    intervals = pandas.DataFrame({
+        'start': _fromHours(starts),
+        'end': _fromHours(stops),
+        'hours': stops - starts,
+        'status': status,
+    }, columns=['start', 'end', 'hours', 'status'])
+
+    return intervals, stationname
+
+
+def _cumulativeHours(starts, stops, weights, when):
+    # total hours of the (weighted) intervals that elapse before *when*
+    cumhours = np.concatenate([[0], np.cumsum((stops - starts) * weights)])
+    idx = np.clip(np.searchsorted(starts, when, side='right') - 1, 0, starts.shape[0] - 1)
+    partial = np.clip(np.minimum(when, stops[idx]) - starts[idx], 0, None)
+    return cumhours[idx] + partial * weights[idx]
+
+
+def intervalStatus(intervals, dates=None):
+    '''
+    Looks up the data status of *dates* in the *intervals* from
+    setupStationIntervals. Dates outside of the intervals are
+    considered missing (3). If *dates* is None, every hour that the
+    intervals span is returned (i.e., the output of setupStationData),
+    which is as large as the dense frame; intervalPctAvail and
+    intervalAvailability summarize the intervals without it.
+    '''
+    starts = _toHours(intervals['start'])
+    stops = _toHours(intervals['end'])
+    status = np.asarray(intervals['status'], dtype=np.int8)
+    if dates is None:
+        dates = _fromHours(np.arange(starts[0], stops[-1]))
+        values = np.repeat(status, stops - starts)
+    else:
+        dates = pandas.DatetimeIndex(dates)
+        hours = _toHours(dates)
+        idx = np.clip(np.searchsorted(starts, hours, side='right') - 1, 0, None)
+        outside = (hours < starts[0]) | (hours >= stops[-1])
+        values = np.where(outside, 3, status[idx])
+
+    return pandas.DataFrame({'status': values}, index=dates)
+
+
+def intervalPctAvail(intervals, coopid):
+    '''
+    Computes the percent of each calendar year that data are available
+    (status 0) directly from the *intervals* from setupStationIntervals.
+    The output matches getPctAvail.
+    '''
+    starts = _toHours(intervals['start'])
+    stops = _toHours(intervals['end'])
+    available = (np.asarray(intervals['status']) == 0).astype(np.int64)
+
+    years = np.arange(intervals['start'].iloc[0].year, intervals['end'].iloc[-1].year + 1)
+    yearstarts = np.array(['{:d}-01-01'.format(yr) for yr in years] +
+                          ['{:d}-01-01'.format(years[-1] + 1)],
+                          dtype='datetime64[h]').astype(np.int64)
+    yearstarts = np.clip(yearstarts, starts[0], stops[-1])
+
+    totalhours = np.diff(yearstarts)
+    availhours = np.diff(_cumulativeHours(starts, stops, available, yearstarts))
+    keep = totalhours > 0
+
+    pct_avail = pandas.Series(availhours[keep] / totalhours[keep].astype(float) * 100,
+                              index=pandas.Index([str(yr) for yr in years[keep]], name='Yr'),
+                              name=coopid)
+    return pandas.DataFrame(pct_avail)
+
+
+def intervalAvailability(intervals, freq='M'):
+    '''
+    Computes the percent of each month (*freq* = 'M') or day ('D') of
+    each year that data are available (status 0) by clipping the
+    *intervals* from setupStationIntervals to the bounds of each cell,
+    i.e., without an hourly grid. Returns a year by month ('01'-'12') or
+    month-day ('01-01'-'12-31') dataframe; cells outside of the
+    intervals (and Feb 29 of common years) are NaN.
+    '''
+    starts = _toHours(intervals['start'])
+    stops = _toHours(intervals['end'])
+    available = (np.asarray(intervals['status']) == 0).astype(np.int64)
+
+    years = _intervalYears(intervals)
+    unit = {'M': 'M', 'D': 'D'}.get(freq)
+    if unit is None:
+        raise ValueError('freq must be "M" or "D"')
+    cells = np.arange(np.datetime64('{:d}-01-01'.format(years[0]), unit),
+                      np.datetime64('{:d}-01-01'.format(years[-1] + 1), unit) + 1)
+
+    bounds = np.clip(cells.astype('datetime64[h]').astype(np.int64), starts[0], stops[-1])
+    totalhours = np.diff(bounds)
+    availhours = np.diff(_cumulativeHours(starts, stops, available, bounds))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        pct = np.where(totalhours > 0, availhours / totalhours.astype(float) * 100, np.nan)
+
+    # row and column of each cell
+    cells = cells[:-1]
+    months = cells.astype('datetime64[M]')
+    rows = cells.astype('datetime64[Y]').astype(int) + 1970 - years[0]
+    monthnum = (months - months.astype('datetime64[Y]')).astype(int)
+    if freq == 'M':
+        cols = monthnum
+        labels = ['{:02d}'.format(month + 1) for month in range(12)]
+    else:
+        cols = _MONTH_OFFSETS[monthnum] + (cells - months.astype('datetime64[D]')).astype(int)
+        template = pandas.date_range(start='2000-01-01', periods=366, freq='D')
+        labels = [d.strftime('%m-%d') for d in template]
+
+    grid = np.empty((years.shape[0], len(labels)))
+    grid.fill(np.nan)
+    grid[rows, cols] = pct
+    return pandas.DataFrame(
+        grid,
+        index=pandas.Index([str(yr) for yr in years], name='Yr'),
+        columns=pandas.Index(labels, name='Mo' if freq == 'M' else 'MoDay'),
+    )
+
+
 def waterYear(dateval):
     october = 10
     if dateval.month >= october:
@@ -119,21 +412,55 @@ def waterYear(dateval):
         return dateval.year
 
 
-def summarizeStorms(stormdata, stormcol='storm', units='in',
-                    intensityfactor=1, datename=None):
-    def timediff(row, t2, t1, asdays=False):
-        secperhr = 60. * 60.
-        hrperday = 24
+def labelStorms(dataframe, precipcol='precip', stormcol='storm',
+                interevent=6, minprecip=0.0):
+    '''
+    Labels the storms in a precipitation time series. Storms are
+    separated by at least *interevent* hours without precipitation and
+    storms totaling less than *minprecip* are discarded. Returns a copy
+    of *dataframe* (which must have a DatetimeIndex) with a *stormcol*
+    column that is 0 between storms and 1, 2, ..., N during them,
+    suitable for summarizeStorms.
+    '''
+    precip = np.asarray(dataframe[precipcol], dtype=float)
+    hours = dataframe.index.values.astype('datetime64[m]').astype(np.int64) / 60.
+    labels = np.zeros(precip.shape[0], dtype=np.int64)
+
+    wet, = np.nonzero(precip > 0)
+    if wet.shape[0] > 0:
+        # dry time between consecutive wet observations (the time step of
+        # the data is subtracted so that hourly and 5-min data agree)
+        timestep = np.median(np.diff(hours)) if hours.shape[0] > 1 else 0
+        drytime = np.diff(hours[wet]) - timestep
+        newstorm = np.concatenate([[True], drytime >= interevent])
+        stormid = np.cumsum(newstorm)
+
+        # drop the small storms and renumber the rest
+        depth = np.bincount(stormid, weights=precip[wet])[1:]
+        keep = depth >= minprecip
+        newid = np.concatenate([[0], np.cumsum(keep) * keep])
+
+        # mark every row from the first to the last wet observation of each storm
+        first = wet[newstorm]
+        last = wet[np.concatenate([np.nonzero(newstorm)[0][1:] - 1, [wet.shape[0] - 1]])]
+        ids = newid[1:]
+        marker = np.zeros(precip.shape[0] + 1, dtype=np.int64)
+        marker[first] += ids
+        marker[last + 1] -= ids
+        labels = np.cumsum(marker)[:-1]
+
+    labeled = dataframe.copy()
+    labeled[stormcol] = labels
+    return labeled
+
+
+def _elapsed(later, earlier, units='h'):
+    # vectorized (later - earlier) in the given units; NaT gives NaN
+    return (later.values - earlier.values) / np.timedelta64(1, units)
 
-        if asdays:
-            conversion = secperhr * hrperday
-        else:
-            conversion = secperhr
-        if pandas.isnull(row[t2]) or pandas.isnull(row[t1]):
-            return np.nan
-        else:
-            return (row[t2] - row[t1]).total_seconds() / conversion
 
+def summarizeStorms(stormdata, stormcol='storm', units='in',
+                    intensityfactor=1, datename=None):
     if datename is None:
         datename = stormdata.index.names[0]
 
@@ -158,21 +485,16 @@ def summarizeStorms(stormdata, stormcol='storm', units='in',
                     ).rename(columns=column_names)
 
     if summary.shape[0] > 1:
-        secperhr = 60. * 60.
         # compute storm durations
-        summary['Duration Hours'] = summary.apply(
-            lambda row: timediff(row, 'End Date', 'Start Date', asdays=False),
-            axis=1
-        )
+        summary['Duration Hours'] = _elapsed(summary['End Date'],
+                                             summary['Start Date'], 'h')
 
         # fill in end date of previous storm
         summary['Previous Storm End'] = summary['End Date'].shift(1)
 
         # compute antecedant duration
-        summary['Antecedent Days'] = summary.apply(
-            lambda row: timediff(row, 'Start Date', 'Previous Storm End', asdays=True),
-            axis=1
-        )
+        summary['Antecedent Days'] = _elapsed(summary['Start Date'],
+                                              summary['Previous Storm End'], 'D')
 
         summary['Avg Inten.'] = (
             summary['Total'] / summary['Duration Hours'] * intensityfactor
@@ -190,23 +512,19 @@ def summarizeStorms(stormdata, stormcol='storm', units='in',
 
 
 def availabilityByStation(stationdata, stationname, coopid, baseyear=1947):
+    '''
+    Plots the hourly data status of a gauge. *stationdata* is either the
+    hourly dataframe from setupStationData or the intervals from
+    setupStationIntervals.
+    '''
 
     cooptxt = coopid.replace(':', '')
 
-    # reset in the index and compute year and month-day-hour representations of the date
-    stationdata = stationdata.reset_index()[['index', 'status']]
-    stationdata['Yr'] = stationdata['index'].apply(
-        lambda d: d.strftime('%Y')
-    )
-    stationdata['MoDayHr'] = stationdata['index'].apply(
-        lambda d: d.strftime('%m-%d-%H:%M')
-    )
-
-    # set those as the index, pull out only status data
-    stationdata = stationdata.set_index(['Yr', 'MoDayHr'])
-
     # pivot so that month-hour-years are columns
-    grid = stationdata.unstack(level='MoDayHr')['status']
+    if 'start' in stationdata.columns:
+        grid = _intervalGrid(stationdata)
+    else:
+        grid = _statusGrid(stationdata.index, stationdata['status'].values)
 
     # plotting
     fig = plt.figure(figsize=(6.5, 7.25))
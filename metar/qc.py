@@ -0,0 +1,313 @@
+"""
+Vectorized quality-control checks for station time series.
+
+Each check looks at whole columns of a station dataframe (as returned by
+`WeatherStation.getASOSData` and friends) and returns a boolean array
+with one element per row. `flagData` runs all of the checks described by
+a rules dictionary and packs the results into a single integer bitmask
+column so that suspect rows can be selected with, e.g.::
+
+    >>> data = qc.flagData(data)
+    >>> suspect = data[data['QCFlag'] & (qc.RANGE | qc.SPIKE) > 0]
+
+"""
+from __future__ import division
+
+import numpy as np
+import pandas
+
+__all__ = ['RANGE', 'STEP', 'SPIKE', 'PERSISTENCE', 'CONSISTENCY',
+           'DEFAULT_RULES', 'PRESSURE_COLUMNS', 'rangeCheck', 'stepCheck',
+           'spikeCheck', 'persistenceCheck', 'consistencyCheck', 'flagData',
+           'decodeFlag']
+
+# bits of the QC flag
+RANGE = 1
+STEP = 2
+SPIKE = 4
+PERSISTENCE = 8
+CONSISTENCY = 16
+
+FLAG_NAMES = {
+    RANGE: 'range',
+    STEP: 'step',
+    SPIKE: 'spike',
+    PERSISTENCE: 'persistence',
+    CONSISTENCY: 'consistency',
+}
+
+# Default plausibility rules for the columns written by WeatherStation.
+# Temperatures are in deg C, wind speeds in knots, pressures in inches of
+# mercury and precipitation depths in inches (i.e., the native units of
+# US ASOS reports). Stations write pressures in the units of their
+# reports, so those of Q-group (hPa) reports are converted first (see
+# `PRESSURE_COLUMNS`).
+DEFAULT_RULES = {
+    # (min, max) allowable values
+    'range': {
+        'Precip': (0.0, 10.0),
+        'Temp': (-60.0, 55.0),
+        'DewPnt': (-70.0, 35.0),
+        'WindSpd': (0.0, 150.0),
+        'WindDir': (0.0, 360.0),
+        'AtmPress': (26.0, 32.5),
+        'SkyCover': (0.0, 1.0),
+    },
+
+    # maximum change between consecutive reports
+    'step': {
+        'Temp': 10.0,
+        'DewPnt': 10.0,
+        'AtmPress': 0.3,
+    },
+
+    # maximum excursion of a single report away from both neighbors
+    'spike': {
+        'Temp': 6.0,
+        'DewPnt': 6.0,
+        'AtmPress': 0.15,
+    },
+
+    # maximum duration (hours) that a value may stay exactly the same
+    'persistence': {
+        'Temp': 12,
+        'DewPnt': 12,
+        'AtmPress': 12,
+    },
+
+    # (lesser, greater) pairs of columns
+    'consistency': [
+        ('DewPnt', 'Temp'),
+    ],
+
+    # reports further apart than this (hours) are not compared by the
+    # step and spike checks
+    'maxgap': 1,
+}
+
+
+# columns of pressures in inches of mercury or hectopascals. Values
+# above `_HPA_THRESHOLD` can only be hectopascals and are converted to
+# inches of mercury before they are checked.
+PRESSURE_COLUMNS = ('AtmPress',)
+_HPA_THRESHOLD = 100.0
+_HPA_PER_INHG = 33.8639
+
+
+def _values(dataframe, col):
+    values = np.asarray(dataframe[col], dtype=float)
+    if col in PRESSURE_COLUMNS:
+        with np.errstate(invalid='ignore'):
+            hpa = values > _HPA_THRESHOLD
+        if hpa.any():
+            values = np.where(hpa, values / _HPA_PER_INHG, values)
+    return values
+
+
+def _hours(dataframe):
+    if not isinstance(dataframe.index, pandas.DatetimeIndex):
+        raise ValueError('input `dataframe` must have a DatetimeIndex')
+    return dataframe.index.values.astype('datetime64[s]').astype(float) / 3600.
+
+
+def rangeCheck(dataframe, limits):
+    """ Flag rows with values outside of plausible limits.
+
+    Parameters
+    ----------
+    dataframe : pandas.DataFrame
+    limits : dict
+        Maps column names to (min, max) tuples. Columns missing from
+        `dataframe` are ignored.
+
+    Returns
+    -------
+    flagged : numpy array of bools
+
+    """
+    flagged = np.zeros(dataframe.shape[0], dtype=bool)
+    for col, (minval, maxval) in limits.items():
+        if col in dataframe.columns:
+            values = _values(dataframe, col)
+            with np.errstate(invalid='ignore'):
+                flagged |= (values < minval) | (values > maxval)
+    return flagged
+
+
+def stepCheck(dataframe, limits, maxgap=1):
+    """ Flag rows whose value jumps from the previous valid report.
+
+    Parameters
+    ----------
+    dataframe : pandas.DataFrame with a DatetimeIndex
+    limits : dict
+        Maps column names to the maximum absolute change allowed
+        between consecutive non-null reports.
+    maxgap : float, optional (default = 1)
+        Reports more than `maxgap` hours apart are not compared.
+
+    Returns
+    -------
+    flagged : numpy array of bools
+
+    """
+    hours = _hours(dataframe)
+    flagged = np.zeros(dataframe.shape[0], dtype=bool)
+    for col, limit in limits.items():
+        if col in dataframe.columns:
+            values = _values(dataframe, col)
+            valid, = np.nonzero(~np.isnan(values))
+            jump = np.abs(np.diff(values[valid])) > limit
+            close = np.diff(hours[valid]) <= maxgap
+            flagged[valid[1:][jump & close]] = True
+    return flagged
+
+
+def spikeCheck(dataframe, limits, maxgap=1):
+    """ Flag single reports that depart from both of their neighbors
+    in the same direction (i.e., up and then back down or vice versa).
+
+    Parameters
+    ----------
+    dataframe : pandas.DataFrame with a DatetimeIndex
+    limits : dict
+        Maps column names to the minimum excursion considered a spike.
+    maxgap : float, optional (default = 1)
+        Reports more than `maxgap` hours from either neighbor are not
+        checked.
+
+    Returns
+    -------
+    flagged : numpy array of bools
+
+    """
+    hours = _hours(dataframe)
+    flagged = np.zeros(dataframe.shape[0], dtype=bool)
+    for col, limit in limits.items():
+        if col in dataframe.columns:
+            values = _values(dataframe, col)
+            valid, = np.nonzero(~np.isnan(values))
+            if valid.shape[0] < 3:
+                continue
+
+            diffs = np.diff(values[valid])
+            gaps = np.diff(hours[valid])
+            before, after = diffs[:-1], diffs[1:]
+            spike = (
+                (np.abs(before) > limit) & (np.abs(after) > limit) &
+                (np.sign(before) != np.sign(after)) &
+                (gaps[:-1] <= maxgap) & (gaps[1:] <= maxgap)
+            )
+            flagged[valid[1:-1][spike]] = True
+    return flagged
+
+
+def persistenceCheck(dataframe, limits):
+    """ Flag runs of identical values that last too long (e.g., a stuck
+    sensor).
+
+    Parameters
+    ----------
+    dataframe : pandas.DataFrame with a DatetimeIndex
+    limits : dict
+        Maps column names to the maximum duration (hours) that a value
+        may repeat. Every row of a longer run is flagged.
+
+    Returns
+    -------
+    flagged : numpy array of bools
+
+    """
+    hours = _hours(dataframe)
+    flagged = np.zeros(dataframe.shape[0], dtype=bool)
+    for col, limit in limits.items():
+        if col in dataframe.columns:
+            values = _values(dataframe, col)
+            valid, = np.nonzero(~np.isnan(values))
+            if valid.shape[0] == 0:
+                continue
+
+            # label runs of identical values and find when each started
+            # and ended
+            vals = values[valid]
+            newrun = np.concatenate([[True], vals[1:] != vals[:-1]])
+            runid = np.cumsum(newrun) - 1
+            starts = np.nonzero(newrun)[0]
+            ends = np.concatenate([starts[1:], [vals.shape[0]]]) - 1
+            duration = hours[valid][ends] - hours[valid][starts]
+            flagged[valid[(duration > limit)[runid]]] = True
+    return flagged
+
+
+def consistencyCheck(dataframe, pairs):
+    """ Flag rows where one column exceeds another that it never should
+    (e.g., the dew point exceeding the temperature).
+
+    Parameters
+    ----------
+    dataframe : pandas.DataFrame
+    pairs : list of tuples
+        (lesser, greater) column names. Pairs involving a column that is
+        missing from `dataframe` are ignored.
+
+    Returns
+    -------
+    flagged : numpy array of bools
+
+    """
+    flagged = np.zeros(dataframe.shape[0], dtype=bool)
+    for lesser, greater in pairs:
+        if lesser in dataframe.columns and greater in dataframe.columns:
+            with np.errstate(invalid='ignore'):
+                flagged |= _values(dataframe, lesser) > _values(dataframe, greater)
+    return flagged
+
+
+def flagData(dataframe, rules=None, flagcol='QCFlag'):
+    """ Run all of the QC checks over a station dataframe.
+
+    Parameters
+    ----------
+    dataframe : pandas.DataFrame with a DatetimeIndex
+    rules : dict, optional
+        Rules that update `DEFAULT_RULES`. Each check is configured by a
+        key of the same name ('range', 'step', 'spike', 'persistence',
+        'consistency'); setting a check's rules to None disables it.
+    flagcol : string, optional (default = 'QCFlag')
+        Name of the bitmask column added to the output.
+
+    Returns
+    -------
+    flagged : pandas.DataFrame
+        Copy of `dataframe` with an integer `flagcol` column where each
+        bit (RANGE, STEP, SPIKE, PERSISTENCE, CONSISTENCY) indicates a
+        failed check.
+
+    """
+    _rules = DEFAULT_RULES.copy()
+    if rules is not None:
+        _rules.update(rules)
+
+    maxgap = _rules['maxgap']
+    checks = [
+        (RANGE, 'range', lambda df, r: rangeCheck(df, r)),
+        (STEP, 'step', lambda df, r: stepCheck(df, r, maxgap=maxgap)),
+        (SPIKE, 'spike', lambda df, r: spikeCheck(df, r, maxgap=maxgap)),
+        (PERSISTENCE, 'persistence', lambda df, r: persistenceCheck(df, r)),
+        (CONSISTENCY, 'consistency', lambda df, r: consistencyCheck(df, r)),
+    ]
+
+    flags = np.zeros(dataframe.shape[0], dtype=np.uint8)
+    for bit, name, check in checks:
+        if _rules.get(name):
+            flags[check(dataframe, _rules[name])] |= bit
+
+    flagged = dataframe.copy()
+    flagged[flagcol] = flags
+    return flagged
+
+
+def decodeFlag(flag):
+    """ Return the names of the checks that failed for a QC flag value.
+    """
+    return [FLAG_NAMES[bit] for bit in sorted(FLAG_NAMES) if int(flag) & bit]
@@ -0,0 +1,533 @@
+"""
+Compact binary records of parsed METAR reports.
+
+Pickling a `metar.metar.Metar` stores every attribute of the report and
+of each of its datatype objects by name, so a single report takes a
+couple of kilobytes. `toBytes` encodes it in a versioned binary record
+instead, and `fromBytes` rebuilds the report without parsing it again::
+
+    >>> from metar import metar, records
+    >>> obs = metar.Metar('METAR KPDX 010053Z 31008KT 10SM FEW035 04/02 A3026')
+    >>> data = records.toBytes(obs)       # or obs.to_bytes()
+    >>> records.fromBytes(data).string() == obs.string()
+    True
+
+`batchToBytes` and `batchFromBytes` do the same for a list of reports,
+e.g. to return the results of a `multiprocessing` pool, cache a parsed
+archive on disk or send it over a socket.
+
+A record holds, in this order:
+
+* a fixed header: the magic ``MR``, the format version, flags, a bit
+  mask of the attributes that are set (see `FIELDS`), the length of
+  each list attribute, the number of strings in the record and the
+  size of their text
+* the length of each string
+* the attributes that are set and the entries of the lists, in fixed
+  width fields. Datatype objects are stored as their values (doubles)
+  and codes for their units; sky covers, cloud types, weather codes and
+  report types and modifiers are stored as codes of their vocabularies
+* the strings: the original code, the station id, the remarks, the
+  unparsed groups and any value missing from the vocabularies
+
+The time of parsing (``_now`` and ``_utcdelta``) is not stored. Records
+of a different `VERSION` are rejected, so bump it whenever the layout
+changes.
+
+Only the standard library is used, so that the parser stays light.
+
+"""
+from __future__ import division
+
+import datetime
+import struct
+
+from . import datatypes
+from .metar import (Metar, PresentWeather, _lookup_weather, SKY_COVER,
+                    CLOUD_TYPE, WEATHER_INT, WEATHER_DESC, WEATHER_PREC,
+                    WEATHER_OBSC, WEATHER_OTHER)
+
+__all__ = ['VERSION', 'FIELDS', 'RecordError', 'toBytes', 'fromBytes',
+           'batchToBytes', 'batchFromBytes']
+
+VERSION = 1
+
+MAGIC = b'MR'
+BATCH_MAGIC = b'MB'
+
+_EPOCH = datetime.datetime(1970, 1, 1)
+_LITERAL = 255    # vocabulary code of a value stored as a string
+_MAX_LAYOUTS = 1000
+
+
+class RecordError(Exception):
+    """Exception raised when a report can't be encoded or decoded."""
+    pass
+
+
+## codecs of the attributes. `pack` appends the fields of a value (see
+## `format`) to a list of values and its strings to a list of strings,
+## and `unpack` rebuilds it from the fields that start at values[i]
+
+class _Vocabulary(object):
+    """ One byte codes of a set of words, 0 is None. Other values are
+    stored as strings.
+    """
+    format = 'B'
+
+    def __init__(self, words):
+        self.words = [None] + list(words)
+        self.codes = dict((word, code) for code, word in enumerate(self.words))
+
+    def pack(self, word, values, strings):
+        code = self.codes.get(word)
+        if code is None:
+            strings.append(word)
+            code = _LITERAL
+        values.append(code)
+
+    def unpack(self, values, i, strings):
+        code = values[i]
+        if code == _LITERAL:
+            return next(strings)
+        return self.words[code]
+
+
+class _Number(object):
+    def __init__(self, format):
+        self.format = format
+
+    def pack(self, value, values, strings):
+        values.append(value)
+
+    def unpack(self, values, i, strings):
+        return values[i]
+
+
+class _String(object):
+    format = ''
+
+    def pack(self, value, values, strings):
+        strings.append(value)
+
+    def unpack(self, values, i, strings):
+        return next(strings)
+
+
+class _Datetime(object):
+    """ Microseconds since 1970 (naive datetimes only). """
+    format = 'q'
+
+    def pack(self, value, values, strings):
+        delta = value - _EPOCH
+        values.append((delta.days * 86400 + delta.seconds) * 1000000 + delta.microseconds)
+
+    def unpack(self, values, i, strings):
+        return _EPOCH + datetime.timedelta(microseconds=values[i])
+
+
+## the datatypes are rebuilt from their private attributes, without
+## parsing their values again
+
+def _check(value, cls):
+    if value.__class__ is not cls:
+        raise RecordError('expected a {}, got {!r}'.format(cls.__name__, value))
+
+
+class _Measurement(object):
+    """ temperature and pressure: value and units. """
+    format = 'dB'
+
+    def __init__(self, cls):
+        self.cls = cls
+        self.units = _Vocabulary(cls.legal_units)
+
+    def pack(self, value, values, strings):
+        _check(value, self.cls)
+        values.append(value._value)
+        self.units.pack(value._units, values, strings)
+
+    def unpack(self, values, i, strings):
+        value = self.cls.__new__(self.cls)
+        state = value.__dict__
+        state['_value'] = values[i]
+        state['_units'] = self.units.unpack(values, i + 1, strings)
+        return value
+
+
+class _Bounded(_Measurement):
+    """ speed and precipitation: value, units and '>' or '<'. """
+    format = 'dBB'
+
+    def pack(self, value, values, strings):
+        _check(value, self.cls)
+        values.append(value._value)
+        self.units.pack(value._units, values, strings)
+        _GTLT.pack(value._gtlt, values, strings)
+
+    def unpack(self, values, i, strings):
+        value = self.cls.__new__(self.cls)
+        state = value.__dict__
+        state['_value'] = values[i]
+        state['_units'] = self.units.unpack(values, i + 1, strings)
+        state['_gtlt'] = _GTLT.unpack(values, i + 2, strings)
+        return value
+
+
+class _Distance(_Measurement):
+    """ distance: value, units, '>' or '<' and the fraction it was
+    given as (the numerator and denominator are stored plus one, so
+    that 0 is None).
+    """
+    format = 'dBBBI'
+
+    def pack(self, value, values, strings):
+        _check(value, self.cls)
+        values.append(value._value)
+        self.units.pack(value._units, values, strings)
+        _GTLT.pack(value._gtlt, values, strings)
+        values.append(0 if value._num is None else value._num + 1)
+        values.append(0 if value._den is None else value._den + 1)
+
+    def unpack(self, values, i, strings):
+        value = self.cls.__new__(self.cls)
+        state = value.__dict__
+        state['_value'] = values[i]
+        state['_units'] = self.units.unpack(values, i + 1, strings)
+        state['_gtlt'] = _GTLT.unpack(values, i + 2, strings)
+        num, den = values[i + 3], values[i + 4]
+        state['_num'] = num - 1 if num else None
+        state['_den'] = den - 1 if den else None
+        return value
+
+
+class _Direction(object):
+    """ direction: degrees and compass point. """
+    format = 'dB'
+
+    def __init__(self):
+        self.compass = _Vocabulary(sorted(datatypes.direction.compass_dirs))
+
+    def pack(self, value, values, strings):
+        _check(value, datatypes.direction)
+        values.append(value._degrees)
+        self.compass.pack(value._compass, values, strings)
+
+    def unpack(self, values, i, strings):
+        value = datatypes.direction.__new__(datatypes.direction)
+        state = value.__dict__
+        state['_units'] = 'degrees'
+        state['_degrees'] = values[i]
+        state['_compass'] = self.compass.unpack(values, i + 1, strings)
+        return value
+
+
+_GTLT = _Vocabulary(['>', '<'])
+
+_TEMPERATURE = _Measurement(datatypes.temperature)
+_PRESSURE = _Measurement(datatypes.pressure)
+_SPEED = _Bounded(datatypes.speed)
+_PRECIPITATION = _Bounded(datatypes.precipitation)
+_DISTANCE = _Distance(datatypes.distance)
+_DIRECTION = _Direction()
+_DATETIME = _Datetime()
+
+_MODIFIERS = ['AUTO', 'COR', 'NO DATA', 'TEST', 'RTD'] + ['CC' + c for c in 'ABCDEFG']
+_WEATHER = _Vocabulary([''] + sorted(set(WEATHER_INT) | set(WEATHER_DESC) |
+                                     set(WEATHER_PREC) | set(WEATHER_OBSC) |
+                                     set(WEATHER_OTHER)))
+_COVER = _Vocabulary(sorted(SKY_COVER))
+_CLOUD = _Vocabulary([''] + sorted(CLOUD_TYPE))
+
+# the attributes of a Metar in the order of the bits of the mask
+FIELDS = [
+    ('type', _Vocabulary(['METAR', 'SPECI'])),
+    ('mod', _Vocabulary(_MODIFIERS)),
+    ('station_id', _String()),
+    ('code', _String()),
+    ('time', _DATETIME),
+    ('cycle', _Number('B')),
+    ('_year', _Number('H')),
+    ('_month', _Number('B')),
+    ('_day', _Number('B')),
+    ('_hour', _Number('B')),
+    ('_min', _Number('B')),
+    ('wind_dir', _DIRECTION),
+    ('wind_speed', _SPEED),
+    ('wind_gust', _SPEED),
+    ('wind_dir_from', _DIRECTION),
+    ('wind_dir_to', _DIRECTION),
+    ('vis', _DISTANCE),
+    ('vis_dir', _DIRECTION),
+    ('max_vis', _DISTANCE),
+    ('max_vis_dir', _DIRECTION),
+    ('temp', _TEMPERATURE),
+    ('dewpt', _TEMPERATURE),
+    ('press', _PRESSURE),
+    ('wind_speed_peak', _SPEED),
+    ('wind_dir_peak', _DIRECTION),
+    ('peak_wind_time', _DATETIME),
+    ('wind_shift_time', _DATETIME),
+    ('max_temp_6hr', _TEMPERATURE),
+    ('min_temp_6hr', _TEMPERATURE),
+    ('max_temp_24hr', _TEMPERATURE),
+    ('min_temp_24hr', _TEMPERATURE),
+    ('press_sea_level', _PRESSURE),
+    ('precip_1hr', _PRECIPITATION),
+    ('precip_3hr', _PRECIPITATION),
+    ('precip_6hr', _PRECIPITATION),
+    ('precip_24hr', _PRECIPITATION),
+]
+_UNSET = dict.fromkeys(name for name, codec in FIELDS)
+
+# list attributes of fixed width entries, then lists of strings
+_ENTRY_LISTS = ['runway', 'weather', 'recent', 'sky']
+_STRING_LISTS = ['windshear', '_trend_groups', '_remarks', '_unparsed_groups',
+                 '_unparsed_remarks']
+
+_DISTANCE_WIDTH = len(_DISTANCE.format)
+_RUNWAY_FORMAT = 'B' + _DISTANCE.format * 2
+_WEATHER_FORMAT = 'BBBBB'
+_SKY_FORMAT = 'BBB' + _DISTANCE.format
+_NO_DISTANCE = (0,) * _DISTANCE_WIDTH
+
+# magic, version, flags, mask, list lengths, number of strings and
+# size of their (UTF-8) text
+_HEADER = struct.Struct('<2sBBQ{}HHI'.format(len(_ENTRY_LISTS) + len(_STRING_LISTS)))
+_BATCH_HEADER = struct.Struct('<2sBI')
+_LENGTH = struct.Struct('<I')
+
+_TREND = 1    # flags
+
+_layouts = {}
+
+
+def _layout(mask, lengths):
+    """ The Struct of the attributes and list entries of a record, the
+    (name, codec, index of the first field) of the attributes that are
+    set and the index of the first list entry.
+    """
+    key = (mask,) + lengths
+    layout = _layouts.get(key)
+    if layout is None:
+        parts = ['<']
+        fields = []
+        index = 0
+        for bit, (name, codec) in enumerate(FIELDS):
+            if mask >> bit & 1:
+                parts.append(codec.format)
+                fields.append((name, codec, index))
+                index += len(codec.format)
+        nrunway, nweather, nrecent, nsky = lengths
+        parts.append(_RUNWAY_FORMAT * nrunway)
+        parts.append(_WEATHER_FORMAT * (nweather + nrecent))
+        parts.append(_SKY_FORMAT * nsky)
+        layout = (struct.Struct(''.join(parts)), fields, index)
+        if len(_layouts) < _MAX_LAYOUTS:
+            _layouts[key] = layout
+    return layout
+
+
+def _encode(obs):
+    state = obs.__dict__
+    strings = []
+    values = []
+    mask = 0
+    for bit, (name, codec) in enumerate(FIELDS):
+        value = state.get(name)
+        if value is not None:
+            mask |= 1 << bit
+            codec.pack(value, values, strings)
+
+    for name, low, high in obs.runway:
+        strings.append(name)
+        values.append(high is low)
+        _DISTANCE.pack(low, values, strings)
+        _DISTANCE.pack(high, values, strings)
+
+    for weather in obs.weather:
+        if weather.__class__ is not PresentWeather:
+            raise RecordError('expected a PresentWeather, got {!r}'.format(weather))
+        for code in weather.info:
+            _WEATHER.pack(code, values, strings)
+
+    for recent in obs.recent:
+        if len(recent) != 5:
+            raise RecordError('expected 5 recent weather codes, got {!r}'.format(recent))
+        for code in recent:
+            _WEATHER.pack(code, values, strings)
+
+    for cover, height, cloud in obs.sky:
+        _COVER.pack(cover, values, strings)
+        _CLOUD.pack(cloud, values, strings)
+        if height is None:
+            values.append(0)
+            values.extend(_NO_DISTANCE)
+        else:
+            values.append(1)
+            _DISTANCE.pack(height, values, strings)
+
+    lengths = (len(obs.runway), len(obs.weather), len(obs.recent), len(obs.sky))
+    for name in _STRING_LISTS:
+        strings.extend(state[name])
+
+    text = u''.join(strings).encode('utf-8')
+    flags = _TREND if obs._trend else 0
+    header = _HEADER.pack(MAGIC, VERSION, flags, mask, *(
+        lengths + tuple(len(state[name]) for name in _STRING_LISTS) +
+        (len(strings), len(text))
+    ))
+    return b''.join([
+        header,
+        struct.pack('<{}H'.format(len(strings)), *[len(s) for s in strings]),
+        _layout(mask, lengths)[0].pack(*values),
+        text,
+    ])
+
+
+def toBytes(obs):
+    """ Encode a `metar.metar.Metar` as a binary record.
+
+    Raises
+    ------
+    RecordError
+        If an attribute has a type (or value) that a record can't hold.
+
+    """
+    try:
+        return _encode(obs)
+    except (struct.error, TypeError, KeyError, AttributeError,
+            UnicodeError) as e:
+        raise RecordError('cannot encode {!r}: {}'.format(getattr(obs, 'code', obs), e))
+
+
+def _decode(data, offset=0):
+    header = _HEADER.unpack_from(data, offset)
+    magic, version, flags, mask = header[:4]
+    if magic != MAGIC:
+        raise RecordError('not a METAR record')
+    if version != VERSION:
+        raise RecordError('unsupported record version {} (expected {})'.format(version, VERSION))
+
+    lengths = header[4:8]
+    listlengths = header[8:-2]
+    nstrings, textsize = header[-2:]
+    offset += _HEADER.size
+
+    sizes = struct.unpack_from('<{}H'.format(nstrings), data, offset)
+    offset += 2 * nstrings
+    layout, fields, i = _layout(mask, lengths)
+    values = layout.unpack_from(data, offset)
+    offset += layout.size
+
+    end = offset + textsize
+    text = data[offset:end].decode('utf-8')
+    if len(text) != sum(sizes):
+        raise RecordError('truncated record')
+    strings = []
+    position = 0
+    for size in sizes:
+        strings.append(text[position:position + size])
+        position += size
+    strings = iter(strings)
+
+    obs = Metar.__new__(Metar)
+    state = obs.__dict__
+    state.update(_UNSET)
+    for name, codec, index in fields:
+        state[name] = codec.unpack(values, index, strings)
+
+    nrunway, nweather, nrecent, nsky = lengths
+    runway = []
+    for _ in range(nrunway):
+        name = next(strings)
+        low = _DISTANCE.unpack(values, i + 1, strings)
+        high = _DISTANCE.unpack(values, i + 1 + _DISTANCE_WIDTH, strings)
+        runway.append((name, low, low if values[i] else high))
+        i += 1 + 2 * _DISTANCE_WIDTH
+
+    weather = []
+    for _ in range(nweather):
+        codes = [_WEATHER.unpack(values, n, strings) for n in range(i, i + 5)]
+        weather.append(_lookup_weather({'int': codes[0], 'desc': codes[1],
+                                        'prec': codes[2], 'obsc': codes[3],
+                                        'other': codes[4], 'int2': None}))
+        i += 5
+
+    recent = []
+    for _ in range(nrecent):
+        recent.append(tuple(_WEATHER.unpack(values, n, strings) for n in range(i, i + 5)))
+        i += 5
+
+    sky = []
+    for _ in range(nsky):
+        cover = _COVER.unpack(values, i, strings)
+        cloud = _CLOUD.unpack(values, i + 1, strings)
+        height = None
+        if values[i + 2]:
+            height = _DISTANCE.unpack(values, i + 3, strings)
+        sky.append((cover, height, cloud))
+        i += 3 + _DISTANCE_WIDTH
+
+    state['runway'] = runway
+    state['weather'] = weather
+    state['recent'] = recent
+    state['sky'] = sky
+    for name, length in zip(_STRING_LISTS, listlengths):
+        state[name] = [next(strings) for _ in range(length)]
+    state['_trend'] = bool(flags & _TREND)
+    return obs, end
+
+
+def fromBytes(data):
+    """ Rebuild a `metar.metar.Metar` from a record of `toBytes`.
+
+    Raises
+    ------
+    RecordError
+        If `data` isn't a (complete) record of this `VERSION`.
+
+    """
+    try:
+        return _decode(bytes(data))[0]
+    except (struct.error, StopIteration, UnicodeError, IndexError) as e:
+        raise RecordError('cannot decode record: {}'.format(e))
+
+
+def batchToBytes(observations):
+    """ Encode a list of `metar.metar.Metar` as one binary batch.
+    """
+    observations = list(observations)
+    parts = [_BATCH_HEADER.pack(BATCH_MAGIC, VERSION, len(observations))]
+    for obs in observations:
+        record = toBytes(obs)
+        parts.append(_LENGTH.pack(len(record)))
+        parts.append(record)
+    return b''.join(parts)
+
+
+def batchFromBytes(data):
+    """ Rebuild the list of `metar.metar.Metar` of a batch of
+    `batchToBytes`.
+    """
+    data = bytes(data)
+    try:
+        magic, version, count = _BATCH_HEADER.unpack_from(data)
+        if magic != BATCH_MAGIC:
+            raise RecordError('not a batch of METAR records')
+        if version != VERSION:
+            raise RecordError('unsupported record version {} (expected {})'.format(version, VERSION))
+
+        observations = []
+        offset = _BATCH_HEADER.size
+        for _ in range(count):
+            length, = _LENGTH.unpack_from(data, offset)
+            offset += _LENGTH.size
+            obs, end = _decode(data, offset)
+            if end != offset + length:
+                raise RecordError('corrupt batch')
+            observations.append(obs)
+            offset = end
+        return observations
+    except (struct.error, StopIteration, UnicodeError, IndexError) as e:
+        raise RecordError('cannot decode batch: {}'.format(e))
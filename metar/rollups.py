@@ -0,0 +1,225 @@
+"""
+Pre-aggregated rollups of compiled station data.
+
+`buildRollups` aggregates a compiled station dataframe into a pyramid of
+hourly, daily and monthly levels, using the appropriate statistic for
+each column (totals for precipitation, means for temperatures and
+pressures and vector means for wind directions). Each level is built
+from the sums of the level below it, so the whole pyramid costs about as
+much as a single resample of the full record.
+
+`WeatherStation` saves the rollups next to the compiled files and
+registers them with the resampling used by `metar.graphics` and
+`metar.exporters`, so that hourly, daily or monthly plots and exports of
+long records read the closest level instead of scanning every report.
+
+"""
+from __future__ import division
+
+import os
+
+import numpy as np
+import pandas
+
+from . import circular
+
+__all__ = ['LEVELS', 'AGGREGATIONS', 'buildRollups', 'mergeRollups',
+           'writeRollups', 'readRollups', 'registerRollups']
+
+# (name, resampling rule) of each level of the pyramid, finest first
+LEVELS = [
+    ('hourly', 'H'),
+    ('daily', 'D'),
+    ('monthly', 'M'),
+]
+
+# how each column is aggregated. 'circmean' is the vector mean of
+# directions in degrees
+AGGREGATIONS = {
+    'Precip': 'sum',
+    'Temp': 'mean',
+    'DewPnt': 'mean',
+    'WindSpd': 'mean',
+    'AtmPress': 'mean',
+    'SkyCover': 'mean',
+    'WindDir': 'circmean',
+}
+
+
+def _moments(dataframe):
+    """ Additive statistics of every aggregated column, from which each
+    level's values are derived.
+    """
+    moments = pandas.DataFrame(index=dataframe.index)
+    for col, how in sorted(AGGREGATIONS.items()):
+        if col not in dataframe.columns:
+            continue
+
+        values = np.asarray(dataframe[col], dtype=float)
+        if how == 'sum':
+            moments[col] = values
+        elif how == 'mean':
+            moments[col + '_sum'] = values
+            moments[col + '_n'] = np.isfinite(values).astype(float)
+        elif how == 'circmean':
+            sin, cos, valid = circular.directionComponents(values)
+            moments[col + '_sin'] = sin
+            moments[col + '_cos'] = cos
+            moments[col + '_n'] = valid.astype(float)
+    return moments
+
+
+def _values(moments):
+    """ Rollup values of a level from its moments.
+    """
+    level = pandas.DataFrame(index=moments.index)
+    for col, how in sorted(AGGREGATIONS.items()):
+        if how == 'sum' and col in moments.columns:
+            level[col] = moments[col]
+        elif col + '_n' in moments.columns:
+            count = moments[col + '_n'].fillna(0).values
+            if how == 'mean':
+                with np.errstate(invalid='ignore', divide='ignore'):
+                    values = moments[col + '_sum'].values / count
+                values[count == 0] = np.nan
+            else:
+                values = circular.vectorDirection(moments[col + '_sin'].values,
+                                                  moments[col + '_cos'].values,
+                                                  count)
+            level[col] = values
+    return level
+
+
+def buildRollups(dataframe):
+    """ Aggregate a compiled station dataframe to each level of `LEVELS`.
+
+    Parameters
+    ----------
+    dataframe : pandas.DataFrame with a sorted DatetimeIndex
+        Columns without an entry in `AGGREGATIONS` are ignored.
+
+    Returns
+    -------
+    rollups : dict of pandas.DataFrames
+        Keyed by the names of the levels.
+
+    """
+    if not isinstance(dataframe.index, pandas.DatetimeIndex):
+        raise ValueError('input `dataframe` must have a DatetimeIndex')
+
+    rollups = {}
+    moments = _moments(dataframe)
+    for name, rule in LEVELS:
+        moments = moments.resample(how='sum', rule=rule)
+        rollups[name] = _values(moments)
+    return rollups
+
+
+def mergeRollups(old, new, since, start=None, end=None):
+    """ Rollups of a compiled file whose data from `since` (the start of
+    a month) on were replaced by the data `new` was built from.
+
+    Parameters
+    ----------
+    old, new : dicts of pandas.DataFrames
+        Rollups of the file before the change and of the new data.
+    since : pandas.Timestamp
+        Bins that start before it are kept from `old`. As it falls on
+        the edge of every level's bins, none of them are split.
+    start, end : pandas.Timestamps, optional
+        The first and last times of the file before the change. If
+        given, each level of `old` must cover the months from `start`
+        up to `since`.
+
+    Returns
+    -------
+    merged : dict of pandas.DataFrames, or None
+        None if a level of `old` is missing or too short, i.e. the
+        rollups have to be rebuilt from the whole file.
+
+    """
+    since = pandas.Timestamp(since)
+    span = None
+    if start is not None and end is not None:
+        if pandas.Timestamp(start) >= since:
+            # nothing is left of the old file
+            return dict((name, new[name]) for name, rule in LEVELS if name in new)
+        last = min(pandas.Timestamp(end), since - pandas.Timedelta(days=1))
+        span = (pandas.Timestamp(start).to_period('M'), last.to_period('M'))
+
+    merged = {}
+    for name, rule in LEVELS:
+        if name not in new:
+            continue
+        if name not in old:
+            return None
+
+        level = old[name]
+        level = level[level.index < since]
+        if span is not None:
+            months = level.index.to_period('M')
+            if len(months) == 0 or months[0] > span[0] or months[-1] < span[1]:
+                return None
+        merged[name] = pandas.concat([level, new[name]])
+    return merged
+
+
+def _rollup_path(directory, filename, name):
+    stem = os.path.splitext(filename)[0]
+    return os.path.join(directory, '{}_{}.csv'.format(stem, name))
+
+
+def writeRollups(rollups, directory, filename):
+    """ Save rollups as CSV files named after their compiled file.
+    """
+    for name, rule in LEVELS:
+        if name in rollups:
+            rollups[name].to_csv(_rollup_path(directory, filename, name))
+
+
+def readRollups(directory, filename, newerthan=None):
+    """ Load the saved rollups of a compiled file.
+
+    Parameters
+    ----------
+    directory : string
+        Where the rollups were saved.
+    filename : string
+        Name of the compiled file.
+    newerthan : string, optional
+        Path to a file (i.e., the compiled file itself). Rollups that
+        are older than it are stale and skipped.
+
+    Returns
+    -------
+    rollups : dict of pandas.DataFrames
+        Only the levels that were found.
+
+    """
+    rollups = {}
+    for name, rule in LEVELS:
+        path = _rollup_path(directory, filename, name)
+        if not os.path.exists(path):
+            continue
+        if newerthan is not None and os.path.getmtime(path) < os.path.getmtime(newerthan):
+            continue
+        rollups[name] = pandas.read_csv(path, index_col=0, parse_dates=True)
+    return rollups
+
+
+def registerRollups(dataframe, rollups):
+    """ Let `graphics._resampler` read the rollups of `dataframe`
+    instead of resampling it. The rollups are dropped as soon as the
+    corresponding column of `dataframe` is modified.
+    """
+    # graphics loads matplotlib.pyplot, so only import it when needed
+    from . import graphics
+
+    for name, rule in LEVELS:
+        if name not in rollups:
+            continue
+        for col in rollups[name].columns:
+            if col in AGGREGATIONS and col in dataframe.columns:
+                graphics.seedResampleCache(dataframe, col, rule,
+                                           AGGREGATIONS[col],
+                                           rollups[name][col])
@@ -13,7 +13,6 @@ import codecs
 
 # math stuff
 import numpy as np
-import matplotlib
 import matplotlib.dates as mdates
 import pandas
 
@@ -26,10 +25,28 @@ from six.moves import http_cookiejar
 # metar stuff
 from . import metar
 from . import datatypes
+from . import manifest
+from . import rollups
+from . import telemetry
 
 __all__ = ['getAllStations', 'getStationByID', 'WeatherStation',
            'getASOSData', 'getWundergroundData', 'getWunderground_NonAirportData']
-matplotlib.rcParams['timezone'] = 'UTC'
+
+# fraction of the sky covered by each sky-cover code
+_SKY_COVER_FRACTION = {
+    'CLR': 0.0000,
+    'SKC': 0.0000,
+    'NSC': 0.0000,
+    'NCD': 0.0000,
+    'FEW': 0.1785,
+    'SCT': 0.4375,
+    'BKN': 0.7500,
+    'VV': 0.9900,
+    'OVC': 1.0000
+}
+
+# sky-cover codes that constitute a ceiling
+_CEILING_COVERS = ('BKN', 'OVC', 'VV')
 
 
 class WeatherStation(object):
@@ -48,11 +65,15 @@ class WeatherStation(object):
     max_attempts : optional int (default = 10)
         The upper limit to the number of times the downloaders will
         try to retrieve a file from the web.
+    store : optional metar.store.ObservationStore or None (default)
+        If given, the data of each file read by the ``get*Data`` methods
+        are also inserted into the store.
 
     """
 
     def __init__(self, sta_id, city=None, state=None, country=None,
-                 lat=None, lon=None, max_attempts=10, show_progress=False):
+                 lat=None, lon=None, max_attempts=10, show_progress=False,
+                 store=None):
         self.sta_id = sta_id
         self.city = city
         self.state = state
@@ -67,7 +88,11 @@ class WeatherStation(object):
             self.name = self.city
 
         self.errorfile = 'data/%s_errors.log' % (sta_id,)
+        # parsing and download errors, appended to the errorfile once per
+        # batch of files
+        self.errors = telemetry.ErrorCollector()
         self.data = {}
+        self.store = store
 
         self._wunderground = None
         self._wunder_nonairport = None
@@ -111,7 +136,7 @@ class WeatherStation(object):
 
         input:
             *src* : 'asos' or 'wunderground'
-            *step* : 'raw' or 'flat' or 'compile'
+            *step* : 'raw' or 'flat' or 'compile' or 'rollup'
         '''
         _check_src(src)
         _check_step(step)
@@ -236,7 +261,6 @@ class WeatherStation(object):
 
         outname = self._make_data_file(timestamp, src, 'raw')
         status = 'not there'
-        errorfile = open(self.errorfile, 'a')
         if not os.path.exists(outname) or force_download:
             outfile = open(outname, 'w')
             url = self._url_by_date(timestamp, src=src)
@@ -265,14 +289,13 @@ class WeatherStation(object):
                 #print('error on: {0} (attempt {1})'.format(url, attempt))
                 outfile.close()
                 os.remove(outname)
-                errorfile.write('error on: %s\n' % (url,))
+                self.errors.add('download', type(e).__name__, url)
 
             outfile.close()
             status = _check_file(outname)
         else:
             status = _check_file(outname)
 
-        errorfile.close()
         return status
 
     def _attempt_download(self, timestamp, src, attempt=0):
@@ -317,7 +340,8 @@ class WeatherStation(object):
             if src.lower() in ['asos', 'wunderground']:
 
                 headers = ('Sta,Date,Precip,Temp,DewPnt,'
-                           'WindSpd,WindDir,AtmPress,SkyCover\n')
+                           'WindSpd,WindDir,AtmPress,SkyCover,'
+                           'Ceiling,FlightCat\n')
                 dataout.write(headers)
 
                 dates = []
@@ -328,8 +352,9 @@ class WeatherStation(object):
                 winddir = []
                 press = []
                 cover = []
+                ceiling = []
+                flightcat = []
 
-                errorfile = open(self.errorfile, 'a')
                 for line in datain:
                     if src.lower() == 'asos':
                         metarstring = line
@@ -344,16 +369,21 @@ class WeatherStation(object):
                             metarstring = None
 
                     if metarstring is not None:
-                        obs = metar.Metar(metarstring, errorfile=errorfile)
+                        obs = metar.Metar(metarstring, errors=self.errors)
                         rains = _append_val(obs.precip_1hr, rains, fillNone=0.0)
                         temps = _append_val(obs.temp, temps)
                         dewpt = _append_val(obs.dewpt, dewpt)
                         windspd = _append_val(obs.wind_speed, windspd)
                         winddir = _append_val(obs.wind_dir, winddir)
                         press = _append_val(obs.press, press)
-                        cover.append(_process_sky_cover(obs))
 
-                errorfile.close()
+                        # cover, ceiling, and flight category all come
+                        # from the same pass over the sky conditions
+                        skycover, skyceiling = _process_sky(obs)
+                        cover.append('NA' if skycover is None else skycover)
+                        ceiling.append('NA' if skyceiling is None else skyceiling)
+                        flightcat.append(_flight_category(obs, skyceiling))
+
                 rains = np.array(rains)
                 dates = np.array(dates)
 
@@ -363,8 +393,9 @@ class WeatherStation(object):
                     final_precip = rains
 
                 for row in zip([self.sta_id]*rains.shape[0], dates, final_precip,
-                               temps, dewpt, windspd, winddir, press, cover):
-                    dataout.write('%s,%s,%s,%s,%s,%s,%s,%s,%s\n' % row)
+                               temps, dewpt, windspd, winddir, press, cover,
+                               ceiling, flightcat):
+                    dataout.write('%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s\n' % row)
 
             else:
                 headers = (
@@ -416,7 +447,7 @@ class WeatherStation(object):
 
         return data, flatstatus
 
-    def _get_data(self, startdate, enddate, source, filename):
+    def _get_data(self, startdate, enddate, source, filename, incremental=False):
         '''
         This function will return data in the form of a pandas dataframe
         for the station between *startdate* and *enddate*.
@@ -426,12 +457,31 @@ class WeatherStation(object):
             *enddate* : string representing the latest data for the data
             *source* : string indicating where the data will come from
                 can in "asos" or "wunderground"
+            *filename* : name of the compiled file to save, or None
+            *incremental* : if True and *filename* was already compiled,
+                only the data since the start of the month of its last
+                row are read (in place of *startdate*), and the file
+                is updated from there on
 
         Returns:
             *data* : a pandas data frame of the data for this station
+                (in incremental mode, of the data that were read)
         '''
         _check_src(source)
 
+        info = None
+        if incremental and filename is not None:
+            cfilepath = os.path.join(self._find_dir(source, 'compile'), filename)
+            info = manifest.readManifest(cfilepath)
+            if info is not None and info['end'] is None:
+                info = None
+
+        if info is not None:
+            # corrections are appended to the month of the last compiled
+            # report, so read it again: the last row of each time wins
+            # only within the new data
+            startdate = pandas.Timestamp(info['end']).to_period('M').to_timestamp()
+
         freq = {
             'asos': 'MS',
             'wunderground': 'D',
@@ -453,15 +503,22 @@ class WeatherStation(object):
 
         data = None
         for n, ts in enumerate(timestamps):
+            newdata, status = self._read_csv(ts, source)
             if data is None:
-                data, status = self._read_csv(ts, source)
+                data = newdata
             else:
-                newdata, status = self._read_csv(ts, source)
                 data = data.append(newdata)
 
+            # one transaction per file; later corrections replace
+            # earlier rows in the store too
+            if self.store is not None and newdata is not None:
+                self.store.insert(self.sta_id, newdata, source=source)
+
             if self.show_progress:
                 progress.animate(n+1, status)
 
+        self.errors.flush(self.errorfile)
+
         # add a row number to each row
         data['rownum'] = list(range(data.shape[0]))
 
@@ -474,11 +531,34 @@ class WeatherStation(object):
         if filename is not None:
             compdir = self._find_dir(source, 'compile')
             _check_dirs(compdir.split(os.path.sep))
-            final_data.to_csv(os.path.join(compdir, filename))
+            cfilepath = os.path.join(compdir, filename)
+
+            # pre-aggregate the compiled data for plots and exports
+            rollupdir = self._find_dir(source, 'rollup')
+            _check_dirs(rollupdir.split(os.path.sep))
+            levels = rollups.buildRollups(final_data)
+            if info is None:
+                manifest.writeCompiled(final_data, cfilepath,
+                                       source=source, station=self.sta_id)
+                rollups.writeRollups(levels, rollupdir, filename)
+            elif final_data.shape[0] > 0:
+                # the file and its rollups are both replaced from the
+                # first month that was read on
+                since = final_data.index[0].to_period('M').to_timestamp()
+                old = rollups.readRollups(rollupdir, filename, newerthan=cfilepath)
+                manifest.appendCompiled(final_data, cfilepath, info)
+                merged = rollups.mergeRollups(old, levels, since,
+                                              info['start'], info['end'])
+                if merged is None:
+                    # saved levels are missing or stale, so rebuild them
+                    merged = rollups.buildRollups(manifest.readCompiled(cfilepath))
+                rollups.writeRollups(merged, rollupdir, filename)
+            rollups.registerRollups(final_data, levels)
 
         return final_data
 
-    def getASOSData(self, startdate, enddate, filename=None):
+    def getASOSData(self, startdate, enddate, filename=None,
+                    incremental=False):
         '''
         This function will return ASOS data in the form of a pandas dataframe
         for the station between *startdate* and *enddate*.
@@ -497,9 +577,11 @@ class WeatherStation(object):
         >>> pdx = Station.getStationByID('KPDX')
         >>> data = pdx.getASOSdata(startdate, enddate)
         '''
-        self.data['asos'] = self._get_data(startdate, enddate, 'asos', filename)
+        self.data['asos'] = self._get_data(startdate, enddate, 'asos', filename,
+                                           incremental=incremental)
 
-    def getWundergroundData(self, startdate, enddate, filename=None):
+    def getWundergroundData(self, startdate, enddate, filename=None,
+                            incremental=False):
         '''
         This function will return Wunderground data in the form of a pandas dataframe
         for the station between *startdate* and *enddate*.
@@ -518,9 +600,11 @@ class WeatherStation(object):
         >>> pdx = Station.getStationByID('KPDX')
         >>> data = pdx.getWundergroundData(startdate, enddate)
         '''
-        self.data['wunder'] = self._get_data(startdate, enddate, 'wunderground', filename)
+        self.data['wunder'] = self._get_data(startdate, enddate, 'wunderground', filename,
+                                             incremental=incremental)
 
-    def getWunderground_NonAirportData(self, startdate, enddate, filename=None):
+    def getWunderground_NonAirportData(self, startdate, enddate, filename=None,
+                                       incremental=False):
         '''
         This function will return non-airport Wunderground data in the form of a pandas dataframe
         for the station between *startdate* and *enddate*.
@@ -539,12 +623,14 @@ class WeatherStation(object):
         >>> pdx = Station.getStationByID('KPDX')
         >>> data = pdx.getWunderground_NonAirportData(startdate, enddate)
         '''
-        self.data['wunder_nonairport'] = self._get_data(startdate, enddate, 'wunder_nonairport', filename)
+        self.data['wunder_nonairport'] = self._get_data(startdate, enddate, 'wunder_nonairport', filename,
+                                                        incremental=incremental)
 
     def _get_compiled_files(self, source):
         compdir = self._find_dir(source, 'compile')
         _check_dirs(compdir.split(os.path.sep))
-        compfiles = os.listdir(compdir)
+        compfiles = [cf for cf in os.listdir(compdir)
+                     if not cf.endswith((manifest.SUFFIX, '.tmp'))]
         return compdir, compfiles
 
     def showCompiledFiles(self, source):
@@ -553,14 +639,25 @@ class WeatherStation(object):
             print('No compiled files')
 
         for n, cf in enumerate(compfiles):
-            cfile = open(os.path.join(compdir, cf), 'r')
-            cdata = cfile.readlines()
-            start = cdata[1].split(',')[0]
-            end = cdata[-1].split(',')[0]
-            cfile.close()
+            info = manifest.readManifest(os.path.join(compdir, cf))
+            if info is not None:
+                start, end = info['start'], info['end']
+            else:
+                # compiled before sidecars were written
+                cfile = open(os.path.join(compdir, cf), 'r')
+                cdata = cfile.readlines()
+                start = cdata[1].split(',')[0]
+                end = cdata[-1].split(',')[0]
+                cfile.close()
             print(('%d) %s - start: %s\tend: %s' % (n+1, cf, start, end)))
 
-    def loadCompiledFile(self, source, filename=None, filenum=None):
+    def loadCompiledFile(self, source, filename=None, filenum=None,
+                         start=None, end=None):
+        '''
+        Loads a compiled file by its *filename* or its number in the
+        list of `showCompiledFiles`. If *start* and/or *end* are given,
+        only the rows between them are read.
+        '''
         if filename is None and filenum is None:
             raise ValueError("must specify either a file name or number")
 
@@ -576,7 +673,13 @@ class WeatherStation(object):
                 raise ValueError('filename does not exist')
 
             cfilepath = os.path.join(compdir, filename)
-            data = pandas.read_csv(cfilepath, index_col=0, parse_dates=True)
+            data = manifest.readCompiled(cfilepath, start=start, end=end)
+
+            # the rollups cover the whole file
+            if start is None and end is None:
+                rollupdir = self._find_dir(source, 'rollup')
+                levels = rollups.readRollups(rollupdir, filename, newerthan=cfilepath)
+                rollups.registerRollups(data, levels)
 
         else:
             print('No files to load')
@@ -590,7 +693,7 @@ def _parse_date(datestring):
     takes a date string and returns a datetime.datetime object
     '''
     datenum = mdates.datestr2num(datestring)
-    dateval = mdates.num2date(datenum)
+    dateval = mdates.num2date(datenum, tz=mdates.UTC)
     return dateval
 
 
@@ -606,8 +709,8 @@ def _check_step(step):
     '''
     checks that a *step* value is valid
     '''
-    if step.lower() not in ('raw', 'flat', 'compile'):
-        raise ValueError('step must be one of "raw" or "flat"')
+    if step.lower() not in ('raw', 'flat', 'compile', 'rollup'):
+        raise ValueError('step must be one of "raw", "flat", "compile" or "rollup"')
 
 
 def _check_file(filename):
@@ -709,31 +812,67 @@ def _process_precip(dateval, p1):
     return p2
 
 
+def _process_sky(obs):
+    '''
+    collapses the sky conditions of a Metar object *obs* into the
+    maximum cover fraction and the ceiling (the base, in feet, of the
+    lowest broken, overcast or obscured layer) in a single pass.
+    either value is None if it cannot be determined from the report.
+    '''
+    cover = None
+    ceiling = None
+    for skycover, height, cloud in obs.sky:
+        coverval = _SKY_COVER_FRACTION.get(skycover)
+        if coverval is not None and (cover is None or coverval > cover):
+            cover = coverval
+
+        if skycover in _CEILING_COVERS and height is not None:
+            base = height.value('FT')
+            if ceiling is None or base < ceiling:
+                ceiling = base
+
+    return cover, ceiling
+
+
 def _process_sky_cover(obs):
-    coverdict = {
-        'CLR': 0.0000,
-        'SKC': 0.0000,
-        'NSC': 0.0000,
-        'NCD': 0.0000,
-        'FEW': 0.1785,
-        'SCT': 0.4375,
-        'BKN': 0.7500,
-        'VV': 0.9900,
-        'OVC': 1.0000
-    }
-    coverlist = []
-    for sky in obs.sky:
-        coverval = coverdict[sky[0]]
-        coverlist.append(coverval)
-
-    if len(coverlist) > 0:
-        cover = np.max(coverlist)
-    else:
+    cover, ceiling = _process_sky(obs)
+    if cover is None:
         cover = 'NA'
 
     return cover
 
 
+def _flight_category(obs, ceiling):
+    '''
+    returns the FAA flight category ('VFR', 'MVFR', 'IFR', or 'LIFR') of
+    a Metar object *obs* given its *ceiling* (feet) from _process_sky.
+    a missing ceiling or visibility is treated as unrestricted unless
+    both the sky conditions and the visibility are missing, in which
+    case 'NA' is returned.
+    '''
+    if obs.vis is None and not obs.sky:
+        return 'NA'
+
+    if obs.vis is not None:
+        vis = obs.vis.value('SM')
+    else:
+        vis = np.inf
+
+    if ceiling is None:
+        ceiling = np.inf
+
+    if ceiling < 500 or vis < 1:
+        category = 'LIFR'
+    elif ceiling < 1000 or vis < 3:
+        category = 'IFR'
+    elif ceiling <= 3000 or vis <= 5:
+        category = 'MVFR'
+    else:
+        category = 'VFR'
+
+    return category
+
+
 def getAllStations():
     stationfile = os.path.join(sys.prefix, 'metar_data', 'reference', 'nsd_cccc.txt')
     stations = {}
@@ -758,27 +897,33 @@ def getStationByID(sta_id):
     return sta
 
 
-def getASOSData(station, startdate, enddate, filename=None):
+def getASOSData(station, startdate, enddate, filename=None,
+                incremental=False):
     if not isinstance(station, WeatherStation):
         station = getStationByID(station)
 
-    data = station.getASOSData(startdate, enddate, filename=filename)
+    data = station.getASOSData(startdate, enddate, filename=filename,
+                               incremental=incremental)
     return data
 
 
-def getWundergroundData(station, startdate, enddate, filename=None):
+def getWundergroundData(station, startdate, enddate, filename=None,
+                        incremental=False):
     if not isinstance(station, WeatherStation):
         station = getStationByID(station)
 
-    data = station.getWundergroundData(startdate, enddate, filename=filename)
+    data = station.getWundergroundData(startdate, enddate, filename=filename,
+                                       incremental=incremental)
     return data
 
 
-def getWunderground_NonAirportData(station, startdate, enddate, filename=None):
+def getWunderground_NonAirportData(station, startdate, enddate, filename=None,
+                                   incremental=False):
     if not isinstance(station, WeatherStation):
         station = getStationByID(station)
 
-    data = station.getWunderground_NonAirportData(startdate, enddate, filename=filename)
+    data = station.getWunderground_NonAirportData(startdate, enddate, filename=filename,
+                                                  incremental=incremental)
     return data
 
 
@@ -0,0 +1,230 @@
+"""
+An SQLite store of station observations.
+
+The compiled files of `WeatherStation` can only be loaded whole, one
+station at a time. `ObservationStore` keeps the observations of any
+number of stations in one SQLite database instead, with one table per
+source whose primary key (and storage order) is ``(station, time)``, so
+that reading a few stations over a few days only touches those rows::
+
+    from metar import station, store
+    db = store.ObservationStore('data/observations.db')
+    pdx = station.WeatherStation('KPDX', store=db)
+    pdx.getASOSData('2012-01-01', '2012-12-31')
+
+    df = db.query(['KPDX', 'KSEA'], start='2012-06-01', end='2012-06-07',
+                  columns=['Precip', 'Temp'])
+
+The database is opened in WAL mode, so that it can be read while it is
+being written to. Columns are added to a table the first time they are
+inserted, and a row inserted for a (station, time) that is already
+stored replaces it (i.e., the last correction of a report wins, as in
+the compiled files).
+
+"""
+from __future__ import division
+
+import re
+import sqlite3
+
+import numpy as np
+import pandas
+import six
+
+__all__ = ['ObservationStore']
+
+_IDENTIFIER_RE = re.compile(r"^\w+$")
+_EPOCH = np.datetime64('1970-01-01T00:00:00', 's')
+
+
+def _quote(name):
+    return '"{}"'.format(str(name).replace('"', '""'))
+
+
+def _seconds(values):
+    """ Seconds since 1970 of an array of datetimes. """
+    values = np.asarray(pandas.DatetimeIndex(values).values, dtype='datetime64[s]')
+    return (values - _EPOCH).astype(np.int64)
+
+
+def _timestamp(value):
+    if value is None:
+        return None
+    return int(_seconds([pandas.Timestamp(value)])[0])
+
+
+class ObservationStore(object):
+    """
+    Observations of many stations in an SQLite database.
+
+    Parameters
+    ----------
+    path : string
+        Path to the database file, created if it doesn't exist.
+        ``':memory:'`` keeps it in memory.
+
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        if path != ':memory:':
+            self.connection.execute('PRAGMA journal_mode=WAL')
+            self.connection.execute('PRAGMA synchronous=NORMAL')
+        self._columns = {}
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def _table(self, source):
+        if not _IDENTIFIER_RE.match(source):
+            raise ValueError('invalid source: {!r}'.format(source))
+        return source.lower()
+
+    def columns(self, source='asos'):
+        """ Names of the stored columns of a source (without the station
+        and time).
+        """
+        table = self._table(source)
+        if table not in self._columns:
+            info = self.connection.execute('PRAGMA table_info({})'.format(_quote(table)))
+            self._columns[table] = [row[1] for row in info][2:]
+        return list(self._columns[table])
+
+    def _add_columns(self, table, dataframe):
+        known = self.columns(table)
+        if not known:
+            self.connection.execute(
+                'CREATE TABLE IF NOT EXISTS {} ('
+                'station TEXT NOT NULL, time INTEGER NOT NULL, '
+                'PRIMARY KEY (station, time)) WITHOUT ROWID'.format(_quote(table))
+            )
+
+        for col in dataframe.columns:
+            if col in known:
+                continue
+            if col in ('station', 'time'):
+                raise ValueError('column name {!r} is reserved'.format(col))
+            kind = 'REAL' if pandas.api.types.is_numeric_dtype(dataframe[col]) else 'TEXT'
+            self.connection.execute('ALTER TABLE {} ADD COLUMN {} {}'.format(
+                _quote(table), _quote(col), kind))
+            known.append(col)
+        self._columns[table] = known
+
+    def insert(self, station, dataframe, source='asos'):
+        """
+        Store the observations of a station, in one transaction.
+
+        Parameters
+        ----------
+        station : string
+            Station ID.
+        dataframe : pandas.DataFrame with a DatetimeIndex
+            The observations, e.g. a month of the flat files of
+            `WeatherStation`. Later rows replace earlier ones at the
+            same time.
+        source : string, optional (default = 'asos')
+
+        Returns
+        -------
+        rows : int
+            Number of rows inserted.
+
+        """
+        if dataframe is None or dataframe.shape[0] == 0:
+            return 0
+
+        table = self._table(source)
+        times = _seconds(dataframe.index)
+        values = dataframe.astype(object).where(pandas.notnull(dataframe), None)
+        rows = [(station, int(t)) + tuple(row)
+                for t, row in zip(times, values.itertuples(index=False))]
+
+        sql = 'INSERT OR REPLACE INTO {} (station, time, {}) VALUES ({})'.format(
+            _quote(table),
+            ', '.join(_quote(col) for col in dataframe.columns),
+            ', '.join(['?'] * (dataframe.shape[1] + 2)),
+        )
+        with self.connection:
+            self._add_columns(table, dataframe)
+            self.connection.executemany(sql, rows)
+        return len(rows)
+
+    def stations(self, source='asos'):
+        """ Station IDs stored for a source. """
+        table = self._table(source)
+        exists = self.connection.execute(
+            "SELECT 1 FROM sqlite_master WHERE type='table' AND name=?", (table,)
+        ).fetchone()
+        if not exists:
+            return []
+        # skip from one station to the next along the primary key
+        stations = []
+        row = self.connection.execute(
+            'SELECT MIN(station) FROM {}'.format(_quote(table))).fetchone()
+        while row and row[0] is not None:
+            stations.append(row[0])
+            row = self.connection.execute(
+                'SELECT MIN(station) FROM {} WHERE station > ?'.format(_quote(table)),
+                (row[0],)
+            ).fetchone()
+        return stations
+
+    def query(self, stations=None, start=None, end=None, columns=None,
+              source='asos'):
+        """
+        Read the observations of some stations over a period.
+
+        Parameters
+        ----------
+        stations : string or list of strings, optional
+            Station IDs (by default, all of them).
+        start, end : date strings or datetimes, optional
+            The first and last times to read (both included). By
+            default, the whole record.
+        columns : list of strings, optional
+            The columns to read (by default, all of them).
+        source : string, optional (default = 'asos')
+
+        Returns
+        -------
+        data : pandas.DataFrame
+            Indexed by station and time.
+
+        """
+        table = self._table(source)
+        if columns is None:
+            columns = self.columns(table)
+        else:
+            missing = set(columns) - set(self.columns(table))
+            if missing:
+                raise ValueError('unknown columns: {}'.format(', '.join(sorted(missing))))
+
+        if stations is None:
+            stations = self.stations(table)
+        elif isinstance(stations, six.string_types):
+            stations = [stations]
+
+        sql = 'SELECT station, time{} FROM {} WHERE station = ?'.format(
+            ''.join(', ' + _quote(col) for col in columns), _quote(table))
+        params = []
+        for bound, op in ((_timestamp(start), '>='), (_timestamp(end), '<=')):
+            if bound is not None:
+                sql += ' AND time {} ?'.format(op)
+                params.append(bound)
+        sql += ' ORDER BY time'
+
+        # one range scan of the primary key per station
+        rows = []
+        for sta in stations:
+            rows.extend(self.connection.execute(sql, [sta] + params))
+
+        data = pandas.DataFrame.from_records(rows, columns=['station', 'time'] + list(columns))
+        data['time'] = pandas.to_datetime(data['time'].astype(np.int64), unit='s')
+        return data.set_index(['station', 'time'])
@@ -0,0 +1,427 @@
+"""
+Instrumentation of the METAR parser.
+
+`HandlerStats` records, for every handler of the main body, trend and
+remark sections of the reports, how many times its pattern was tried,
+how often it matched and the cumulative time spent matching and
+handling groups (the trend groups all share one handler, so they are
+recorded under the names of their patterns, e.g. ``WIND_RE``). Install
+one with `metar.metar.enableInstrumentation`::
+
+    >>> from metar import metar
+    >>> stats = metar.enableInstrumentation()
+    >>> obs = metar.Metar('METAR KPDX 010053Z 31008KT 10SM FEW035 04/02 A3026')
+    >>> metar.disableInstrumentation()
+    >>> stats.snapshot()['handlers']['main']['_handleWind']['matches']
+    1
+
+`ErrorCollector` gathers the reports that the parser could not fully
+decode, in bounded memory: counts of each failure signature (e.g. the
+unparsed groups) and a few sample reports of each. Pass one to
+`metar.metar.Metar` as ``errors`` and ``flush`` it to a log file once per
+batch of reports.
+
+`UnparsedAnalyzer` streams a whole archive of reports through the parser
+and ranks the groups that it could not parse by the shape of their
+signature (see `groupSignature`), both by frequency and by the parse
+time of the reports they appear in, to show which new handlers would
+matter most. It only keeps a bounded number of counters (see
+`SpaceSaving`), however large the archive.
+
+Only the standard library is used, so that the parser stays light.
+
+"""
+from __future__ import division
+
+import heapq
+import itertools
+import string
+import time
+
+__all__ = ['SECTIONS', 'HandlerStats', 'ErrorCollector', 'groupSignature',
+           'SpaceSaving', 'UnparsedAnalyzer']
+
+# parts of a report, each with its own list of handlers
+SECTIONS = ('main', 'trend', 'remark')
+
+clock = getattr(time, 'perf_counter', time.time)
+
+try:
+    _maketrans = str.maketrans
+except AttributeError:
+    _maketrans = string.maketrans
+
+# digits become 9 and letters become A; everything else is kept
+_SHAPES = _maketrans(string.digits + string.ascii_letters,
+                     '9' * len(string.digits) + 'A' * len(string.ascii_letters))
+
+
+class HandlerStats(object):
+    """ Call counts, match counts and cumulative time of every handler
+    of the parser, over any number of reports.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.reports = 0
+        self.seconds = 0.0
+        # (section, handler name) -> [calls, matches, seconds]
+        self._handlers = {}
+
+    def record(self, section, handler, match, seconds):
+        """ Record one attempt of `handler` on the groups of `section`.
+
+        Parameters
+        ----------
+        section : string
+            One of `SECTIONS`.
+        handler : string
+            Name of the handler.
+        match : string or None
+            The matched group, or None if the pattern did not match.
+        seconds : float
+            Time spent matching (and handling) the group.
+
+        """
+        entry = self._handlers.get((section, handler))
+        if entry is None:
+            entry = self._handlers[(section, handler)] = [0, 0, 0.0]
+        entry[0] += 1
+        if match is not None:
+            entry[1] += 1
+        entry[2] += seconds
+
+    def report(self, seconds):
+        """ Record one parsed report, which took `seconds` in total.
+        """
+        self.reports += 1
+        self.seconds += seconds
+
+    def snapshot(self):
+        """ The statistics as a dictionary of plain values::
+
+            {'reports': <int>, 'seconds': <float>,
+             'handlers': {<section>: {<handler>: {'calls': <int>,
+                                                  'matches': <int>,
+                                                  'misses': <int>,
+                                                  'seconds': <float>}}}}
+
+        """
+        handlers = dict((section, {}) for section in SECTIONS)
+        for (section, handler), (calls, matches, seconds) in self._handlers.items():
+            handlers.setdefault(section, {})[handler] = {
+                'calls': calls,
+                'matches': matches,
+                'misses': calls - matches,
+                'seconds': seconds,
+            }
+        return {'reports': self.reports, 'seconds': self.seconds,
+                'handlers': handlers}
+
+    def top(self, n=10, key='seconds'):
+        """ The `n` handlers with the largest `key` ('calls', 'matches',
+        'misses' or 'seconds'), as (section, handler, value) tuples.
+        """
+        rows = []
+        for section, handlers in self.snapshot()['handlers'].items():
+            for handler, values in handlers.items():
+                rows.append((section, handler, values[key]))
+        return sorted(rows, key=lambda row: (-row[2], row[0], row[1]))[:n]
+
+    def prometheus(self, prefix='metar_parser'):
+        """ The statistics in the Prometheus text exposition format.
+        """
+        lines = [
+            '# HELP {}_reports_total Reports parsed.'.format(prefix),
+            '# TYPE {}_reports_total counter'.format(prefix),
+            '{}_reports_total {}'.format(prefix, self.reports),
+            '# HELP {}_seconds_total Time spent parsing reports.'.format(prefix),
+            '# TYPE {}_seconds_total counter'.format(prefix),
+            '{}_seconds_total {!r}'.format(prefix, self.seconds),
+        ]
+
+        metrics = [
+            ('calls', 'Pattern match attempts of each handler.'),
+            ('matches', 'Groups matched by each handler.'),
+            ('seconds', 'Time spent matching and handling groups.'),
+        ]
+        for position, (metric, description) in enumerate(metrics):
+            name = '{}_handler_{}_total'.format(prefix, metric)
+            lines.append('# HELP {} {}'.format(name, description))
+            lines.append('# TYPE {} counter'.format(name))
+            for (section, handler), values in sorted(self._handlers.items()):
+                lines.append('{}{{section="{}",handler="{}"}} {!r}'.format(
+                    name, section, handler, values[position]))
+
+        return '\n'.join(lines) + '\n'
+
+
+class ErrorCollector(object):
+    """ Aggregated counts and sample reports of parsing errors.
+
+    Parameters
+    ----------
+    maxsignatures : int, optional (default = 1000)
+        The most distinct signatures to keep. Errors with new
+        signatures beyond that are only counted in `dropped`.
+    samples : int, optional (default = 3)
+        Number of example reports kept for each signature.
+
+    """
+
+    def __init__(self, maxsignatures=1000, samples=3):
+        self.maxsignatures = maxsignatures
+        self.samples = samples
+        self.reset()
+
+    def reset(self):
+        self.total = 0
+        self.dropped = 0
+        # (kind, signature) -> [count, [examples]]
+        self._errors = {}
+
+    def __len__(self):
+        return self.total
+
+    def add(self, kind, signature, example=None):
+        """ Record one error.
+
+        Parameters
+        ----------
+        kind : string
+            What went wrong (e.g. 'unparsed', 'failed' or 'download').
+        signature : string
+            Errors with the same kind and signature are counted together.
+        example : string, optional
+            The offending report (or URL, etc.).
+
+        """
+        self.total += 1
+        entry = self._errors.get((kind, signature))
+        if entry is None:
+            if len(self._errors) >= self.maxsignatures:
+                self.dropped += 1
+                return
+            entry = self._errors[(kind, signature)] = [0, []]
+
+        entry[0] += 1
+        if example is not None and len(entry[1]) < self.samples:
+            entry[1].append(example)
+
+    def unparsed(self, groups, report):
+        """ Record the groups of `report` that no handler recognized.
+        """
+        self.add('unparsed', groups, report)
+
+    def failed(self, handler, report):
+        """ Record a handler that raised an exception on `report`.
+        """
+        self.add('failed', handler, report)
+
+    def top(self, n=10, kind=None):
+        """ The `n` most frequent errors (optionally only of one `kind`)
+        as (kind, signature, count) tuples.
+        """
+        rows = [(k, signature, entry[0])
+                for (k, signature), entry in self._errors.items()
+                if kind is None or k == kind]
+        return sorted(rows, key=lambda row: (-row[2], row[0], row[1]))[:n]
+
+    def examples(self, kind, signature):
+        """ The sample reports of an error signature.
+        """
+        entry = self._errors.get((kind, signature))
+        return list(entry[1]) if entry is not None else []
+
+    def summary(self):
+        """ One line per signature (most frequent first), followed by its
+        sample reports.
+        """
+        lines = []
+        for kind, signature, count in self.top(n=len(self._errors)):
+            lines.append("%s: '%s' (%d times)" % (kind, signature, count))
+            for example in self.examples(kind, signature):
+                lines.append("    in '%s'" % (example.strip(),))
+        if self.dropped:
+            lines.append('(%d more errors with other signatures)' % (self.dropped,))
+        return '\n'.join(lines) + '\n' if lines else ''
+
+    def flush(self, errorfile):
+        """ Append the summary to `errorfile` (a path or an open file)
+        and start over. Nothing is written if there were no errors.
+        """
+        text = self.summary()
+        if text:
+            if hasattr(errorfile, 'write'):
+                errorfile.write(text)
+            else:
+                with open(errorfile, 'a') as f:
+                    f.write(text)
+        self.reset()
+
+
+def groupSignature(group):
+    """ The shape of a group: digits become '9' and letters become 'A'
+    (e.g. 'R24/1234' becomes 'A99/9999').
+    """
+    return group.translate(_SHAPES)
+
+
+class SpaceSaving(object):
+    """ Approximate counts of the most frequent (or heaviest) items of a
+    stream, in at most `k` counters (the Space-Saving algorithm of
+    Metwally, Agrawal and El Abbadi).
+
+    Every item whose true count exceeds 1/`k` of the total is kept, and
+    no estimated count is more than its error bound above the true one.
+    The smallest counter is found in a heap, so adding an item takes
+    O(log `k`) time.
+
+    """
+
+    def __init__(self, k=100):
+        self.k = k
+        self.total = 0
+        # item -> [estimated count, maximum overestimate]
+        self._counters = {}
+        # (count, tiebreaker, item) of every counter; entries whose count
+        # is out of date are skipped when popped
+        self._heap = []
+        self._ticks = itertools.count()
+
+    def __len__(self):
+        return len(self._counters)
+
+    def __contains__(self, item):
+        return item in self._counters
+
+    def add(self, item, weight=1):
+        self.total += weight
+        counter = self._counters.get(item)
+        if counter is not None:
+            counter[0] += weight
+        elif len(self._counters) < self.k:
+            counter = self._counters[item] = [weight, 0]
+        else:
+            # the newcomer takes over the smallest counter
+            floor = self._pop_smallest()
+            counter = self._counters[item] = [floor + weight, floor]
+
+        if len(self._heap) >= 2 * self.k:
+            self._heap = [(count, next(self._ticks), key)
+                          for key, (count, error) in self._counters.items()]
+            heapq.heapify(self._heap)
+        else:
+            heapq.heappush(self._heap, (counter[0], next(self._ticks), item))
+
+    def _pop_smallest(self):
+        while True:
+            count, tick, item = heapq.heappop(self._heap)
+            counter = self._counters.get(item)
+            if counter is not None and counter[0] == count:
+                del self._counters[item]
+                return count
+
+    def top(self, n=None):
+        """ The `n` (by default, all) items with the largest counts, as
+        (item, estimated count, maximum overestimate) tuples.
+        """
+        rows = [(item, count, error) for item, (count, error) in self._counters.items()]
+        return sorted(rows, key=lambda row: (-row[1], row[0]))[:n]
+
+
+class UnparsedAnalyzer(object):
+    """ Frequency and parse time of the shapes of unparsed groups over a
+    corpus of reports.
+
+    Parameters
+    ----------
+    k : int, optional (default = 200)
+        Number of signatures tracked (see `SpaceSaving`).
+
+    Notes
+    -----
+    Signatures are (section, shape) tuples, where section is 'main' or
+    'remark'. The parse time of a report is shared equally between the
+    signatures of its unparsed groups.
+
+    Examples
+    --------
+    >>> analyzer = UnparsedAnalyzer().analyze(open('reports.txt'))
+    >>> print(analyzer.summary())
+
+    """
+
+    def __init__(self, k=200):
+        self.counts = SpaceSaving(k)
+        self.seconds = SpaceSaving(k)
+        self.errors = ErrorCollector()
+        self.reports = 0
+        self.unparsed = 0
+        self.parse_seconds = 0.0
+
+    def add(self, obs, seconds=0.0):
+        """ Record the unparsed groups of an already parsed report, which
+        took `seconds` to parse.
+        """
+        self.reports += 1
+        self.parse_seconds += seconds
+
+        signatures = [('main', groupSignature(group)) for group in obs._unparsed_groups]
+        signatures.extend(('remark', groupSignature(group)) for group in obs._unparsed_remarks)
+        if signatures:
+            self.unparsed += 1
+            share = seconds / len(signatures)
+            for signature in signatures:
+                self.counts.add(signature)
+                self.seconds.add(signature, share)
+
+    def parse(self, report, **kwargs):
+        """ Parse and record a report. Other keyword arguments are passed
+        on to `metar.metar.Metar`; failures go to `self.errors`.
+        """
+        from .metar import Metar
+
+        tic = clock()
+        obs = Metar(report, errors=self.errors, **kwargs)
+        self.add(obs, clock() - tic)
+        return obs
+
+    def analyze(self, reports, **kwargs):
+        """ Parse and record every (non-blank) report of an iterable, such
+        as an open file.
+        """
+        for report in reports:
+            report = report.strip()
+            if report:
+                self.parse(report, **kwargs)
+        return self
+
+    def top(self, n=10, by='count'):
+        """ The `n` most frequent (by='count') or expensive
+        (by='seconds') signatures, as (section, shape, value) tuples.
+        """
+        if by == 'count':
+            sketch = self.counts
+        elif by == 'seconds':
+            sketch = self.seconds
+        else:
+            raise ValueError("by must be 'count' or 'seconds'")
+        return [(section, shape, value) for (section, shape), value, error in sketch.top(n)]
+
+    def summary(self, n=20):
+        """ A table of the `n` signatures with the largest parse time.
+        """
+        lines = [
+            '%d reports, %d with unparsed groups, %.3f s' %
+            (self.reports, self.unparsed, self.parse_seconds),
+            '%-8s %-24s %10s %12s' % ('section', 'signature', 'count', 'seconds'),
+        ]
+        counts = dict(((section, shape), count)
+                      for section, shape, count in self.top(n=None, by='count'))
+        for section, shape, seconds in self.top(n, by='seconds'):
+            lines.append('%-8s %-24s %10s %12.6f' % (
+                section, shape, counts.get((section, shape), '?'), seconds))
+        return '\n'.join(lines)
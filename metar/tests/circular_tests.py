@@ -0,0 +1,79 @@
+import nose.tools as ntools
+import numpy as np
+import numpy.testing as nptest
+import pandas
+
+from metar import circular
+from metar import graphics
+
+
+class test_circular(object):
+    def setup(self):
+        self.directions = np.array([350., 10., np.nan, 20., 340.])
+        index = pandas.date_range(start='2012-01-01', periods=96,
+                                  freq=pandas.offsets.Minute(30))
+        self.series = pandas.Series(np.tile([350., 20.], 48), index=index,
+                                    name='WindDir')
+
+    def test_meanDirection(self):
+        ntools.assert_almost_equal(circular.meanDirection(self.directions), 0)
+        ntools.assert_almost_equal(circular.meanDirection([90, 180]), 135)
+        ntools.assert_true(np.isnan(circular.meanDirection([np.nan])))
+
+    def test_meanDirection_axis(self):
+        directions = np.array([[350., 10.], [80., 100.]])
+        nptest.assert_array_almost_equal(
+            circular.meanDirection(directions, axis=1), [0, 90]
+        )
+
+    def test_directionComponents(self):
+        sin, cos, valid = circular.directionComponents(self.directions)
+        nptest.assert_array_equal(valid, [True, True, False, True, True])
+        ntools.assert_equal((sin[2], cos[2]), (0, 0))
+        direction = circular.vectorDirection(sin.sum(), cos.sum(), valid.sum())
+        ntools.assert_almost_equal(direction, 0)
+        ntools.assert_true(np.isnan(circular.vectorDirection(0., 0., 0)))
+
+    def test_resultantLength(self):
+        ntools.assert_almost_equal(circular.resultantLength([45, 45, np.nan]), 1)
+        ntools.assert_almost_equal(circular.resultantLength([0, 90, 180, 270]), 0)
+
+    def test_avgDirection(self):
+        ntools.assert_almost_equal(graphics.avgDirection(np.array([80., 100.])), 90)
+        ntools.assert_almost_equal(graphics.avgDirection(np.array([350., 10.])), 360)
+
+    def test_resampleDirection(self):
+        hourly = circular.resampleDirection(self.series, 'D')
+        ntools.assert_equal(hourly.name, 'WindDir')
+        nptest.assert_array_almost_equal(hourly, [5, 5])
+
+    def test_rollingDirection(self):
+        rolling = circular.rollingDirection(self.directions, 2)
+        nptest.assert_array_almost_equal(rolling, [350, 0, 10, 20, 0])
+        rolling = circular.rollingDirection(self.directions, 2, min_periods=2)
+        nptest.assert_array_almost_equal(rolling, [np.nan, 0, np.nan, np.nan, 0])
+
+    def test_rollingDirection_series(self):
+        rolling = circular.rollingDirection(self.series, 4)
+        ntools.assert_true(rolling.index.equals(self.series.index))
+
+    def test_directionHistogram(self):
+        hist = circular.directionHistogram(self.directions, nbins=4)
+        nptest.assert_array_equal(hist, [4, 0, 0, 0])
+        hist = circular.directionHistogram([90, 95, 180], nbins=36,
+                                           weights=[1, 2, 4])
+        ntools.assert_equal(hist[9], 1)
+        ntools.assert_equal(hist[10], 2)
+        ntools.assert_equal(hist[18], 4)
+
+    def test_hourOfDay(self):
+        index = pandas.date_range(start='2012-01-01', periods=48,
+                                  freq=pandas.offsets.Hour(1))
+        rain = pandas.Series(np.arange(48.), index=index)
+        rain.iloc[5] = np.nan
+        means = circular.hourOfDay(rain)
+        ntools.assert_equal(means.shape, (24,))
+        ntools.assert_almost_equal(means[0], 12)
+        ntools.assert_almost_equal(means[5], 29)
+        nptest.assert_array_equal(circular.hourOfDay(rain, how='count')[4:7], [2, 1, 2])
+        ntools.assert_raises(ValueError, circular.hourOfDay, rain, how='junk')
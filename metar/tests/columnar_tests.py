@@ -0,0 +1,110 @@
+import os
+import shutil
+import sys
+import tempfile
+
+import nose
+import nose.tools as ntools
+import numpy as np
+
+try:
+    import pyarrow
+    import pyarrow.parquet as pq
+except ImportError:
+    raise nose.SkipTest('pyarrow is not installed')
+
+from metar import columnar
+from metar import metar
+from metar import telemetry
+
+REPORTS = [
+    'METAR KPDX 010053Z 31008KT 10SM FEW035 BKN050 04/02 A3026 RMK AO2 SLP246 T00390017',
+    'SPECI KEWR 081820Z COR 14002G18KT 1 1/2SM R04R/2000V3000FT -SHRA BR OVC063 '
+    'M11/M13 A3043 RMK AO2 PK WND 14028/1805 SLP130 P0001 T11101130',
+    'METAR EGLL 220650Z 24010KT 0800 R27R/0600U FG VV002 12/08 Q1012 RERA TEMPO 3000',
+]
+
+
+@ntools.nottest
+def getTestFile(filename):
+    return os.path.join(sys.prefix, 'metar_data', 'test_data', filename)
+
+
+class test_toRecordBatch(object):
+    def setup(self):
+        self.observations = [metar.Metar(report, month=1, year=2012) for report in REPORTS]
+        self.batch = columnar.toRecordBatch(self.observations)
+        self.rows = self.batch.to_pylist()
+
+    def test_schema(self):
+        ntools.assert_true(self.batch.schema.equals(columnar.SCHEMA))
+        ntools.assert_equal(self.batch.num_rows, 3)
+
+    def test_values(self):
+        ntools.assert_equal(self.rows[0]['station_id'], 'KPDX')
+        ntools.assert_equal(self.rows[0]['time'], self.observations[0].time)
+        ntools.assert_almost_equal(self.rows[0]['temp'], 3.9)
+        ntools.assert_almost_equal(self.rows[1]['wind_gust'], 18)
+        ntools.assert_almost_equal(self.rows[1]['press'], self.observations[1].press.value('MB'))
+        ntools.assert_almost_equal(self.rows[1]['vis'], self.observations[1].vis.value('M'))
+
+    def test_missing(self):
+        ntools.assert_true(np.isnan(self.rows[0]['wind_gust']))
+        ntools.assert_true(self.rows[0]['peak_wind_time'] is None)
+        ntools.assert_equal(self.rows[0]['runway'], [])
+
+    def test_nested(self):
+        ntools.assert_equal(self.rows[0]['sky'], [
+            {'cover': 'FEW', 'height': 3500.0, 'cloud': None},
+            {'cover': 'BKN', 'height': 5000.0, 'cloud': None},
+        ])
+        ntools.assert_equal(self.rows[1]['weather'][0]['intensity'], '-')
+        ntools.assert_equal(self.rows[1]['weather'][0]['precipitation'], 'RA')
+        ntools.assert_equal(self.rows[1]['runway'][0]['name'], '04R')
+        ntools.assert_equal(self.rows[2]['recent'][0]['precipitation'], 'RA')
+        ntools.assert_equal(self.rows[2]['trend'], ['TEMPO', '3000'])
+        ntools.assert_equal(self.rows[0]['remarks'][0], 'Automated station (type 2)')
+
+    def test_units(self):
+        metadata = columnar.SCHEMA.field('wind_speed').metadata
+        ntools.assert_equal(metadata[b'units'], b'KT')
+
+    def test_empty(self):
+        batch = columnar.toRecordBatch([])
+        ntools.assert_equal(batch.num_rows, 0)
+        ntools.assert_true(batch.schema.equals(columnar.SCHEMA))
+
+
+class test_parquet(object):
+    def setup(self):
+        self.tempdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tempdir, 'reports.parquet')
+        with open(getTestFile('metar_reports.txt'), 'r') as reports:
+            self.reports = [line.strip() for line in reports if line.strip()]
+        self.errors = telemetry.ErrorCollector()
+        batches = columnar.parseBatches(self.reports + [''], batchsize=10,
+                                        errors=self.errors)
+        self.rows = columnar.writeParquet(self.path, batches)
+
+    def teardown(self):
+        shutil.rmtree(self.tempdir)
+
+    def test_rows(self):
+        ntools.assert_equal(self.rows, len(self.reports))
+        ntools.assert_equal(pq.ParquetFile(self.path).num_row_groups, 3)
+
+    def test_read(self):
+        df = columnar.readParquet(self.path)
+        ntools.assert_equal(list(df.columns), columnar.SCHEMA.names)
+        ntools.assert_equal(list(df['code']), self.reports)
+
+    def test_columns(self):
+        df = columnar.readParquet(self.path, columns=['time', 'temp'])
+        ntools.assert_equal(list(df.columns), ['time', 'temp'])
+        ntools.assert_equal(df['temp'].dtype, np.float64)
+
+    def test_zero_copy(self):
+        # missing values are NaN rather than nulls
+        table = pq.read_table(self.path, columns=['wind_gust']).combine_chunks()
+        values = table.column('wind_gust').chunk(0).to_numpy(zero_copy_only=True)
+        ntools.assert_true(np.isnan(values).any())
@@ -3,6 +3,7 @@ import sys
 
 import nose.tools as ntools
 import datetime as dt
+import numpy as np
 import pandas
 import matplotlib
 import matplotlib.pyplot as plt
@@ -129,6 +130,103 @@ class test_exporter(object):
 
         ntools.assert_equal(known_data, test_data)
 
+    def test_dumpNCDCFormat_chunked(self):
+        whole = exporters.NCDCFormat(self.hourly, '041685', 'California',
+                                     col='precip')
+        testfilename = getTestFile('test_dumpNCDCFormat_chunked.dat')
+        exporters._HPD_WRITE_DAYS = 1
+        try:
+            data = exporters.NCDCFormat(self.hourly, '041685', 'California',
+                                        col='precip', filename=testfilename)
+        finally:
+            exporters._HPD_WRITE_DAYS = 366
+
+        with open(testfilename, 'r') as f:
+            test_data = f.read()
+
+        ntools.assert_true(data.shape[0] > 1)
+        ntools.assert_equal(''.join(whole['ncdcstring']), test_data)
+        ntools.assert_list_equal(data['ncdcstring'].tolist(), whole['ncdcstring'].tolist())
+
+
+class test_writeSWMM5(object):
+    def setup(self):
+        self.fivemin = pandas.read_csv(getTestFile('data_for_tests.csv'),
+                                       parse_dates=True, index_col=0)
+
+    def _known(self, freq, stationids):
+        known = StringIO()
+        for n, stationid in enumerate(stationids):
+            data = exporters.SWMM5Format(
+                self.fivemin, stationid, col='precip', freq=freq,
+                filename=getTestFile('test_dumpSWMM.dat')
+            )
+            data.to_csv(known, index=False, sep='\t', header=(n == 0))
+        return known.getvalue()
+
+    def test_chunks_match_SWMM5Format(self):
+        for freq in ['5min', 'hourly', 'daily']:
+            output = StringIO()
+            nrows = exporters.writeSWMM5({'Test-Station': self.fivemin}, output,
+                                         col='precip', freq=freq, chunksize=7)
+            known = self._known(freq, ['Test-Station'])
+            ntools.assert_equal(output.getvalue(), known)
+            ntools.assert_equal(nrows, len(known.splitlines()) - 1)
+
+    def test_multiple_stations(self):
+        half = self.fivemin.shape[0] // 2
+        chunks = [self.fivemin.iloc[:half], self.fivemin.iloc[half:]]
+        output = StringIO()
+        exporters.writeSWMM5([('A', self.fivemin), ('B', chunks)], output,
+                             col='precip', freq='hourly')
+        ntools.assert_equal(output.getvalue(), self._known('hourly', ['A', 'B']))
+
+
+class test_ncdc_rows(object):
+    def setup(self):
+        index = pandas.DatetimeIndex([dt.date(2013, 1, 1), dt.date(2013, 1, 2)])
+        self.data = pandas.DataFrame(
+            [[0.05, np.nan, 1.27], [np.nan, np.nan, 0.10]],
+            index=index, columns=[1, 7, 24]
+        )
+        self.known_rows = (
+            'HPD0404168500HPCPHI2013010001003'
+            '0100 00005  2400 00127  2500 00132  \n'
+            'HPD0404168500HPCPHI2013010002002'
+            '2400 00010  2500 00010  \n'
+        )
+
+    def test_rows(self):
+        rows = exporters._ncdc_rows(self.data, 'HPD0404168500HPCPHI')
+        ntools.assert_equal(rows, self.known_rows)
+
+    def test_wide_values(self):
+        # written with a wider field, as the row-by-row writer did
+        self.data.iloc[1, 2] = -0.01
+        self.data.iloc[0, 0] = 1234.56
+        rows = exporters._ncdc_rows(self.data, 'HPD0404168500HPCPHI')
+        ntools.assert_equal(rows, (
+            'HPD0404168500HPCPHI2013010001003'
+            '0100 123456  2400 00127  2500 123583  \n'
+            'HPD0404168500HPCPHI2013010002002'
+            '2400 -0001  2500 -0001  \n'
+        ))
+
+    def test_wide_values_mixed(self):
+        index = pandas.DatetimeIndex([dt.date(2013, 1, n) for n in (1, 2, 3)])
+        data = pandas.DataFrame([[0.05], [-0.01], [0.10]], index=index, columns=[1])
+        rows = exporters._ncdc_rows(data, 'HPD').splitlines(True)
+        ntools.assert_equal(rows[0], exporters._ncdc_rows(data.iloc[:1], 'HPD'))
+        ntools.assert_equal(rows[1], 'HPD2013010002002' '0100 -0001  2500 -0001  \n')
+        ntools.assert_equal(rows[2], exporters._ncdc_rows(data.iloc[2:], 'HPD'))
+
+    def test_fixed_width_digits(self):
+        digits = exporters._fixed_width_digits([7, 12345], 5)
+        ntools.assert_equal(digits.tobytes(), b'0000712345')
+
+    def test_fixed_width_digits_overflow(self):
+        ntools.assert_raises(ValueError, exporters._fixed_width_digits, [100], 2)
+
 
 class test__pop_many(object):
     def setup(self):
@@ -239,3 +337,59 @@ class testObsFromRow_WithInvalids(_baseObsFromRow):
             '045114,HPD,06HPCP,HI,1948-07-01 12:00,0.00,M\n',
             '045114,HPD,06HPCP,HI,1948-07-01 23:00,0.00,M\n'
         ]
+
+
+class test_read_ncdc_hpd(object):
+    def setup(self):
+        self.rows = [
+            'HPD04511406HPCPHI19480700010040100000000  '
+            '1300000000M 2400000000M 2500000000I \n',
+            'HPD04511406HPCPHI19480700020060100000000  '
+            '0800000185A 0900099999M 1300000000M 2400000000M '
+            '2500000185I\n',
+        ]
+        self.known_columns = ['station', 'recordtype', 'element', 'units',
+                              'date', 'precip', 'flag']
+
+    def test_columns(self):
+        data = exporters.read_ncdc_hpd(StringIO(''.join(self.rows)))
+        ntools.assert_list_equal(data.columns.tolist(), self.known_columns)
+
+    def test_values(self):
+        data = exporters.read_ncdc_hpd(StringIO(''.join(self.rows)))
+        ntools.assert_equal(data.shape[0], 8)
+        ntools.assert_equal(data['date'].iloc[0], pandas.Timestamp('1948-07-01 00:00'))
+        ntools.assert_equal(data['date'].iloc[-1], pandas.Timestamp('1948-07-02 23:00'))
+        ntools.assert_equal(data['station'].iloc[0], '045114')
+        ntools.assert_equal(data['element'].iloc[0], '06HPCP')
+        ntools.assert_list_equal(data['flag'].tolist(),
+                                 ['', 'M', 'M', '', 'A', 'M', 'M', 'M'])
+        ntools.assert_almost_equal(data['precip'].iloc[4], 1.85)
+        ntools.assert_true(np.isnan(data['precip'].iloc[5]))
+
+    def test_chunks(self):
+        chunks = list(exporters.read_ncdc_hpd(StringIO(''.join(self.rows)),
+                                              chunksize=1))
+        ntools.assert_equal(len(chunks), 2)
+        ntools.assert_list_equal(chunks[1].index.tolist(), list(range(3, 8)))
+
+    def test_empty(self):
+        data = exporters.read_ncdc_hpd(StringIO(''))
+        ntools.assert_list_equal(data.columns.tolist(), self.known_columns)
+        ntools.assert_equal(data.shape[0], 0)
+
+    def test_NCDCtoCSV_matches_rows(self):
+        known = []
+        for row in self.rows:
+            known.extend(exporters._obs_from_row(row))
+
+        csv = StringIO()
+        exporters.NCDCtoCSV(StringIO(''.join(self.rows)), csv)
+        ntools.assert_equal(csv.getvalue(), ''.join(known))
+
+    def test_blank_padded_values(self):
+        row = 'HPD04511406HPCPHI19480700010020100 00005  2500 00005  \n'
+        data = exporters.read_ncdc_hpd(StringIO(row))
+        ntools.assert_equal(data.shape[0], 1)
+        ntools.assert_almost_equal(data['precip'].iloc[0], 0.05)
+        ntools.assert_equal(data['flag'].iloc[0], '')
@@ -3,6 +3,7 @@ import sys
 
 import nose.tools as ntools
 import datetime as dt
+import numpy as np
 import pandas
 import matplotlib
 import matplotlib.pyplot as plt
@@ -62,3 +63,96 @@ class test_graphics():
             fname = getTestFile('test_temperaturePlot_%s.png' % freq)
             fig = graphics.temperaturePlot(self.df, freq=freq, fname=fname)
             ntools.assert_true(isinstance(fig, matplotlib.figure.Figure))
+
+
+class test_resampleCache(object):
+    def setup(self):
+        graphics.clearResampleCache()
+        self.df = pandas.read_csv(getTestFile('data_for_graphics_tests.csv'),
+                                  parse_dates=True, index_col=0)
+
+    def test_reuse(self):
+        data1, rule, kind = graphics._resampler(self.df, 'Precip', 'hourly')
+        ntools.assert_equal(len(graphics._resample_cache[id(self.df)][1]), 1)
+        data2, rule, kind = graphics._resampler(self.df, 'Precip', 'hourly')
+        ntools.assert_true(data1 is not data2)
+        ntools.assert_true(data1.equals(data2))
+        ntools.assert_equal(len(graphics._resample_cache[id(self.df)][1]), 1)
+
+    def test_modified_frame(self):
+        data1, rule, kind = graphics._resampler(self.df, 'Precip', 'hourly')
+        self.df.loc[self.df.index[0], 'Precip'] += 100
+        data2, rule, kind = graphics._resampler(self.df, 'Precip', 'hourly')
+        ntools.assert_almost_equal(data2.iloc[0] - data1.iloc[0], 100)
+
+    def test_callers_cant_modify_cache(self):
+        data1, rule, kind = graphics._resampler(self.df, 'Precip', 'hourly')
+        data1.index.names = ['junk']
+        data1.iloc[0] = -999
+        data2, rule, kind = graphics._resampler(self.df, 'Precip', 'hourly')
+        ntools.assert_not_equal(data2.index.names, ['junk'])
+        ntools.assert_not_equal(data2.iloc[0], -999)
+
+    def test_evicted_with_frame(self):
+        graphics._resampler(self.df, 'Precip', 'hourly')
+        frameid = id(self.df)
+        del self.df
+        ntools.assert_false(frameid in graphics._resample_cache)
+
+    def test_no_cache(self):
+        graphics._resampler(self.df, 'Precip', 'hourly', cache=False)
+        ntools.assert_false(id(self.df) in graphics._resample_cache)
+
+    def test_fillna_shares_cache(self):
+        hourly = self.df['Precip'].resample(how='sum', rule='H')
+        hourly.iloc[0] = np.nan
+        graphics.seedResampleCache(self.df, 'Precip', 'H', 'sum', hourly)
+        data1, rule, kind = graphics._resampler(self.df, 'Precip', 'hourly')
+        data2, rule, kind = graphics._resampler(self.df, 'Precip', 'hourly', fillna=0)
+        ntools.assert_equal(len(graphics._resample_cache[id(self.df)][1]), 1)
+        ntools.assert_true(np.isnan(data1.iloc[0]))
+        ntools.assert_equal(data2.iloc[0], 0)
+        ntools.assert_true(np.isnan(hourly.iloc[0]))
+
+    def test_seeded_hyetograph(self):
+        # a seeded daily rollup is plotted as is, without resampling
+        daily = self.df['Precip'].resample(how='sum', rule='D') * 2
+        daily.iloc[0] = np.nan
+        graphics.seedResampleCache(self.df, 'Precip', 'D', 'sum', daily)
+
+        resample = graphics._resample
+        def fail(*args):
+            raise AssertionError('resampled')
+        graphics._resample = fail
+        try:
+            fig = graphics.hyetograph(self.df, freq='daily')
+        finally:
+            graphics._resample = resample
+            plt.close('all')
+
+        plotted = fig.axes[0].lines[0].get_ydata()
+        np.testing.assert_array_almost_equal(plotted, daily.fillna(0).values)
+
+
+class test_windRoseTable(object):
+    def setup(self):
+        self.df = pandas.DataFrame({
+            'WindSpd': [0, 3, 7, 12, 45, 4, np.nan, 8, 25],
+            'WindDir': [0, 90, 90, 90, 180, 180, 180, np.nan, 270],
+        })
+
+    def test_table(self):
+        table = graphics.windRoseTable(self.df)
+        ntools.assert_list_equal(table.index.tolist(), [90, 180, 270])
+        ntools.assert_list_equal(table.columns.tolist(), [5, 10, 20, 30, 40])
+        known = np.array([
+            [1, 2, 3, 3, 3],
+            [1, 1, 1, 1, 1],
+            [0, 0, 0, 1, 1],
+        ]) / 9.
+        np.testing.assert_array_almost_equal(table.values, known)
+
+    def test_mph(self):
+        table = graphics.windRoseTable(self.df, mph=True, speedBins=[10])
+        ntools.assert_list_equal(table.index.tolist(), [90, 180])
+        np.testing.assert_array_almost_equal(table[10], np.array([2, 1]) / 9.)
@@ -0,0 +1,101 @@
+import os
+import subprocess
+import sys
+import time
+
+import nose.tools as ntools
+
+import metar
+
+HEAVY_MODULES = ('numpy', 'pandas', 'matplotlib', 'seaborn')
+
+# seconds that importing the parser may add to starting the interpreter
+IMPORT_BUDGET = 0.5
+
+
+@ntools.nottest
+def runPython(code):
+    env = os.environ.copy()
+    env['PYTHONPATH'] = os.path.dirname(os.path.dirname(os.path.abspath(metar.__file__)))
+    output = subprocess.check_output([sys.executable, '-c', code], env=env)
+    return output.decode('ascii').strip()
+
+
+@ntools.nottest
+def bestTime(code, repeat=5):
+    # fastest of a few fresh interpreters, to leave out noisy runs
+    times = []
+    for _ in range(repeat):
+        start = time.time()
+        runPython(code)
+        times.append(time.time() - start)
+    return min(times)
+
+
+class test_imports(object):
+    def setup(self):
+        self.heavy = repr(HEAVY_MODULES)
+
+    def test_parser_is_stdlib_only(self):
+        code = (
+            "import sys; import metar.metar, metar.datatypes; "
+            "print(','.join(m for m in {} if m in sys.modules))"
+        ).format(self.heavy)
+        ntools.assert_equal(runPython(code), '')
+
+    def test_parser_import_budget(self):
+        baseline = bestTime('pass')
+        elapsed = bestTime('import metar.metar')
+        ntools.assert_less(elapsed - baseline, IMPORT_BUDGET)
+
+    def test_parser_loads_only_parser(self):
+        code = (
+            "import sys; import metar.metar; "
+            "print(','.join(sorted(m for m in sys.modules if m.startswith('metar'))))"
+        )
+        ntools.assert_equal(runPython(code),
+                            'metar,metar.datatypes,metar.metar,metar.telemetry')
+
+    def test_lazy_submodules(self):
+        code = (
+            "import sys, metar; before = 'pandas' in sys.modules; "
+            "metar.qc; print(before, 'pandas' in sys.modules)"
+        )
+        ntools.assert_equal(runPython(code), 'False True')
+
+    def test_lazy_names(self):
+        from metar import station
+        ntools.assert_true(metar.getStationByID is station.getStationByID)
+        ntools.assert_true('WeatherStation' in dir(metar))
+
+    def test_lazy_fallback(self):
+        # the module that stands in for PEP 562 (python < 3.7)
+        code = (
+            "import sys, metar; metar._install_lazy_module(); "
+            "import metar.metar, metar.datatypes; lazy = sys.modules['metar']; "
+            "print('heavy:' + ','.join(m for m in {} if m in sys.modules), "
+            "type(lazy).__name__, 'WeatherStation' in dir(lazy)); "
+            "lazy.qc; print(lazy.getStationByID.__module__, 'pandas' in sys.modules)"
+        ).format(self.heavy)
+        ntools.assert_equal(runPython(code).split(),
+                            ['heavy:', '_LazyModule', 'True', 'metar.station', 'True'])
+
+    def test_lazy_fallback_missing_name(self):
+        code = (
+            "import sys, metar; metar._install_lazy_module(); "
+            "print(hasattr(sys.modules['metar'], 'junk'))"
+        )
+        ntools.assert_equal(runPython(code), 'False')
+
+    def test_star_import(self):
+        # without pyarrow, and without loading every submodule
+        code = (
+            "import sys; sys.modules['pyarrow'] = None; from metar import *; "
+            "print(WeatherStation.__name__, "
+            "','.join(m for m in ('metar.columnar', 'metar.store', 'metar.records') "
+            "if m in sys.modules))"
+        )
+        ntools.assert_equal(runPython(code), 'WeatherStation')
+
+    def test_missing_name(self):
+        ntools.assert_raises(AttributeError, getattr, metar, 'junk')
@@ -0,0 +1,186 @@
+import json
+import os
+import shutil
+import tempfile
+import zlib
+
+import nose.tools as ntools
+import numpy as np
+import numpy.testing as nptest
+import pandas
+
+from metar import manifest
+
+
+@ntools.nottest
+def makeTestData(start='2012-01-30', days=70):
+    index = pandas.date_range(start=start, periods=24 * days,
+                              freq='h', name='Date')
+    N = index.shape[0]
+    return pandas.DataFrame({
+        'Sta': 'KPDX',
+        'Precip': np.where(np.arange(N) % 7 == 0, 0.01, 0.0),
+        'Temp': 10 + 5 * np.sin(np.arange(N) / 100.),
+    }, index=index)
+
+
+@ntools.nottest
+def assertSameData(data, expected):
+    ntools.assert_list_equal(list(data.columns), list(expected.columns))
+    ntools.assert_list_equal(list(data.index), list(expected.index))
+    ntools.assert_list_equal(data['Sta'].tolist(), expected['Sta'].tolist())
+    nptest.assert_array_almost_equal(data[['Precip', 'Temp']].values,
+                                     expected[['Precip', 'Temp']].values)
+
+
+class test_manifest(object):
+    def setup(self):
+        self.tempdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tempdir, 'test.csv')
+        self.data = makeTestData()
+        self.info = manifest.writeCompiled(self.data, self.path, source='asos',
+                                           station='KPDX')
+
+    def teardown(self):
+        shutil.rmtree(self.tempdir)
+
+    def test_files(self):
+        ntools.assert_equal(sorted(os.listdir(self.tempdir)),
+                            ['test.csv', 'test.csv' + manifest.SUFFIX])
+
+    def test_same_as_to_csv(self):
+        self.data.to_csv(os.path.join(self.tempdir, 'plain.csv'))
+        with open(self.path, 'rb') as compiled:
+            with open(os.path.join(self.tempdir, 'plain.csv'), 'rb') as plain:
+                ntools.assert_equal(compiled.read(), plain.read())
+
+    def test_info(self):
+        info = manifest.readManifest(self.path)
+        ntools.assert_equal(info, json.loads(json.dumps(self.info)))
+        ntools.assert_equal(info['rows'], self.data.shape[0])
+        ntools.assert_equal(info['start'], '2012-01-30 00:00:00')
+        ntools.assert_equal(info['end'], '2012-04-08 23:00:00')
+        ntools.assert_equal(info['columns'], ['Sta', 'Precip', 'Temp'])
+        ntools.assert_equal(info['index'], 'Date')
+        ntools.assert_equal((info['source'], info['station']), ('asos', 'KPDX'))
+        ntools.assert_equal([month[0] for month in info['months']],
+                            ['2012-01', '2012-02', '2012-03', '2012-04'])
+
+    def test_checksum(self):
+        with open(self.path, 'rb') as compiled:
+            content = compiled.read()
+        ntools.assert_equal(self.info['crc32'], zlib.crc32(content) & 0xffffffff)
+        ntools.assert_equal(self.info['size'], len(content))
+
+    def test_month_offsets(self):
+        with open(self.path, 'rb') as compiled:
+            content = compiled.read()
+        for name, offset, row, crc in self.info['months']:
+            ntools.assert_true(content[offset:].startswith(name.encode('ascii')))
+            ntools.assert_equal(str(self.data.index[row])[:7], name)
+            ntools.assert_equal(crc, zlib.crc32(content[:offset]))
+
+    def test_stale(self):
+        with open(self.path, 'a') as compiled:
+            compiled.write('2012-05-01 00:00:00,KPDX,0.0,1.0\n')
+        ntools.assert_true(manifest.readManifest(self.path) is None)
+
+    def test_missing(self):
+        os.remove(manifest.manifestPath(self.path))
+        ntools.assert_true(manifest.readManifest(self.path) is None)
+
+    def test_read_all(self):
+        data = manifest.readCompiled(self.path)
+        assertSameData(data, self.data)
+
+    def test_read_range(self):
+        data = manifest.readCompiled(self.path, start='2012-02-27 12:00',
+                                     end='2012-03-02')
+        expected = self.data.loc['2012-02-27 12:00':'2012-03-02']
+        assertSameData(data, expected)
+
+    def test_read_range_open(self):
+        data = manifest.readCompiled(self.path, start='2012-04-08')
+        ntools.assert_equal(data.shape[0], 24)
+        data = manifest.readCompiled(self.path, end='2012-01-30')
+        ntools.assert_equal(data.shape[0], 24)
+        data = manifest.readCompiled(self.path, start='2013-01-01')
+        ntools.assert_equal(data.shape[0], 0)
+
+    def test_read_range_without_manifest(self):
+        os.remove(manifest.manifestPath(self.path))
+        manifest._CHUNKSIZE = 100
+        try:
+            data = manifest.readCompiled(self.path, start='2012-02-27 12:00',
+                                         end='2012-03-02')
+        finally:
+            manifest._CHUNKSIZE = 50000
+        expected = self.data.loc['2012-02-27 12:00':'2012-03-02']
+        assertSameData(data, expected)
+
+    def test_empty(self):
+        path = os.path.join(self.tempdir, 'empty.csv')
+        info = manifest.writeCompiled(self.data.iloc[:0], path)
+        ntools.assert_equal(info['rows'], 0)
+        ntools.assert_true(info['start'] is None)
+        ntools.assert_equal(info['months'], [])
+
+    def test_append(self):
+        # the last month is read again, with a correction and new rows
+        new = makeTestData().loc['2012-04-01':]
+        new = pandas.concat([new, makeTestData('2012-04-09', days=10)])
+        new.loc['2012-04-02 05:00', 'Temp'] = -1.0
+
+        info = manifest.appendCompiled(new, self.path, self.info)
+        expected = pandas.concat([self.data.loc[:'2012-03-31'], new])
+        assertSameData(manifest.readCompiled(self.path), expected)
+
+        ntools.assert_equal(manifest.readManifest(self.path), json.loads(json.dumps(info)))
+        ntools.assert_equal(info['rows'], expected.shape[0])
+        ntools.assert_equal(info['start'], self.info['start'])
+        ntools.assert_equal(info['end'], '2012-04-18 23:00:00')
+        ntools.assert_equal([month[0] for month in info['months']],
+                            ['2012-01', '2012-02', '2012-03', '2012-04'])
+
+    def test_append_same_as_write(self):
+        new = makeTestData().loc['2012-03-15':]
+        info = manifest.appendCompiled(new, self.path, self.info)
+
+        path = os.path.join(self.tempdir, 'whole.csv')
+        whole = manifest.writeCompiled(pandas.concat([self.data.loc[:'2012-02'], new]),
+                                       path, source='asos', station='KPDX')
+        with open(self.path, 'rb') as appended:
+            with open(path, 'rb') as written:
+                ntools.assert_equal(appended.read(), written.read())
+        for key in ['rows', 'start', 'end', 'crc32', 'size', 'months']:
+            ntools.assert_equal(info[key], whole[key])
+
+    def test_append_after_end(self):
+        new = makeTestData('2012-06-01')
+        info = manifest.appendCompiled(new, self.path, self.info)
+        ntools.assert_equal(info['rows'], 2 * self.data.shape[0])
+        ntools.assert_equal(len(info['months']), 7)
+        data = manifest.readCompiled(self.path, start='2012-04-08', end='2012-06-01')
+        ntools.assert_equal(data.shape[0], 48)
+
+    def test_rename_without_replace(self):
+        # python 2 has no os.replace
+        replace = os.replace
+        del os.replace
+        try:
+            new = makeTestData().loc['2012-04-01':]
+            info = manifest.appendCompiled(new, self.path, self.info)
+        finally:
+            os.replace = replace
+        ntools.assert_equal(manifest.readManifest(self.path), json.loads(json.dumps(info)))
+        ntools.assert_equal(sorted(os.listdir(self.tempdir)),
+                            ['test.csv', 'test.csv' + manifest.SUFFIX])
+
+    def test_append_nothing(self):
+        info = manifest.appendCompiled(self.data.iloc[:0], self.path, self.info)
+        ntools.assert_true(info is self.info)
+        ntools.assert_true(manifest.readManifest(self.path) is not None)
+
+    @ntools.raises(ValueError)
+    def test_append_other_columns(self):
+        manifest.appendCompiled(self.data[['Temp']], self.path, self.info)
@@ -0,0 +1,204 @@
+import datetime as dt
+
+import nose.tools as ntools
+import numpy as np
+import numpy.testing as nptest
+import pandas
+
+from metar import ncdc
+
+
+@ntools.nottest
+def makeHPDData():
+    records = [
+        (dt.datetime(1950, 1, 1, 5), 10, ' '),
+        (dt.datetime(1950, 1, 2, 3), 99999, ' '),
+        (dt.datetime(1950, 1, 2, 9), 25, 'A'),
+        (dt.datetime(1950, 3, 4, 0), 0, '{'),
+        (dt.datetime(1950, 3, 5, 12), 0, '}'),
+        (dt.datetime(1950, 7, 1, 1), 0, '['),
+        (dt.datetime(1951, 2, 1, 0), 0, ']'),
+        (dt.datetime(1951, 6, 1, 4), 12, ' '),
+    ]
+    data = pandas.DataFrame(records, columns=['DATE', 'HPCP', 'Measurement Flag'])
+    data['STATION'] = 'COOP:000001'
+    data['STATION_NAME'] = 'TEST STATION'
+    return data
+
+
+@ntools.nottest
+def assertMatchesDense(records):
+    data = pandas.DataFrame(records, columns=['DATE', 'HPCP', 'Measurement Flag'])
+    data['STATION'] = 'COOP:000001'
+    data['STATION_NAME'] = 'TEST STATION'
+    intervals, name = ncdc.setupStationIntervals(data, 'COOP:000001',
+                                                 baseyear=1949, futureyear=1951)
+    dense, _ = ncdc.setupStationData(data, 'COOP:000001', baseyear=1949)
+    dense = dense.loc[:dt.datetime(1951, 12, 31, 23)]
+    status = ncdc.intervalStatus(intervals)
+    nptest.assert_array_equal(status.index, dense.index)
+    nptest.assert_array_equal(status['status'], dense['status'])
+
+
+class test_stationIntervals(object):
+    def setup(self):
+        self.data = makeHPDData()
+        self.coopid = 'COOP:000001'
+        self.intervals, self.name = ncdc.setupStationIntervals(
+            self.data, self.coopid, baseyear=1949, futureyear=1951
+        )
+        self.dense, _ = ncdc.setupStationData(
+            self.data, self.coopid, baseyear=1949
+        )
+        self.dense = self.dense.loc[:dt.datetime(1951, 12, 31, 23)]
+
+    def test_name(self):
+        ntools.assert_equal(self.name, 'TEST STATION')
+
+    def test_columns(self):
+        ntools.assert_list_equal(self.intervals.columns.tolist(),
+                                 ['start', 'end', 'hours', 'status'])
+
+    def test_contiguous(self):
+        nptest.assert_array_equal(self.intervals['start'].values[1:],
+                                  self.intervals['end'].values[:-1])
+        ntools.assert_true((np.diff(self.intervals['status'].values) != 0).all())
+
+    def test_known_intervals(self):
+        known_status = [3, 0, 1, 0, 2, 0, 3, 0, 3]
+        known_hours = [2213, 22, 7, 1454, 37, 2820, 5160, 2884, 5131]
+        nptest.assert_array_equal(self.intervals['status'], known_status)
+        nptest.assert_array_equal(self.intervals['hours'], known_hours)
+
+    def test_intervalStatus_matches_dense(self):
+        status = ncdc.intervalStatus(self.intervals)
+        nptest.assert_array_equal(status.index, self.dense.index)
+        nptest.assert_array_equal(status['status'], self.dense['status'])
+
+    def test_intervalStatus_no_flags(self):
+        assertMatchesDense([
+            (dt.datetime(1950, 1, 1, 5), 10, ' '),
+            (dt.datetime(1950, 1, 1, 6), 20, ' '),
+        ])
+
+    def test_intervalStatus_no_accumulations(self):
+        assertMatchesDense([
+            (dt.datetime(1950, 1, 1, 5), 10, ' '),
+            (dt.datetime(1950, 3, 4, 0), 0, '{'),
+            (dt.datetime(1950, 3, 5, 12), 0, '}'),
+            (dt.datetime(1950, 7, 1, 1), 0, '['),
+            (dt.datetime(1951, 2, 1, 0), 0, ']'),
+            (dt.datetime(1951, 6, 1, 4), 12, ' '),
+        ])
+
+    def test_intervalStatus_lookup(self):
+        dates = [dt.datetime(1940, 1, 1), dt.datetime(1950, 1, 2, 5),
+                 dt.datetime(1950, 3, 5, 12), dt.datetime(1950, 3, 5, 13)]
+        status = ncdc.intervalStatus(self.intervals, dates)
+        nptest.assert_array_equal(status['status'], [3, 1, 2, 0])
+
+    def test_intervalPctAvail(self):
+        pct = ncdc.intervalPctAvail(self.intervals, self.coopid)
+        ntools.assert_list_equal(pct.index.tolist(), ['1949', '1950', '1951'])
+        ntools.assert_equal(pct.index.name, 'Yr')
+        known_pct = [0, (22 + 1454 + 2820) / 87.60, 2884 / 87.60]
+        nptest.assert_array_almost_equal(pct[self.coopid], known_pct)
+
+    def test_statusGrid(self):
+        grid = ncdc._statusGrid(self.dense.index, self.dense['status'].values)
+        ntools.assert_list_equal(grid.index.tolist(), ['1949', '1950', '1951'])
+        ntools.assert_equal(grid.shape, (3, 8760))
+        ntools.assert_equal(grid.columns[0], '01-01-00:00')
+        ntools.assert_equal(grid.columns[-1], '12-31-23:00')
+        ntools.assert_true(np.isnan(grid.loc['1949', '09-30-23:00']))
+        ntools.assert_equal(grid.loc['1950', '01-02-05:00'], 1)
+
+    def test_getPctAvail(self):
+        grid = ncdc._statusGrid(self.dense.index, self.dense['status'].values)
+        pct = ncdc.getPctAvail(grid, self.coopid)
+        known = ncdc.intervalPctAvail(self.intervals, self.coopid)
+        ntools.assert_list_equal(pct.index.tolist(), known.index.tolist())
+        nptest.assert_array_almost_equal(pct[self.coopid], known[self.coopid])
+
+    def test_intervalGrid(self):
+        known = ncdc._statusGrid(self.dense.index, self.dense['status'].values)
+        grid = ncdc._intervalGrid(self.intervals)
+        ntools.assert_list_equal(grid.index.tolist(), known.index.tolist())
+        ntools.assert_list_equal(grid.columns.tolist(), known.columns.tolist())
+        nptest.assert_array_equal(grid.values, known.values)
+
+    def test_intervalAvailability_monthly(self):
+        pct = ncdc.intervalAvailability(self.intervals, freq='M')
+        ntools.assert_equal(pct.shape, (3, 12))
+        ntools.assert_list_equal(pct.index.tolist(), ['1949', '1950', '1951'])
+        ntools.assert_equal(pct.columns[0], '01')
+        ntools.assert_true(np.isnan(pct.loc['1949', '09']))
+
+        status = self.dense['status']
+        for year, month in [(1949, 10), (1950, 1), (1950, 3), (1950, 7), (1951, 2)]:
+            hours = status[(status.index.year == year) & (status.index.month == month)]
+            known = (hours == 0).mean() * 100
+            ntools.assert_almost_equal(pct.loc[str(year), '{:02d}'.format(month)], known)
+
+    def test_intervalAvailability_daily(self):
+        pct = ncdc.intervalAvailability(self.intervals, freq='D')
+        ntools.assert_equal(pct.shape, (3, 366))
+        ntools.assert_true(np.isnan(pct.loc['1950', '02-29']))
+
+        status = self.dense['status']
+        known = (status == 0).groupby(status.index.date).mean() * 100
+        for day, value in known.items():
+            ntools.assert_almost_equal(pct.loc[day.strftime('%Y'), day.strftime('%m-%d')], value)
+
+    def test_intervalAvailability_yearly(self):
+        # weighted by the hours of each month, the cells add up to the
+        # yearly percentages
+        pct = ncdc.intervalAvailability(self.intervals, freq='D')
+        known = ncdc.intervalPctAvail(self.intervals, self.coopid)
+        nptest.assert_array_almost_equal(pct.mean(axis=1), known[self.coopid])
+
+    @ntools.raises(ValueError)
+    def test_intervalAvailability_freq(self):
+        ncdc.intervalAvailability(self.intervals, freq='H')
+
+
+class test_storms(object):
+    def setup(self):
+        index = pandas.date_range(start='2012-01-01', periods=48,
+                                  freq=pandas.offsets.Hour(1))
+        index.name = 'date'
+        precip = np.zeros(48)
+        precip[[2, 3, 5, 20, 30, 40]] = [0.1, 0.2, 0.05, 0.01, 0.3, 0.4]
+        self.data = pandas.DataFrame({'precip': precip}, index=index)
+        self.storms = ncdc.labelStorms(self.data, interevent=6, minprecip=0.02)
+
+    def test_labelStorms(self):
+        known_storms = np.zeros(48, dtype=int)
+        known_storms[2:6] = 1
+        known_storms[30] = 2
+        known_storms[40] = 3
+        nptest.assert_array_equal(self.storms['storm'], known_storms)
+        ntools.assert_false('storm' in self.data.columns)
+
+    def test_labelStorms_interevent(self):
+        storms = ncdc.labelStorms(self.data, interevent=10)
+        ntools.assert_equal(storms['storm'].max(), 2)
+        ntools.assert_true((storms['storm'].iloc[20:41] == 2).all())
+
+    def test_labelStorms_dry(self):
+        storms = ncdc.labelStorms(self.data * 0)
+        ntools.assert_equal(storms['storm'].max(), 0)
+
+    def test_summarizeStorms(self):
+        summary = ncdc.summarizeStorms(self.storms)
+        ntools.assert_list_equal(summary.columns.tolist(), [
+            'Antecedent Days', 'Previous Storm End',
+            'Start Date', 'End Date', 'Duration Hours',
+            'Total', 'Avg Inten.', 'Max Inten.'
+        ])
+        nptest.assert_array_almost_equal(summary['Total'], [0.35, 0.3, 0.4])
+        nptest.assert_array_almost_equal(summary['Duration Hours'], [3, 0, 0])
+        nptest.assert_array_almost_equal(summary['Antecedent Days'],
+                                         [np.nan, 25 / 24., 10 / 24.])
+        ntools.assert_equal(summary['Start Date'].iloc[1],
+                            pandas.Timestamp('2012-01-02 06:00'))
@@ -0,0 +1,93 @@
+import nose.tools as ntools
+import numpy as np
+import numpy.testing as nptest
+import pandas
+
+from metar import qc
+
+
+@ntools.nottest
+def makeTestData():
+    index = pandas.date_range(start='2012-01-01', periods=12, freq='5min')
+    data = pandas.DataFrame({
+        'Precip': [0.0, 0.01, 0.0, -0.02, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0],
+        'Temp': [10.0, 10.5, 11.0, 25.0, 11.5, 11.0, 10.5, 10.0, 9.5, 9.0, 8.5, 8.0],
+        'DewPnt': [5.0, 5.0, 5.0, 5.0, 5.0, 5.0, 5.0, 5.0, 12.0, np.nan, 5.0, 5.0],
+        'WindSpd': [5.0, 5.0, 5.0, 5.0, 200.0, 5.0, 5.0, 5.0, 5.0, 5.0, 5.0, 5.0],
+        'AtmPress': [30.0, 30.01, 30.02, 30.02, 30.02, 30.03, 29.5, 29.5,
+                     29.5, 29.5, 29.5, 29.5],
+    }, index=index)
+    return data
+
+
+class test_qc(object):
+    def setup(self):
+        self.data = makeTestData()
+
+    def test_rangeCheck(self):
+        flagged = qc.rangeCheck(self.data, qc.DEFAULT_RULES['range'])
+        nptest.assert_array_equal(np.nonzero(flagged)[0], [3, 4])
+
+    def test_rangeCheck_missing_column(self):
+        flagged = qc.rangeCheck(self.data, {'Junk': (0, 1)})
+        ntools.assert_false(flagged.any())
+
+    def test_stepCheck(self):
+        flagged = qc.stepCheck(self.data, {'Temp': 10, 'AtmPress': 0.3})
+        nptest.assert_array_equal(np.nonzero(flagged)[0], [3, 4, 6])
+
+    def test_stepCheck_maxgap(self):
+        flagged = qc.stepCheck(self.data, {'Temp': 10}, maxgap=0.05)
+        ntools.assert_false(flagged.any())
+
+    def test_spikeCheck(self):
+        flagged = qc.spikeCheck(self.data, {'Temp': 6, 'AtmPress': 0.15})
+        nptest.assert_array_equal(np.nonzero(flagged)[0], [3])
+
+    def test_spikeCheck_skips_nulls(self):
+        flagged = qc.spikeCheck(self.data, {'DewPnt': 6})
+        nptest.assert_array_equal(np.nonzero(flagged)[0], [8])
+
+    def test_persistenceCheck(self):
+        flagged = qc.persistenceCheck(self.data, {'AtmPress': 0.25})
+        nptest.assert_array_equal(np.nonzero(flagged)[0], np.arange(6, 12))
+
+    def test_hpa_pressures(self):
+        # Q-group stations report pressures in hPa
+        data = self.data.copy()
+        data['AtmPress'] = data['AtmPress'] * 33.8639
+        for rules in [qc.DEFAULT_RULES['range'], {'AtmPress': (26.0, 32.5)}]:
+            nptest.assert_array_equal(qc.rangeCheck(data, rules),
+                                      qc.rangeCheck(self.data, rules))
+        nptest.assert_array_equal(qc.stepCheck(data, {'AtmPress': 0.3}),
+                                  qc.stepCheck(self.data, {'AtmPress': 0.3}))
+
+    def test_hpa_out_of_range(self):
+        data = self.data.copy()
+        data['AtmPress'] = 1013.0
+        data.loc[data.index[2], 'AtmPress'] = 1150.0
+        flagged = qc.rangeCheck(data, {'AtmPress': (26.0, 32.5)})
+        nptest.assert_array_equal(np.nonzero(flagged)[0], [2])
+
+    def test_consistencyCheck(self):
+        flagged = qc.consistencyCheck(self.data, qc.DEFAULT_RULES['consistency'])
+        nptest.assert_array_equal(np.nonzero(flagged)[0], [8])
+
+    def test_flagData(self):
+        flagged = qc.flagData(self.data)
+        ntools.assert_true('QCFlag' in flagged.columns)
+        ntools.assert_false('QCFlag' in self.data.columns)
+        ntools.assert_equal(flagged['QCFlag'].iloc[0], 0)
+        ntools.assert_equal(flagged['QCFlag'].iloc[3], qc.RANGE | qc.STEP | qc.SPIKE)
+        ntools.assert_equal(flagged['QCFlag'].iloc[8], qc.SPIKE | qc.CONSISTENCY)
+
+    def test_flagData_disable_rule(self):
+        flagged = qc.flagData(self.data, rules={'spike': None}, flagcol='flag')
+        ntools.assert_equal(flagged['flag'].iloc[8], qc.CONSISTENCY)
+
+    def test_flagData_bad_index(self):
+        ntools.assert_raises(ValueError, qc.flagData, self.data.reset_index())
+
+    def test_decodeFlag(self):
+        ntools.assert_list_equal(qc.decodeFlag(qc.RANGE | qc.SPIKE), ['range', 'spike'])
+        ntools.assert_list_equal(qc.decodeFlag(0), [])
@@ -0,0 +1,136 @@
+import os
+import pickle
+import sys
+
+import nose.tools as ntools
+
+from metar import metar
+from metar import records
+from metar import telemetry
+
+REPORTS = [
+    'METAR KPDX 010053Z 31008KT 10SM FEW035 BKN050 04/02 A3026 RMK AO2 SLP246 T00390017',
+    'SPECI KEWR 081820Z COR 14002G18KT 1 1/2SM R04R/2000V3000FT -SHRA BR OVC063 '
+    'M11/M13 A3043 RMK AO2 PK WND 14028/1805 SLP130 P0001 60012 T11101130 10012 21012',
+    'METAR EGLL 220650Z 24010KT 200V280 0800 R27R/0600U FG VV002 12/08 Q1012 RERA '
+    'WS RWY27R TEMPO 3000',
+    'METAR KDEN 010053Z 00000KT 10SM CLR 04/M02 A3026 RMK AO2 TSB05E30 XQZ $',
+]
+
+
+@ntools.nottest
+def getTestFile(filename):
+    return os.path.join(sys.prefix, 'metar_data', 'test_data', filename)
+
+
+@ntools.nottest
+def parse(code):
+    return metar.Metar(code, month=1, year=2012, errors=telemetry.ErrorCollector())
+
+
+def _state(value):
+    """ Comparable form of a Metar, its datatypes and their containers. """
+    if isinstance(value, (list, tuple)):
+        return [_state(item) for item in value]
+    if isinstance(value, metar.PresentWeather):
+        return value
+    if hasattr(value, '__dict__'):
+        state = dict((name, _state(item)) for name, item in value.__dict__.items()
+                     if name not in ('_now', '_utcdelta') and item is not None)
+        return type(value).__name__, state
+    return value
+
+
+class test_records(object):
+    def setup(self):
+        self.observations = [parse(report) for report in REPORTS]
+        with open(getTestFile('metar_reports.txt'), 'r') as reports:
+            self.observations.extend(parse(line.strip()) for line in reports
+                                     if line.strip())
+
+    def test_roundtrip(self):
+        for obs in self.observations:
+            copy = records.fromBytes(records.toBytes(obs))
+            ntools.assert_equal(_state(copy), _state(obs))
+            ntools.assert_equal(copy.string(), obs.string())
+
+    def test_methods(self):
+        obs = self.observations[1]
+        copy = metar.Metar.from_bytes(obs.to_bytes())
+        ntools.assert_equal(copy.code, obs.code)
+        ntools.assert_equal(copy.type, 'SPECI')
+        ntools.assert_equal(copy.wind_gust.value(), 18)
+        ntools.assert_equal(copy.vis.string('SM'), obs.vis.string('SM'))
+        ntools.assert_equal(copy.runway[0][2].value(), 3000)
+        ntools.assert_equal(copy.peak_wind_time, obs.peak_wind_time)
+        ntools.assert_equal(copy.precip_1hr.value(), 0.01)
+
+    def test_shared(self):
+        # weather groups come from the shared table, and runways without
+        # a range keep a single distance
+        obs = self.observations[2]
+        copy = records.fromBytes(records.toBytes(obs))
+        ntools.assert_true(copy.weather[0] is obs.weather[0])
+        name, low, high = copy.runway[0]
+        ntools.assert_true(low is high)
+
+    def test_unset(self):
+        obs = records.fromBytes(records.toBytes(self.observations[0]))
+        ntools.assert_true(obs.wind_gust is None)
+        ntools.assert_equal(obs.recent, [])
+        ntools.assert_false(obs._trend)
+
+    def test_unparsed(self):
+        obs = self.observations[3]
+        copy = records.fromBytes(records.toBytes(obs))
+        ntools.assert_equal(copy._unparsed_remarks[-2:], ['XQZ', '$'])
+        ntools.assert_equal(copy._unparsed_remarks, obs._unparsed_remarks)
+
+    def test_literal(self):
+        # values outside the vocabularies are stored as strings
+        obs = self.observations[0]
+        obs.mod = u'\u00c9T\u00c9'
+        obs.sky.append(('OVC', None, 'XX'))
+        copy = records.fromBytes(records.toBytes(obs))
+        ntools.assert_equal(copy.mod, u'\u00c9T\u00c9')
+        ntools.assert_equal(copy.sky[-1], ('OVC', None, 'XX'))
+
+    def test_smaller_than_pickle(self):
+        for obs in self.observations:
+            ntools.assert_less(len(records.toBytes(obs)) * 3,
+                               len(pickle.dumps(obs, pickle.HIGHEST_PROTOCOL)))
+
+    def test_batch(self):
+        data = records.batchToBytes(self.observations)
+        copies = records.batchFromBytes(bytearray(data))
+        ntools.assert_equal([_state(obs) for obs in copies],
+                            [_state(obs) for obs in self.observations])
+
+    def test_empty_batch(self):
+        ntools.assert_equal(records.batchFromBytes(records.batchToBytes([])), [])
+
+    @ntools.raises(records.RecordError)
+    def test_version(self):
+        data = bytearray(records.toBytes(self.observations[0]))
+        data[2] = records.VERSION + 1
+        records.fromBytes(data)
+
+    @ntools.raises(records.RecordError)
+    def test_magic(self):
+        records.fromBytes(records.batchToBytes(self.observations))
+
+    @ntools.raises(records.RecordError)
+    def test_truncated(self):
+        records.fromBytes(records.toBytes(self.observations[0])[:-10])
+
+    @ntools.raises(records.RecordError)
+    def test_bad_type(self):
+        obs = self.observations[0]
+        obs.temp = 4.0
+        records.toBytes(obs)
+
+    @ntools.raises(records.RecordError)
+    def test_out_of_range(self):
+        obs = self.observations[0]
+        obs.cycle = -1
+        records.toBytes(obs)
@@ -0,0 +1,134 @@
+import itertools
+import os
+import sys
+
+import nose.tools as ntools
+
+from metar import metar
+from metar import telemetry
+
+
+@ntools.nottest
+def getTestFile(filename):
+    return os.path.join(sys.prefix, 'metar_data', 'test_data', filename)
+
+
+@ntools.nottest
+def parse(code):
+    return metar.Metar(code, month=1, year=2012,
+                       errors=telemetry.ErrorCollector())
+
+
+# the text descriptions as they were built before the phrase tables
+def _reference_present_weather(obs):
+    text_list = []
+    for weatheri in obs.weather:
+        (inteni, desci, preci, obsci, otheri) = weatheri.info
+        text_parts = []
+        code_parts = []
+        for code, text in ((inteni, weatheri.intensity),
+                           (desci, weatheri.description),
+                           (preci, weatheri.precip),
+                           (obsci, weatheri.obscuration),
+                           (otheri, weatheri.other)):
+            if code:
+                code_parts.append(code)
+                text_parts.append(text)
+
+        code = " ".join(code_parts)
+        if code in metar.WEATHER_SPECIAL:
+            text_list.append(metar.WEATHER_SPECIAL[code])
+        else:
+            text_list.append(" ".join(text_parts))
+    return "; ".join(text_list)
+
+
+def _reference_sky_conditions(obs, sep="; "):
+    text_list = []
+    for cover, height, cloud in obs.sky:
+        if cover == "SKC" or cover == "CLR":
+            text_list.append(metar.SKY_COVER[cover])
+        else:
+            if cloud:
+                what = metar.CLOUD_TYPE[cloud]
+            elif cover != "OVC":
+                what = "clouds"
+            else:
+                what = ""
+
+            if cover == "VV":
+                text_list.append("%s%s, visibility to %s" %
+                                 (metar.SKY_COVER[cover], what, str(height)))
+            else:
+                text_list.append("%s%s at %s" %
+                                 (metar.SKY_COVER[cover], what, str(height)))
+    return sep.join(text_list)
+
+
+def _reference_xlate_loc(loc):
+    for code, english in metar.loc_terms:
+        loc = loc.replace(code, english)
+    return loc
+
+
+class test_string(object):
+    def setup(self):
+        with open(getTestFile('metar_reports.txt'), 'r') as reports:
+            self.reports = [line.strip() for line in reports if line.strip()]
+        with open(getTestFile('known_metar_strings.txt'), 'r') as known:
+            self.known = known.read().rstrip('\n').split('\n====\n')
+
+    def test_known(self):
+        ntools.assert_equal(len(self.reports), len(self.known))
+        for report, known in zip(self.reports, self.known):
+            ntools.assert_equal(parse(report).string(), known)
+
+    def test_repeated(self):
+        # phrases are reused the second time around
+        for report, known in zip(self.reports, self.known):
+            ntools.assert_equal(parse(report).string(), known)
+
+
+class test_present_weather(object):
+    def setup(self):
+        combinations = itertools.product(
+            ['', '-', '+', 'VC'],
+            ['', 'SH', 'TS', 'FZ', 'BLDR'],
+            ['', 'RA', 'SN', 'RASN', 'SNRAGS', '//'],
+            ['', 'BR', 'HZ'],
+            ['', 'FC', 'SQ'],
+        )
+        self.groups = [''.join(parts) for parts in combinations if ''.join(parts[1:])]
+
+    def test_parity(self):
+        for group in self.groups:
+            obs = parse('KEWR 101651Z 00000KT 10SM %s CLR 20/10 A3000' % group)
+            ntools.assert_equal(obs.present_weather(), _reference_present_weather(obs))
+
+    def test_unknown_code(self):
+        # used to raise a TypeError
+        obs = parse('KEWR 101651Z 00000KT 10SM / -RA CLR 20/10 A3000')
+        ntools.assert_equal(obs.present_weather(), 'light rain')
+
+
+class test_sky_conditions(object):
+    def setup(self):
+        combinations = itertools.product(
+            ['SKC', 'CLR', 'FEW', 'SCT', 'BKN', 'OVC', 'VV'],
+            ['', '000', '008', '250'],
+            ['', 'CB', 'TCU'],
+        )
+        self.groups = [''.join(parts) for parts in combinations]
+
+    def test_parity(self):
+        for group in self.groups:
+            obs = parse('KEWR 101651Z 00000KT 10SM %s %s 20/10 A3000' % (group, group))
+            ntools.assert_equal(obs.sky_conditions(), _reference_sky_conditions(obs))
+            ntools.assert_equal(obs.sky_conditions("\n     "),
+                                _reference_sky_conditions(obs, "\n     "))
+
+
+class test_xlate_loc(object):
+    def test_parity(self):
+        for loc in ['OHD', 'VC', 'DSNT N', 'OHD AND NW-N-E', 'DSNT  SE AND VC', 'NE']:
+            ntools.assert_equal(metar.xlate_loc(loc), _reference_xlate_loc(loc))
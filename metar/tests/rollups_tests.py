@@ -0,0 +1,145 @@
+import os
+import shutil
+import tempfile
+
+import nose.tools as ntools
+import numpy as np
+import numpy.testing as nptest
+import pandas
+
+from metar import graphics
+from metar import rollups
+
+
+@ntools.nottest
+def makeTestData():
+    index = pandas.date_range(start='2012-01-30', periods=2 * 24 * 12 * 3,
+                              freq=pandas.offsets.Minute(5))
+    N = index.shape[0]
+    data = pandas.DataFrame({
+        'Precip': np.where(np.arange(N) % 7 == 0, 0.01, 0.0),
+        'Temp': 10 + 5 * np.sin(np.arange(N) / 100.),
+        'WindDir': np.where(np.arange(N) % 2 == 0, 350.0, 20.0),
+        'Sta': 'KPDX',
+    }, index=index)
+    data.loc[data.index[:12], 'Temp'] = np.nan
+    return data
+
+
+class test_rollups(object):
+    def setup(self):
+        graphics.clearResampleCache()
+        self.data = makeTestData()
+        self.rollups = rollups.buildRollups(self.data)
+        self.tempdir = tempfile.mkdtemp()
+
+    def teardown(self):
+        shutil.rmtree(self.tempdir)
+
+    def test_levels(self):
+        ntools.assert_equal(sorted(self.rollups.keys()),
+                            ['daily', 'hourly', 'monthly'])
+        ntools.assert_equal(self.rollups['monthly'].shape[0], 2)
+        ntools.assert_list_equal(sorted(self.rollups['daily'].columns),
+                                 ['Precip', 'Temp', 'WindDir'])
+
+    def test_sums(self):
+        for name in ['hourly', 'daily', 'monthly']:
+            ntools.assert_almost_equal(self.rollups[name]['Precip'].sum(),
+                                       self.data['Precip'].sum())
+
+    def test_means(self):
+        ntools.assert_true(np.isnan(self.rollups['hourly']['Temp'].iloc[0]))
+        ntools.assert_almost_equal(self.rollups['hourly']['Temp'].iloc[1],
+                                   self.data['Temp'].iloc[12:24].mean())
+        ntools.assert_almost_equal(self.rollups['daily']['Temp'].iloc[0],
+                                   self.data['Temp'].iloc[:288].mean())
+
+    def test_circular_mean(self):
+        nptest.assert_array_almost_equal(self.rollups['daily']['WindDir'],
+                                         [5] * 6)
+
+    def test_write_read(self):
+        rollups.writeRollups(self.rollups, self.tempdir, 'test.csv')
+        ntools.assert_true(os.path.exists(os.path.join(self.tempdir, 'test_daily.csv')))
+        known = rollups.readRollups(self.tempdir, 'test.csv')
+        for name in ['hourly', 'daily', 'monthly']:
+            nptest.assert_array_almost_equal(known[name]['Temp'],
+                                             self.rollups[name]['Temp'])
+            nptest.assert_array_equal(known[name].index, self.rollups[name].index)
+
+    def test_merge(self):
+        # rebuilding from the start of a month gives the same rollups
+        since = pandas.Timestamp('2012-02-01')
+        new = rollups.buildRollups(self.data[self.data.index >= since])
+        merged = rollups.mergeRollups(self.rollups, new, since)
+        for name in ['hourly', 'daily', 'monthly']:
+            ntools.assert_list_equal(list(merged[name].index),
+                                     list(self.rollups[name].index))
+            nptest.assert_array_almost_equal(merged[name].values,
+                                             self.rollups[name].values)
+
+    def test_merge_span(self):
+        since = pandas.Timestamp('2012-02-01')
+        new = rollups.buildRollups(self.data[self.data.index >= since])
+        start, end = self.data.index[0], self.data.index[-1]
+        merged = rollups.mergeRollups(self.rollups, new, since, start, end)
+        for name in ['hourly', 'daily', 'monthly']:
+            nptest.assert_array_almost_equal(merged[name].values,
+                                             self.rollups[name].values)
+
+    def test_merge_missing_level(self):
+        since = pandas.Timestamp('2012-02-01')
+        new = rollups.buildRollups(self.data[self.data.index >= since])
+        old = dict(self.rollups)
+        del old['daily']
+        ntools.assert_true(rollups.mergeRollups(old, new, since) is None)
+
+    def test_merge_short_level(self):
+        # the saved hourly level stops before the kept data do
+        since = pandas.Timestamp('2012-02-01')
+        new = rollups.buildRollups(self.data[self.data.index >= since])
+        old = dict(self.rollups)
+        old['hourly'] = old['hourly'].iloc[:0]
+        start, end = self.data.index[0], self.data.index[-1]
+        ntools.assert_true(rollups.mergeRollups(old, new, since, start, end) is None)
+
+    def test_merge_everything_replaced(self):
+        since = pandas.Timestamp('2012-01-01')
+        new = rollups.buildRollups(self.data)
+        start, end = self.data.index[0], self.data.index[-1]
+        merged = rollups.mergeRollups({}, new, since, start, end)
+        ntools.assert_true(merged['hourly'] is new['hourly'])
+
+    def test_read_stale(self):
+        rollups.writeRollups(self.rollups, self.tempdir, 'test.csv')
+        compiled = os.path.join(self.tempdir, 'test.csv')
+        self.data.to_csv(compiled)
+        os.utime(compiled, (1e10, 1e10))
+        ntools.assert_equal(rollups.readRollups(self.tempdir, 'test.csv',
+                                                newerthan=compiled), {})
+
+    def test_registered(self):
+        levels = {'daily': self.rollups['daily'] * 2}
+        rollups.registerRollups(self.data, levels)
+
+        precip, rule, kind = graphics._resampler(self.data, 'Precip', 'daily')
+        nptest.assert_array_almost_equal(precip, levels['daily']['Precip'])
+
+        # weekly totals come from the daily level
+        precip, rule, kind = graphics._resampler(self.data, 'Precip', 'weekly')
+        ntools.assert_almost_equal(precip.sum(), 2 * self.data['Precip'].sum())
+
+        # but not once the data change
+        self.data.loc[self.data.index[0], 'Precip'] = 1.0
+        precip, rule, kind = graphics._resampler(self.data, 'Precip', 'daily')
+        ntools.assert_almost_equal(precip.sum(), self.data['Precip'].sum())
+
+    def test_circmean_resampler(self):
+        direction, rule, kind = graphics._resampler(self.data, 'WindDir', 'daily',
+                                                    how='circmean', cache=False)
+        nptest.assert_array_almost_equal(direction, self.rollups['daily']['WindDir'])
+
+    def test_bad_index(self):
+        ntools.assert_raises(ValueError, rollups.buildRollups,
+                             self.data.reset_index())
@@ -60,7 +60,8 @@ class test_station():
 
     def test_attributes(self):
         attributes = ['sta_id', 'city', 'state', 'country', 'position',
-                      'name', 'wunderground', 'asos', 'errorfile', 'data']
+                      'name', 'wunderground', 'asos', 'errorfile', 'errors',
+                      'data', 'store']
         for attr in attributes:
             ntools.assert_true(hasattr(self.sta, attr))
 
@@ -168,7 +169,8 @@ class test_station():
         data, status = self.sta._read_csv(self.ts, 'asos')
         known_columns = ['Sta', 'Date', 'Precip', 'Temp',
                          'DewPnt', 'WindSpd', 'WindDir',
-                         'AtmPress', 'SkyCover']
+                         'AtmPress', 'SkyCover', 'Ceiling',
+                         'FlightCat']
         for col in data.columns:
             ntools.assert_in(col, known_columns)
 
@@ -176,14 +178,16 @@ class test_station():
         data, status = self.sta._read_csv(self.ts, 'wunderground')
         known_columns = ['Sta', 'Date', 'Precip', 'Temp',
                          'DewPnt', 'WindSpd', 'WindDir',
-                         'AtmPress', 'SkyCover']
+                         'AtmPress', 'SkyCover', 'Ceiling',
+                         'FlightCat']
         for col in data.columns:
             ntools.assert_in(col, known_columns)
 
     def test_getASOSData_columns(self):
         known_columns = ['Sta', 'Date', 'Precip', 'Temp',
                          'DewPnt', 'WindSpd', 'WindDir',
-                         'AtmPress', 'SkyCover']
+                         'AtmPress', 'SkyCover', 'Ceiling',
+                         'FlightCat']
         self.sta.getASOSData(self.start, self.end)
         for col in self.sta.data['asos'].columns:
             ntools.assert_in(col, known_columns)
@@ -195,7 +199,8 @@ class test_station():
     def test_getWundergroundData_columns(self):
         known_columns = ['Sta', 'Date', 'Precip', 'Temp',
                          'DewPnt', 'WindSpd', 'WindDir',
-                         'AtmPress', 'SkyCover']
+                         'AtmPress', 'SkyCover', 'Ceiling',
+                         'FlightCat']
         self.sta.getWundergroundData(self.start, self.end)
         for col in self.sta.data['wunder'].columns:
             ntools.assert_in(col, known_columns)
@@ -213,6 +218,16 @@ class test_station():
     def test_getDataSaveFile(self):
         self.sta._get_data(self.start, self.end, 'asos', 'testfile.csv')
 
+    def test_getDataIncremental(self):
+        full = self.sta._get_data(self.start, self.end, 'asos', 'testfile.csv')
+        self.sta._get_data(self.start, dt.datetime(2012, 1, 31), 'asos', 'incremental.csv')
+        new = self.sta._get_data(self.start, self.end, 'asos', 'incremental.csv',
+                                 incremental=True)
+        ntools.assert_true(new.index[0] >= pandas.Timestamp('2012-01-01'))
+        data = self.sta.loadCompiledFile('asos', filename='incremental.csv')
+        ntools.assert_equal(data.shape, full.shape)
+        ntools.assert_true(data.index.is_unique)
+
     def test_parse_dates(self):
         datestrings = ['2012-6-4', 'September 23, 1982']
         knowndates = [dt.datetime(2012, 6, 4), dt.datetime(1982, 9, 23)]
@@ -269,6 +284,46 @@ class test_station():
         testval = station._process_sky_cover(obs)
         ntools.assert_equal(testval, 1.0000)
 
+    def test_process_sky_cover_missing(self):
+        teststring = 'METAR KPDX 010855Z 00000KT 10SM 04/03 A3031'
+        obs = metar.Metar(teststring)
+        testval = station._process_sky_cover(obs)
+        ntools.assert_equal(testval, 'NA')
+
+    def test_process_sky(self):
+        teststring = 'METAR KPDX 010855Z 00000KT 10SM FEW010 BKN025 OVC200 04/03 A3031'
+        obs = metar.Metar(teststring)
+        cover, ceiling = station._process_sky(obs)
+        ntools.assert_equal(cover, 1.0000)
+        ntools.assert_almost_equal(ceiling, 2500)
+
+    def test_process_sky_no_ceiling(self):
+        teststring = 'METAR KPDX 010855Z 00000KT 10SM FEW010 SCT025 04/03 A3031'
+        obs = metar.Metar(teststring)
+        cover, ceiling = station._process_sky(obs)
+        ntools.assert_equal(cover, 0.4375)
+        ntools.assert_true(ceiling is None)
+
+    def test_flight_category(self):
+        known_categories = [
+            ('10SM FEW010 BKN250', 'VFR'),
+            ('10SM BKN030', 'MVFR'),
+            ('4SM CLR', 'MVFR'),
+            ('10SM OVC008', 'IFR'),
+            ('2SM SCT010', 'IFR'),
+            ('10SM VV004', 'LIFR'),
+            ('1/2SM FEW100', 'LIFR'),
+        ]
+        for groups, known_cat in known_categories:
+            teststring = 'METAR KPDX 010855Z 00000KT %s 04/03 A3031' % groups
+            obs = metar.Metar(teststring)
+            cover, ceiling = station._process_sky(obs)
+            ntools.assert_equal(station._flight_category(obs, ceiling), known_cat)
+
+    def test_flight_category_missing(self):
+        obs = metar.Metar('METAR KPDX 010855Z 00000KT 04/03 A3031')
+        ntools.assert_equal(station._flight_category(obs, None), 'NA')
+
     def test_getAllStations(self):
         station.getAllStations()
 
@@ -311,3 +366,9 @@ class test_station():
     def test_loadCompData_wunderground_nonairport(self):
         self.sta2.loadCompiledFile('wunder_nonairport', filename='testfile.csv')
         self.sta2.loadCompiledFile('wunder_nonairport', filenum=1)
+
+    def test_loadCompData_range(self):
+        data = self.sta.loadCompiledFile('asos', filename='testfile.csv',
+                                         start='2012-01-15', end='2012-01-20')
+        ntools.assert_true(data.index[0] >= pandas.Timestamp('2012-01-15'))
+        ntools.assert_true(data.index[-1] < pandas.Timestamp('2012-01-21'))
@@ -0,0 +1,122 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+
+import nose.tools as ntools
+import numpy as np
+import pandas
+
+from metar import store
+
+
+def _frame(station, start, periods, temp=0.0):
+    index = pandas.date_range(start, periods=periods, freq='h', name='Date')
+    return pandas.DataFrame({
+        'Sta': station,
+        'Precip': np.arange(periods) / 100.,
+        'Temp': temp + np.arange(periods),
+    }, index=index)
+
+
+class test_ObservationStore(object):
+    def setup(self):
+        self.tempdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tempdir, 'observations.db')
+        self.db = store.ObservationStore(self.path)
+        self.db.insert('KPDX', _frame('KPDX', '2012-01-01', 48))
+        self.db.insert('KSEA', _frame('KSEA', '2012-01-01', 48, temp=10))
+        self.db.insert('KBFI', _frame('KBFI', '2012-01-01', 48, temp=20))
+
+    def teardown(self):
+        self.db.close()
+        shutil.rmtree(self.tempdir)
+
+    def test_wal(self):
+        mode = self.db.connection.execute('PRAGMA journal_mode').fetchone()[0]
+        ntools.assert_equal(mode, 'wal')
+
+    def test_stations(self):
+        ntools.assert_equal(self.db.stations(), ['KBFI', 'KPDX', 'KSEA'])
+        ntools.assert_equal(self.db.stations('wunderground'), [])
+
+    def test_columns(self):
+        ntools.assert_equal(self.db.columns(), ['Sta', 'Precip', 'Temp'])
+
+    def test_query(self):
+        df = self.db.query(['KSEA', 'KPDX'], start='2012-01-01 06:00',
+                           end='2012-01-01 08:00', columns=['Temp'])
+        ntools.assert_equal(list(df.columns), ['Temp'])
+        ntools.assert_equal(list(df.index.get_level_values(0)), ['KSEA'] * 3 + ['KPDX'] * 3)
+        ntools.assert_equal(df.loc['KSEA']['Temp'].tolist(), [16., 17., 18.])
+        ntools.assert_equal(df.index.get_level_values(1)[0], pandas.Timestamp('2012-01-01 06:00'))
+
+    def test_query_one(self):
+        df = self.db.query(u'KSEA', columns=['Temp'])
+        ntools.assert_equal(df.shape, (48, 1))
+
+    def test_query_all(self):
+        df = self.db.query()
+        ntools.assert_equal(df.shape, (144, 3))
+        ntools.assert_equal(df.loc['KBFI']['Sta'].unique().tolist(), ['KBFI'])
+
+    def test_query_plan(self):
+        # reads a range of the primary key, not the whole table
+        plan = self.db.connection.execute(
+            'EXPLAIN QUERY PLAN SELECT time, Temp FROM asos '
+            'WHERE station = ? AND time >= ? AND time <= ?', ('KPDX', 0, 1)
+        ).fetchall()
+        ntools.assert_true(any('USING PRIMARY KEY' in row[-1] for row in plan))
+
+    def test_last_row_wins(self):
+        correction = _frame('KPDX', '2012-01-01 03:00', 1, temp=-5)
+        ntools.assert_equal(self.db.insert('KPDX', correction), 1)
+        df = self.db.query('KPDX', start='2012-01-01 03:00', end='2012-01-01 03:00')
+        ntools.assert_equal(df['Temp'].tolist(), [-5.])
+        ntools.assert_equal(self.db.query('KPDX').shape[0], 48)
+
+    def test_missing_values(self):
+        df = _frame('KPDX', '2012-02-01', 2)
+        df.loc[df.index[0], 'Temp'] = np.nan
+        self.db.insert('KPDX', df)
+        out = self.db.query('KPDX', start='2012-02-01', columns=['Temp'])
+        ntools.assert_true(np.isnan(out['Temp'].iloc[0]))
+
+    def test_new_column(self):
+        df = _frame('KPDX', '2012-02-01', 2)
+        df['WindSpd'] = 4.0
+        self.db.insert('KPDX', df)
+        ntools.assert_equal(self.db.columns(), ['Sta', 'Precip', 'Temp', 'WindSpd'])
+        out = self.db.query(columns=['WindSpd'])
+        ntools.assert_equal(out['WindSpd'].count(), 2)
+
+    def test_empty(self):
+        ntools.assert_equal(self.db.insert('KPDX', None), 0)
+        df = self.db.query('KOTH')
+        ntools.assert_equal(df.shape, (0, 3))
+
+    def test_reopen(self):
+        self.db.close()
+        with store.ObservationStore(self.path) as db:
+            ntools.assert_equal(db.query('KSEA').shape[0], 48)
+        self.db = store.ObservationStore(self.path)
+
+    def test_memory(self):
+        with store.ObservationStore(':memory:') as db:
+            db.insert('KPDX', _frame('KPDX', '2012-01-01', 3), source='wunderground')
+            ntools.assert_equal(db.query('KPDX', source='wunderground').shape, (3, 3))
+
+    @ntools.raises(ValueError)
+    def test_bad_source(self):
+        self.db.query(source='asos; DROP TABLE asos')
+
+    @ntools.raises(ValueError)
+    def test_bad_column(self):
+        self.db.query(columns=['Nope'])
+
+    def test_rollback(self):
+        # a batch is stored whole or not at all
+        df = _frame('KPDX', '2012-03-01', 3)
+        df['Note'] = ['ok', 'ok', {'not': 'bindable'}]
+        ntools.assert_raises(sqlite3.Error, self.db.insert, 'KPDX', df)
+        ntools.assert_equal(self.db.query('KPDX', start='2012-03-01').shape[0], 0)
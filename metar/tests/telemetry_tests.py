@@ -0,0 +1,217 @@
+import io
+import sys
+
+import nose.tools as ntools
+
+from metar import metar
+from metar import telemetry
+
+REPORTS = [
+    'METAR KPDX 010053Z 31008KT 10SM FEW035 BKN050 04/02 A3026 RMK AO2 SLP246 T00390017',
+    'METAR EGLL 220650Z 24010KT 9999 SCT020 12/08 Q1012 NOSIG',
+]
+
+
+class test_HandlerStats(object):
+    def setup(self):
+        self.stats = metar.enableInstrumentation()
+        self.obs = [metar.Metar(report) for report in REPORTS]
+        metar.disableInstrumentation()
+        self.snapshot = self.stats.snapshot()
+
+    def teardown(self):
+        metar.disableInstrumentation()
+
+    def test_reports(self):
+        ntools.assert_equal(self.snapshot['reports'], 2)
+        ntools.assert_greater(self.snapshot['seconds'], 0)
+
+    def test_sections(self):
+        ntools.assert_equal(sorted(self.snapshot['handlers']), sorted(telemetry.SECTIONS))
+
+    def test_main_counts(self):
+        wind = self.snapshot['handlers']['main']['_handleWind']
+        ntools.assert_equal(wind['matches'], 2)
+        ntools.assert_equal(wind['calls'], wind['matches'] + wind['misses'])
+
+        sky = self.snapshot['handlers']['main']['_handleSky']
+        ntools.assert_equal(sky['matches'], 3)
+
+    def test_trend_counts(self):
+        # NOSIG starts the trend section, then each trend pattern is tried
+        ntools.assert_equal(self.snapshot['handlers']['main']['_handleTrend']['matches'], 1)
+        trend = self.snapshot['handlers']['trend']
+        ntools.assert_equal(trend['WIND_RE']['calls'], 1)
+        ntools.assert_equal(trend['WIND_RE']['matches'], 0)
+
+    def test_remark_counts(self):
+        remarks = self.snapshot['handlers']['remark']
+        ntools.assert_equal(remarks['_handleSealvlPressRemark']['matches'], 1)
+        ntools.assert_equal(remarks['_handleTemp1hrRemark']['matches'], 1)
+
+    def test_same_results(self):
+        for report, obs in zip(REPORTS, self.obs):
+            ntools.assert_equal(obs.string(), metar.Metar(report).string())
+
+    def test_disabled(self):
+        metar.Metar(REPORTS[0])
+        ntools.assert_equal(self.stats.reports, 2)
+
+    def test_top(self):
+        top = self.stats.top(n=3, key='calls')
+        ntools.assert_equal(len(top), 3)
+        ntools.assert_true(top[0][2] >= top[1][2] >= top[2][2])
+
+    def test_prometheus(self):
+        text = self.stats.prometheus()
+        ntools.assert_true('metar_parser_reports_total 2\n' in text)
+        ntools.assert_true(
+            'metar_parser_handler_matches_total{section="main",handler="_handleWind"} 2\n' in text
+        )
+
+    def test_reset(self):
+        self.stats.reset()
+        ntools.assert_equal(self.stats.reports, 0)
+        ntools.assert_equal(self.stats.snapshot()['handlers']['main'], {})
+
+    def test_enable_existing(self):
+        stats = metar.enableInstrumentation(self.stats)
+        metar.Metar(REPORTS[1])
+        ntools.assert_true(metar.disableInstrumentation() is stats)
+        ntools.assert_equal(self.stats.reports, 3)
+
+
+class test_ErrorCollector(object):
+    def setup(self):
+        self.errors = telemetry.ErrorCollector(maxsignatures=3, samples=2)
+        self.reports = [
+            'METAR KPDX 010053Z 31008KT 10SM XQZ FEW035 04/02 A3026',
+            'METAR KSEA 010053Z 31008KT 10SM XQZ FEW035 04/02 A3026',
+            'METAR KEWR 010053Z 31008KT 10SM XQZ FEW035 04/02 A3026',
+            'METAR KPDX 010053Z 31008KT 12#4 10SM FEW035 04/02 A3026',
+        ]
+        for report in self.reports:
+            metar.Metar(report, errors=self.errors)
+        self.tempfile = io.StringIO()
+
+    def test_counts(self):
+        ntools.assert_equal(len(self.errors), 4)
+        ntools.assert_equal(self.errors.top(),
+                            [('unparsed', 'XQZ', 3), ('unparsed', '12#4', 1)])
+
+    def test_samples(self):
+        ntools.assert_equal(self.errors.examples('unparsed', 'XQZ'), self.reports[:2])
+        ntools.assert_equal(self.errors.examples('unparsed', 'junk'), [])
+
+    def test_bounded(self):
+        self.errors.add('failed', '_handleWind', 'report')
+        self.errors.add('failed', '_handleSky', 'report')
+        self.errors.add('failed', '_handleWind', 'report')
+        ntools.assert_equal(self.errors.dropped, 1)
+        ntools.assert_equal(self.errors.top(kind='failed'), [('failed', '_handleWind', 2)])
+
+    def test_no_output(self):
+        stdout = sys.stdout
+        sys.stdout = io.StringIO()
+        try:
+            metar.Metar(self.reports[0], errors=self.errors)
+            ntools.assert_equal(sys.stdout.getvalue(), '')
+        finally:
+            sys.stdout = stdout
+
+    def test_flush(self):
+        self.errors.flush(self.tempfile)
+        summary = self.tempfile.getvalue().splitlines()
+        ntools.assert_equal(summary[0], "unparsed: 'XQZ' (3 times)")
+        ntools.assert_equal(summary[1], "    in '{}'".format(self.reports[0]))
+        ntools.assert_equal(len(summary), 5)
+        ntools.assert_equal(len(self.errors), 0)
+
+        self.errors.flush(self.tempfile)
+        ntools.assert_equal(len(self.tempfile.getvalue().splitlines()), 5)
+
+
+class test_groupSignature(object):
+    def test_shapes(self):
+        ntools.assert_equal(telemetry.groupSignature('R24/1234'), 'A99/9999')
+        ntools.assert_equal(telemetry.groupSignature('12#4'), '99#9')
+        ntools.assert_equal(telemetry.groupSignature('$'), '$')
+
+
+class test_SpaceSaving(object):
+    def setup(self):
+        self.sketch = telemetry.SpaceSaving(k=3)
+        stream = ['a'] * 10 + ['b'] * 5 + ['c', 'd', 'e', 'f'] + ['a'] * 2
+        for item in stream:
+            self.sketch.add(item)
+
+    def test_bounded(self):
+        ntools.assert_equal(len(self.sketch), 3)
+        ntools.assert_equal(self.sketch.total, 21)
+
+    def test_heavy_hitters(self):
+        top = self.sketch.top(2)
+        ntools.assert_equal(top[0], ('a', 12, 0))
+        ntools.assert_equal(top[1], ('b', 5, 0))
+
+    def test_error_bound(self):
+        item, count, error = self.sketch.top()[-1]
+        ntools.assert_equal(item, 'f')
+        ntools.assert_equal((count, error), (4, 3))
+
+    def test_weighted(self):
+        self.sketch.add('b', weight=10)
+        ntools.assert_equal(self.sketch.top(1)[0], ('b', 15, 0))
+
+    def test_long_stream(self):
+        # same counts as scanning every counter for the smallest one
+        sketch = telemetry.SpaceSaving(k=5)
+        counters = {}
+        for n in range(2000):
+            item = (n * 7919) % 23 if n % 3 else n % 4
+            weight = 1 + (n % 5) / 4.
+            sketch.add(item, weight)
+            if item in counters:
+                counters[item][0] += weight
+            elif len(counters) < 5:
+                counters[item] = [weight, 0]
+            else:
+                smallest = min(counters, key=lambda key: (counters[key][0], key))
+                floor = counters.pop(smallest)[0]
+                counters[item] = [floor + weight, floor]
+            ntools.assert_equal(sorted(c for c, e in counters.values()),
+                                sorted(c for i, c, e in sketch.top()))
+        ntools.assert_true(len(sketch._heap) <= 10)
+
+
+class test_UnparsedAnalyzer(object):
+    def setup(self):
+        self.reports = [
+            'METAR KPDX 010053Z 31008KT 10SM XQZ FEW035 04/02 A3026',
+            'METAR KSEA 010053Z 31008KT 10SM ABC FEW035 04/02 A3026',
+            'METAR KEWR 010053Z 31008KT 12#4 10SM FEW035 04/02 A3026',
+            'METAR KEWR 010053Z 31008KT 10SM FEW035 04/02 A3026',
+            '',
+        ]
+        self.analyzer = telemetry.UnparsedAnalyzer(k=10).analyze(self.reports)
+
+    def test_counts(self):
+        ntools.assert_equal(self.analyzer.reports, 4)
+        ntools.assert_equal(self.analyzer.unparsed, 3)
+        ntools.assert_equal(self.analyzer.top(by='count'),
+                            [('main', 'AAA', 2), ('main', '99#9', 1)])
+
+    def test_seconds(self):
+        top = self.analyzer.top(by='seconds')
+        ntools.assert_equal(sorted(shape for section, shape, seconds in top),
+                            ['99#9', 'AAA'])
+        ntools.assert_less_equal(sum(seconds for section, shape, seconds in top),
+                                 self.analyzer.parse_seconds)
+
+    def test_bad_by(self):
+        ntools.assert_raises(ValueError, self.analyzer.top, by='junk')
+
+    def test_summary(self):
+        lines = self.analyzer.summary().splitlines()
+        ntools.assert_equal(lines[0].split(',')[:2], ['4 reports', ' 3 with unparsed groups'])
+        ntools.assert_equal(len(lines), 4)
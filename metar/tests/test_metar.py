@@ -399,6 +399,27 @@ class MetarTest(unittest.TestCase):
     self.assertEqual( report('TEMPO 0306 RMK 402500072').trend(), 'TEMPO 0306' )
     self.assertEqual( report('TEMPO 0306 RMK 402500072').max_temp_24hr.value(), 25.0 )
 
+  def test_200_parseWeather(self):
+    """Check parsing of present-weather groups."""
+    def report(weather_group):
+      return metar.Metar(sta_time_wind+"10SM "+weather_group+" OVC020 23/05 Q1001")
+
+    self.assertEqual( report("-RA").weather[0].info, ('-', None, 'RA', None, None) )
+    self.assertEqual( report("-RA").present_weather(), "light rain" )
+    self.assertEqual( report("SHRASN").present_weather(), "showers rain and snow" )
+    self.assertEqual( report("+SNRAGS").present_weather(), "heavy snow, rain and snow pellets" )
+    self.assertEqual( report("VCTS BR").present_weather(), "nearby thunderstorm; mist" )
+    self.assertEqual( report("FZFG").weather[0].description, "freezing" )
+    self.assertEqual( report("FZFG").weather[0].obscuration, "fog" )
+
+  def test_201_parseWeather_shared(self):
+    """Check that identical weather groups share one read-only decoding."""
+    weather = metar.Metar(sta_time_wind+"10SM -SHRA BR -SHRA").weather
+    self.assertEqual( len(weather), 3 )
+    self.assertTrue( weather[0] is weather[2] )
+    self.assertTrue( weather[0] is metar.Metar(sta_time+"-SHRA").weather[0] )
+    self.assertRaises( AttributeError, setattr, weather[0], 'precip', 'snow' )
+
 if __name__=='__main__':
   unittest.main( )
 
@@ -2,8 +2,11 @@
 #
 # simple command-line driver for metar parser
 #
+from __future__ import print_function
+
 import sys, os
-from metar import Metar
+from metar import metar as Metar
+from metar import telemetry
 import string
 import getopt
 import profile, pstats
@@ -16,6 +19,8 @@ def usage():
         -q ....... run "quietly" - just report parsing error.
         -s ....... run silently. (no output)
         -p ....... run with profiling turned on.
+        -u ....... summarize the shapes of the unparsed groups, by
+                   parse time, instead of printing the reports.
       This program reads lines containing coded METAR reports from a file
       and prints human-reable reports.  Lines are taken from stdin if no
       file is given.  For testing purposes, the script can run silently,
@@ -29,9 +34,10 @@ silent = False
 report = True
 debug = False
 prof = False
+analyzer = None
 
 try:
-    opts, files = getopt.getopt(sys.argv[1:], 'dpqs')
+    opts, files = getopt.getopt(sys.argv[1:], 'dpqsu')
     for opt in opts:
         if opt[0] == '-s':
             silent = True
@@ -43,23 +49,28 @@ try:
             Metar.debug = True
         elif opt[0] == '-p':
             prof = True
+        elif opt[0] == '-u':
+            analyzer = telemetry.UnparsedAnalyzer()
 except:
   usage()
 
 def process_line(line):
     """Decode a single input line."""
     line = line.strip()
-    if len(line) and line[0] in string.uppercase:
+    if analyzer is not None:
+        if line:
+            analyzer.parse(line)
+    elif len(line) and line[0] in string.ascii_uppercase:
         try:
             obs = Metar.Metar(line)
             if report:
                 print("--------------------")
                 print(obs.string())
-        except Metar.ParserError, err:
+        except Metar.ParserError as err:
             if not silent:
                 print("--------------------")
                 print("METAR code: %s" % line)
-                print(string.join(err.args,", "))
+                print(", ".join(err.args))
 
 def process_files(files):
     """Decode METAR lines from the given files."""
@@ -84,6 +95,9 @@ else:
       except KeyboardInterrupt:
           break
 
+if analyzer is not None:
+    print(analyzer.summary())
+
 if prof:
     ps = pstats.load('metar.prof')
     print(ps.strip_dirs().sort_stats('time').print_stats())